@@ -0,0 +1,76 @@
+from functools import lru_cache
+from typing import Optional
+from fastapi import Depends, Header, HTTPException
+from auth.tokens import verify_access_token
+from controllers.user_controller import UserController
+from config import settings
+from database.mongodb import MongoDB
+from utils.dataloader import DataLoader
+from utils.rate_limit import QuotaLimiter
+
+
+def get_users_collection():
+    """Dependency para obter a coleção de usuários."""
+    return MongoDB.get_async_collection("users")
+
+
+def get_chats_collection():
+    """Dependency para obter a coleção de chats."""
+    return MongoDB.get_async_collection("chats")
+
+
+def get_message_buckets_collection():
+    """Dependency para obter a coleção de buckets de mensagens."""
+    return MongoDB.get_async_collection("message_buckets")
+
+
+def get_unread_counters_collection():
+    """Dependency para obter a coleção de contadores de não lidas."""
+    return MongoDB.get_async_collection("unread_counters")
+
+
+def get_tombstones_collection():
+    """Dependency para obter a coleção de exclusões (tombstones) da sincronização."""
+    return MongoDB.get_async_collection("tombstones")
+
+
+def get_user_loader(collection=Depends(get_users_collection)) -> DataLoader:
+    """
+    DataLoader de usuários com escopo de requisição: o FastAPI reaproveita
+    a mesma instância para todas as dependências da requisição, então buscas
+    de usuários feitas em qualquer ponto viram um único $in.
+    """
+    return DataLoader(UserController(collection).get_user_documents)
+
+
+@lru_cache(maxsize=None)
+def get_profile_ring():
+    """Anel de perfis em disco do processo (PROFILING_DIR)."""
+    from utils.profiling import ProfileRing
+
+    return ProfileRing(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+
+
+def get_realtime_hub():
+    """
+    Hub de tempo real do processo. services.realtime_hub (e o broker) só é
+    importado no primeiro uso, fora do caminho de importação de main.
+    """
+    from services.realtime_hub import get_realtime_hub as get_process_hub
+
+    return get_process_hub()
+
+
+def get_current_user_id(authorization: Optional[str] = Header(default=None)) -> str:
+    """Usuário autenticado pelo cabeçalho Authorization: Bearer <token> (auth.tokens)."""
+    scheme, _, token = (authorization or "").partition(" ")
+    user_id = verify_access_token(token) if scheme.lower() == "bearer" and token else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or missing access token", headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
+
+@lru_cache(maxsize=None)
+def get_discover_limiter() -> QuotaLimiter:
+    """Cota de hashes de telefone por chamador da descoberta de contatos."""
+    return QuotaLimiter(settings.DISCOVER_QUOTA_HASHES, settings.DISCOVER_QUOTA_WINDOW_SECONDS)
@@ -0,0 +1,165 @@
+import hmac
+import itertools
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import anyio
+
+from utils.metrics import SIZE_BUCKETS, end_request_timings, registry, start_request_timings
+
+if TYPE_CHECKING:
+    from utils.profiling import ProfileRing, StackSampler
+
+
+logger = logging.getLogger("api.requests")
+
+HTTP_REQUESTS = registry.counter(
+    "talkhub_http_requests_total",
+    "Requisições HTTP por método, rota e status.",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "talkhub_http_request_duration_seconds",
+    "Latência das requisições HTTP por método e rota.",
+    ("method", "route"),
+)
+HTTP_REQUEST_MONGO_DURATION = registry.histogram(
+    "talkhub_http_request_mongo_duration_seconds",
+    "Tempo somado em comandos do MongoDB por requisição HTTP.",
+    ("method", "route"),
+)
+HTTP_RESPONSE_SIZE = registry.histogram(
+    "talkhub_http_response_size_bytes",
+    "Tamanho do corpo das respostas HTTP por método e rota.",
+    ("method", "route"),
+    SIZE_BUCKETS,
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "talkhub_http_requests_in_flight",
+    "Requisições HTTP em andamento.",
+)
+
+
+def _route_label(scope) -> str:
+    # O template da rota (ex.: /users/{user_id}) mantém a cardinalidade baixa
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    '''
+    Middleware ASGI puro: mede latência, status e tamanho da resposta por
+    rota, mantém o gauge de requisições em andamento e acumula o tempo de
+    MongoDB/threadpool da requisição, devolvido no cabeçalho Server-Timing.
+    '''
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings, token = start_request_timings()
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                server_timing = (
+                    f"app;dur={(time.perf_counter() - start) * 1000:.2f}, "
+                    f"db;dur={timings.mongo_seconds * 1000:.2f};desc=\"{timings.mongo_commands} commands\", "
+                    f"pool;dur={timings.threadpool_wait_seconds * 1000:.2f}"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", server_timing.encode())]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            end_request_timings(token)
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            route = _route_label(scope)
+            HTTP_REQUESTS.inc(method, route, str(status_code))
+            HTTP_REQUEST_DURATION.observe(method, route, value=elapsed)
+            HTTP_REQUEST_MONGO_DURATION.observe(method, route, value=timings.mongo_seconds)
+            HTTP_RESPONSE_SIZE.observe(method, route, value=size)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s %s %d %.2fms db=%.2fms/%d pool=%.2fms %dB",
+                    method, route, status_code, elapsed * 1000, timings.mongo_seconds * 1000,
+                    timings.mongo_commands, timings.threadpool_wait_seconds * 1000, size,
+                )
+
+
+class ProfilingMiddleware:
+    '''
+    Perfila requisições com o StackSampler e grava o resultado no ProfileRing.
+
+    Uma requisição é perfilada quando traz o cabeçalho X-Profile com o token
+    de administração, ou a cada sample_every requisições (0 desliga a
+    amostragem). O nome do perfil volta no cabeçalho X-Profile-Id. Só é
+    instalado com PROFILING_ENABLED; desligado, não custa nada.
+    '''
+    def __init__(
+        self,
+        app,
+        ring: "ProfileRing",
+        admin_token: str = "",
+        sample_every: int = 0,
+        interval: float = 0.001,
+        profile_format: str = "speedscope",
+    ):
+        self.app = app
+        self.ring = ring
+        self.admin_token = admin_token.encode()
+        self.sample_every = sample_every
+        self.interval = interval
+        self.profile_format = profile_format
+        self._counter = itertools.count(1)
+        # utils.profiling só é importado com o middleware instalado (PROFILING_ENABLED)
+        from utils.profiling import StackSampler
+
+        self._sampler_class = StackSampler
+
+    def _should_profile(self, scope) -> bool:
+        if self.admin_token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    return hmac.compare_digest(value, self.admin_token)
+        return bool(self.sample_every) and next(self._counter) % self.sample_every == 0
+
+    async def __call__(self, scope, receive, send):
+        # Não perfila o download dos próprios perfis
+        if scope["type"] != "http" or scope["path"].startswith("/debug/") or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {scope['path']}"
+        name = self.ring.new_name(label, self.profile_format)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", name.encode())]}
+            await send(message)
+
+        sampler = self._sampler_class(interval=self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Parar (join) e gravar bloqueiam: ficam fora do event loop
+            await anyio.to_thread.run_sync(self._finish, sampler, name, label)
+
+    def _finish(self, sampler: "StackSampler", name: str, label: str) -> None:
+        sampler.stop()
+        self.ring.save(name, label, sampler)
@@ -1,4 +1,2 @@
-from . import user_routes, chat_routes
-
-
-__all__ = ["user_routes", "chat_routes"]
\ No newline at end of file
+# Sem importar os módulos aqui: debug_routes só é carregado com PROFILING_ENABLED
+__all__ = ["user_routes", "chat_routes", "message_routes", "realtime_routes", "debug_routes"]
\ No newline at end of file
@@ -1,55 +1,164 @@
-from fastapi import Depends, APIRouter, HTTPException, status
+from fastapi import Depends, APIRouter, HTTPException, Query, Request, Response, status
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+from datetime import datetime
 from controllers.chat_controller import ChatController
-from models.chat import ChatCreate, ChatUpdate, ChatOut, ChatListOut
-from database.mongodb import MongoDB
+from controllers.message_controller import MessageController
+from controllers.unread_controller import UnreadController
+from models.chat import ChatCreate, ChatUpdate, ChatOut, ChatPageOut, ChatOutRow, ChatPageRow, ChatExportRow
+from models.bulk import BulkIn, BulkOut
+from utils.bulk import bulk_create
+from utils.serialization import json_response, ndjson_response
+from utils.http_cache import (
+    conditional_json_response,
+    document_validators,
+    is_conditional,
+    is_not_modified,
+    not_modified_response,
+)
+from api.dependencies import (
+    get_chats_collection,
+    get_message_buckets_collection,
+    get_unread_counters_collection,
+    get_tombstones_collection,
+    get_realtime_hub,
+)
+from config import settings
 
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 
-def get_chats_collection():
-    """Dependency para obter a coleção de chats."""
-    return MongoDB.get_collection("chats")
-
-
 @router.post("/", response_model=ChatOut, status_code=status.HTTP_201_CREATED)
-def create_chat(chat_create: ChatCreate, collection=Depends(get_chats_collection)):
+async def create_chat(
+    chat_create: ChatCreate,
+    response: Response,
+    collection=Depends(get_chats_collection),
+    hub=Depends(get_realtime_hub),
+):
+    """
+    Cria o chat. Chats privados são get-or-create: se já existe um chat
+    privado entre os mesmos participantes, ele é devolvido com status 200.
+    """
     chat_controller = ChatController(collection)
-    chat = chat_controller.create_chat(chat_create)
+    chat, created = await chat_controller.create_chat(chat_create)
+    if created:
+        await hub.set_chat_members(chat.id, chat.participant_ids)
+    else:
+        response.status_code = status.HTTP_200_OK
     return ChatOut(**chat.model_dump())
 
 
+@router.post("/bulk", response_model=BulkOut)
+async def create_chats_bulk(bulk: BulkIn, collection=Depends(get_chats_collection), hub=Depends(get_realtime_hub)):
+    """
+    Cria até MAX_BULK_ITEMS chats em uma requisição, com resultado (id ou
+    erro) por item.
+    """
+    if len(bulk.items) > settings.MAX_BULK_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.MAX_BULK_ITEMS} items per request")
+    chat_controller = ChatController(collection)
+    results, chat_creates = await bulk_create(ChatCreate, bulk.items, chat_controller.create_chats)
+    created = 0
+    for result in results:
+        if result["id"] is not None:
+            created += 1
+            await hub.set_chat_members(result["id"], chat_creates[result["index"]].participant_ids)
+    return BulkOut(created=created, failed=len(results) - created, results=results)
+
+
+@router.get("/export")
+async def export_chats(
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=settings.MAX_EXPORT_BATCH_SIZE),
+    after_id: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    updated_until: Optional[datetime] = None,
+    collection=Depends(get_chats_collection),
+):
+    """
+    Exporta todos os chats em NDJSON (um JSON por linha), em ordem de _id.
+    Para retomar, passe em after_id o último id recebido.
+    """
+    chat_controller = ChatController(collection)
+    try:
+        cursor = chat_controller.export_chats(batch_size, after_id, updated_since, updated_until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid after_id")
+    return ndjson_response(ChatExportRow, cursor, batch_size)
+
+
 @router.get("/{chat_id}", response_model=ChatOut)
-def get_chat(chat_id: str, collection=Depends(get_chats_collection)):
+async def get_chat(chat_id: str, request: Request, collection=Depends(get_chats_collection)):
+    """
+    Chat com ETag e Last-Modified (de _id e updated_at). Em revalidações,
+    uma consulta que só traz updated_at responde 304 sem ler o chat inteiro.
+    """
     chat_controller = ChatController(collection)
-    chat = chat_controller.get_chat(chat_id)
+    if is_conditional(request):
+        version = await chat_controller.get_chat_version(chat_id)
+        if not version:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        etag, last_modified = document_validators(version)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified, settings.RESOURCE_CACHE_CONTROL)
+    chat = await chat_controller.get_chat_document(chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    return ChatOut(**chat.model_dump())
+    return conditional_json_response(request, ChatOutRow, chat, settings.RESOURCE_CACHE_CONTROL)
 
 
 @router.put("/{chat_id}", response_model=ChatOut)
-def update_chat(chat_id: str, chat_update: ChatUpdate, collection=Depends(get_chats_collection)):
-    chat_controller = ChatController(collection)
-    chat = chat_controller.update_chat(chat_id, chat_update)
+async def update_chat(
+    chat_id: str,
+    chat_update: ChatUpdate,
+    collection=Depends(get_chats_collection),
+    tombstones_collection=Depends(get_tombstones_collection),
+    hub=Depends(get_realtime_hub),
+):
+    chat_controller = ChatController(collection, tombstones_collection)
+    try:
+        chat = await chat_controller.update_chat(chat_id, chat_update)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Private chat already exists")
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
+    if chat_update.participant_ids is not None:
+        await hub.set_chat_members(chat.id, chat.participant_ids)
     return ChatOut(**chat.model_dump())
 
 
 @router.delete("/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_chat(chat_id: str, collection=Depends(get_chats_collection)):
-    chat_controller = ChatController(collection)
-    deleted = chat_controller.delete_chat(chat_id)
+async def delete_chat(
+    chat_id: str,
+    collection=Depends(get_chats_collection),
+    buckets_collection=Depends(get_message_buckets_collection),
+    counters_collection=Depends(get_unread_counters_collection),
+    tombstones_collection=Depends(get_tombstones_collection),
+    hub=Depends(get_realtime_hub),
+):
+    chat_controller = ChatController(collection, tombstones_collection)
+    deleted = await chat_controller.delete_chat(chat_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Chat not found")
+    await MessageController(buckets_collection, collection).delete_chat_messages(chat_id)
+    await UnreadController(counters_collection, buckets_collection).delete_chat_counters(chat_id)
+    await hub.close_chat(chat_id)
     return None
 
 
-@router.get("/", response_model=list[ChatOut])
-def list_chats(collection=Depends(get_chats_collection)):
+@router.get("/", response_model=ChatPageOut)
+async def list_chats(
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    participant_id: Optional[str] = None,
+    collection=Depends(get_chats_collection),
+):
     chat_controller = ChatController(collection)
-    chats = chat_controller.list_chats()
-    return [ChatOut(**chat.model_dump()) for chat in chats]
+    try:
+        chats, next_cursor = await chat_controller.list_chats(limit, cursor, type, participant_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return json_response(ChatPageRow, {"chats": chats, "next_cursor": next_cursor})
 
 
@@ -0,0 +1,38 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from typing import Optional
+from api.dependencies import get_profile_ring
+from config import settings
+
+
+def require_admin_token(x_profile: Optional[str] = Header(default=None)):
+    """Exige o cabeçalho X-Profile com PROFILING_ADMIN_TOKEN."""
+    token = settings.PROFILING_ADMIN_TOKEN
+    if not token or not x_profile or not hmac.compare_digest(x_profile.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+# Registrado em main.py apenas com PROFILING_ENABLED
+router = APIRouter(
+    prefix="/debug/profiles",
+    tags=["debug"],
+    include_in_schema=False,
+    dependencies=[Depends(require_admin_token)],
+)
+
+
+@router.get("")
+async def list_profiles(ring=Depends(get_profile_ring)):
+    """Perfis gravados, do mais recente para o mais antigo."""
+    return {"profiles": ring.list()}
+
+
+@router.get("/{name}")
+async def get_profile(name: str, ring=Depends(get_profile_ring)):
+    """Baixa um perfil (abrir em https://www.speedscope.app ou flamegraph.pl)."""
+    path = ring.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/plain" if name.endswith(".txt") else "application/json"
+    return FileResponse(path, media_type=media_type, filename=name)
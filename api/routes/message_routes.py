@@ -0,0 +1,53 @@
+from fastapi import Depends, APIRouter, HTTPException, Query, status
+from typing import Optional
+from controllers.message_controller import MessageController
+from models.message import MessageCreate, MessageOut, MessagePageOut, MessagePageRow
+from utils.serialization import json_response
+from api.dependencies import (
+    get_chats_collection,
+    get_message_buckets_collection,
+    get_realtime_hub,
+    get_unread_counters_collection,
+)
+from config import settings
+
+
+router = APIRouter(prefix="/chats", tags=["messages"])
+
+
+@router.post("/{chat_id}/messages", response_model=MessageOut, status_code=status.HTTP_201_CREATED)
+async def send_message(
+    chat_id: str,
+    message_create: MessageCreate,
+    buckets_collection=Depends(get_message_buckets_collection),
+    chats_collection=Depends(get_chats_collection),
+    counters_collection=Depends(get_unread_counters_collection),
+    hub=Depends(get_realtime_hub),
+):
+    message_controller = MessageController(buckets_collection, chats_collection, counters_collection)
+    message = await message_controller.send_message(chat_id, message_create)
+    if not message:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    message_out = MessageOut(**message.model_dump())
+    await hub.publish(chat_id, {
+        "type": "message.created",
+        "chat_id": chat_id,
+        "message": message_out.model_dump(mode="json", by_alias=True),
+    })
+    return message_out
+
+
+@router.get("/{chat_id}/messages", response_model=MessagePageOut)
+async def list_messages(
+    chat_id: str,
+    before: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    buckets_collection=Depends(get_message_buckets_collection),
+    chats_collection=Depends(get_chats_collection),
+):
+    message_controller = MessageController(buckets_collection, chats_collection)
+    try:
+        messages, next_cursor = await message_controller.list_messages(chat_id, limit, before)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return json_response(MessagePageRow, {"messages": messages, "next_cursor": next_cursor})
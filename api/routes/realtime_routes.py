@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, WebSocket, status
+from typing import Optional
+from auth.tokens import verify_access_token
+from controllers.chat_controller import ChatController
+from api.dependencies import get_chats_collection, get_realtime_hub
+from config import settings
+
+
+router = APIRouter(tags=["realtime"])
+
+
+@router.websocket("/ws")
+async def realtime(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    chats_collection=Depends(get_chats_collection),
+    hub=Depends(get_realtime_hub),
+):
+    """
+    Entrega em tempo real dos eventos dos chats do usuário autenticado.
+
+    O token vai na query string (?token=), já que navegadores não permitem
+    cabeçalhos customizados no handshake do WebSocket.
+    """
+    user_id = verify_access_token(token) if token else None
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    # Importado sob demanda, como o hub (api.dependencies.get_realtime_hub)
+    from services.realtime_hub import RealtimeConnection
+
+    chat_ids = await ChatController(chats_collection).list_user_chat_ids(user_id)
+    connection = RealtimeConnection(websocket, user_id, settings.REALTIME_SEND_QUEUE_SIZE)
+    hub.register(connection, chat_ids)
+    try:
+        await connection.run()
+    finally:
+        hub.unregister(connection)
@@ -0,0 +1,45 @@
+from fastapi import Depends, APIRouter, HTTPException, Query
+from typing import Optional
+from controllers.sync_controller import SyncController
+from services.sync_service import CheckpointExpiredError
+from models.sync import SyncOut, SyncRow
+from utils.serialization import json_response
+from api.dependencies import (
+    get_chats_collection,
+    get_users_collection,
+    get_tombstones_collection,
+    get_current_user_id,
+)
+from config import settings
+
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=SyncOut)
+async def sync(
+    since: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    user_id: str = Depends(get_current_user_id),
+    chats_collection=Depends(get_chats_collection),
+    users_collection=Depends(get_users_collection),
+    tombstones_collection=Depends(get_tombstones_collection),
+):
+    """
+    Sincronização incremental do usuário autenticado: chats de que
+    participa, perfis dos participantes e exclusões (deleted) desde o
+    checkpoint since; sem since, devolve tudo.
+
+    Até limit itens por tipo. Com has_more, repita com o checkpoint
+    devolvido; ao final, guarde-o para a próxima reconexão. Checkpoints
+    mais antigos que SYNC_TOMBSTONE_TTL_SECONDS recebem 410 e exigem
+    sincronização completa.
+    """
+    sync_controller = SyncController(chats_collection, users_collection, tombstones_collection)
+    try:
+        page = await sync_controller.sync(user_id, since, limit)
+    except CheckpointExpiredError:
+        raise HTTPException(status_code=410, detail="Checkpoint expired, full sync required")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid checkpoint")
+    return json_response(SyncRow, page)
@@ -1,46 +1,294 @@
-from fastapi import Depends, APIRouter, HTTPException, status
+import math
+from fastapi import Depends, APIRouter, HTTPException, Query, Request, status
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+from datetime import datetime
 from controllers.user_controller import UserController
-from models.user import UserCreate, UserUpdate, UserOut
-from database.mongodb import MongoDB
+from controllers.chat_controller import ChatController
+from controllers.unread_controller import UnreadController
+from models.user import (
+    UserCreate,
+    UserUpdate,
+    UserOut,
+    UserBatchIn,
+    UserListOut,
+    UserOutRow,
+    UserListRow,
+    UserExportRow,
+    DiscoverIn,
+    UserDiscoverRow,
+    UserKeyListOut,
+    UserKeyListRow,
+    PublicKeyIn,
+)
+from models.chat import ChatListOut, ChatListRow
+from models.bulk import BulkIn, BulkOut
+from models.unread import UnreadListOut, UnreadListRow, MarkReadIn
+from utils.bulk import bulk_create
+from utils.serialization import json_response, ndjson_response, ndjson_batches_response
+from utils.http_cache import cached_json_response, conditional_json_response
+from api.dependencies import (
+    get_users_collection,
+    get_chats_collection,
+    get_message_buckets_collection,
+    get_unread_counters_collection,
+    get_tombstones_collection,
+    get_user_loader,
+    get_current_user_id,
+    get_discover_limiter,
+)
+from config import settings
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-
-def get_users_collection():
-    """Dependency para obter a coleção de usuários."""
-    return MongoDB.get_collection("users")
+# Heartbeats gravam last_active_at sem tocar em updated_at: os dois versionam o perfil
+USER_VERSION_FIELDS = ("updated_at", "last_active_at")
 
 
 @router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(user_create: UserCreate, collection=Depends(get_users_collection)):
+async def create_user(user_create: UserCreate, collection=Depends(get_users_collection)):
     user_controller = UserController(collection)
-    user = user_controller.create_user(user_create)
+    try:
+        user = await user_controller.create_user(user_create)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Phone number already registered")
     return UserOut(**user.model_dump())
 
 
+@router.post("/bulk", response_model=BulkOut)
+async def create_users_bulk(bulk: BulkIn, collection=Depends(get_users_collection)):
+    """
+    Cria até MAX_BULK_ITEMS usuários em uma requisição. Itens inválidos ou
+    duplicados não interrompem o lote: o resultado traz id ou erro por item.
+    """
+    if len(bulk.items) > settings.MAX_BULK_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.MAX_BULK_ITEMS} items per request")
+    user_controller = UserController(collection)
+    results, _ = await bulk_create(UserCreate, bulk.items, user_controller.create_users)
+    created = sum(1 for result in results if result["id"] is not None)
+    return BulkOut(created=created, failed=len(results) - created, results=results)
+
+
+async def _load_users(user_ids: list[str], user_loader):
+    if len(user_ids) > settings.MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.MAX_BATCH_IDS} ids per request")
+    users = await user_loader.load_many(dict.fromkeys(user_ids))
+    return json_response(UserListRow, {"users": [user for user in users if user]})
+
+
+@router.get("", response_model=UserListOut)
+async def get_users(ids: str = Query(..., min_length=1), user_loader=Depends(get_user_loader)):
+    """Busca em lote: GET /users?ids=a,b,c, na ordem pedida (inexistentes são omitidos)."""
+    return await _load_users([user_id for user_id in ids.split(",") if user_id], user_loader)
+
+
+@router.post("/batch", response_model=UserListOut)
+async def get_users_batch(batch: UserBatchIn, user_loader=Depends(get_user_loader)):
+    """Busca em lote via corpo da requisição, para conjuntos grandes de IDs."""
+    return await _load_users(batch.ids, user_loader)
+
+
+async def _load_keys(user_ids: list[str], collection) -> list[dict]:
+    if len(user_ids) > settings.MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.MAX_BATCH_IDS} ids per request")
+    user_controller = UserController(collection)
+    return await user_controller.get_public_keys(user_ids)
+
+
+@router.get("/keys", response_model=UserKeyListOut)
+async def get_public_keys(request: Request, ids: str = Query(..., min_length=1), collection=Depends(get_users_collection)):
+    """
+    Diretório de chaves públicas: GET /users/keys?ids=a,b,c devolve id,
+    public_key e key_version na ordem pedida (inexistentes são omitidos).
+    ETag forte e Cache-Control permitem guardar a resposta e revalidar com
+    If-None-Match (304 sem corpo).
+    """
+    keys = await _load_keys([user_id for user_id in ids.split(",") if user_id], collection)
+    return cached_json_response(request, UserKeyListRow, {"keys": keys}, settings.KEYS_CACHE_CONTROL)
+
+
+@router.post("/keys", response_model=UserKeyListOut)
+async def get_public_keys_batch(batch: UserBatchIn, collection=Depends(get_users_collection)):
+    """
+    Diretório de chaves públicas via corpo da requisição, para conjuntos
+    grandes de IDs. Sem ETag: respostas a POST não são revalidadas (304).
+    """
+    keys = await _load_keys(batch.ids, collection)
+    return json_response(UserKeyListRow, {"keys": keys})
+
+
+@router.post("/discover")
+async def discover_users(
+    discover_in: DiscoverIn,
+    caller_id: str = Depends(get_current_user_id),
+    limiter=Depends(get_discover_limiter),
+    collection=Depends(get_users_collection),
+):
+    """
+    Descoberta de contatos: recebe hashes de telefone (SHA-256 de
+    PHONE_HASH_SALT + número em E.164) e devolve em NDJSON, em streaming,
+    id, public_key e phone_hash dos usuários cadastrados.
+
+    Exige token de acesso de um usuário cadastrado; cada hash consome a
+    cota do chamador (DISCOVER_QUOTA_HASHES por DISCOVER_QUOTA_WINDOW_SECONDS).
+    """
+    if len(discover_in.hashes) > settings.DISCOVER_MAX_HASHES:
+        raise HTTPException(status_code=422, detail=f"At most {settings.DISCOVER_MAX_HASHES} hashes per request")
+    user_controller = UserController(collection)
+    # A cota é por usuário cadastrado: ids inventados não ganham cotas novas
+    if await user_controller.get_user_document(caller_id) is None:
+        raise HTTPException(status_code=401, detail="Unknown user", headers={"WWW-Authenticate": "Bearer"})
+    wait = limiter.acquire(caller_id, len(set(discover_in.hashes)))
+    if wait:
+        headers = {"Retry-After": str(math.ceil(wait))} if math.isfinite(wait) else None
+        raise HTTPException(status_code=429, detail="Discovery quota exceeded", headers=headers)
+    batches = user_controller.discover_users(discover_in.hashes, settings.DISCOVER_CHUNK_SIZE)
+    return ndjson_batches_response(UserDiscoverRow, batches)
+
+
+@router.get("/export")
+async def export_users(
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=settings.MAX_EXPORT_BATCH_SIZE),
+    after_id: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    updated_until: Optional[datetime] = None,
+    collection=Depends(get_users_collection),
+):
+    """
+    Exporta todos os usuários em NDJSON (um JSON por linha), em ordem de _id.
+    Para retomar, passe em after_id o último id recebido.
+    """
+    user_controller = UserController(collection)
+    try:
+        cursor = user_controller.export_users(batch_size, after_id, updated_since, updated_until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid after_id")
+    return ndjson_response(UserExportRow, cursor, batch_size)
+
+
+@router.get("/search", response_model=UserListOut)
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    collection=Depends(get_users_collection),
+):
+    """
+    Busca de usuários por prefixo do nome, sem diferenciar maiúsculas nem
+    acentos. Nomes que começam com q vêm antes dos que só têm uma palavra
+    começando com q.
+    """
+    user_controller = UserController(collection)
+    users = await user_controller.search_users(q, limit)
+    return json_response(UserListRow, {"users": users})
+
+
 @router.get("/{user_id}", response_model=UserOut)
-def get_user(user_id: str, collection=Depends(get_users_collection)):
+async def get_user(user_id: str, request: Request, collection=Depends(get_users_collection)):
+    """
+    Perfil do usuário, com ETag e Last-Modified. Revalidações
+    (If-None-Match/If-Modified-Since) em dia recebem 304, sem serializar o
+    documento, que normalmente já vem do cache de perfis.
+    """
     user_controller = UserController(collection)
-    user = user_controller.get_user(user_id)
+    user = await user_controller.get_user_document(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserOut(**user.model_dump())
+    return conditional_json_response(request, UserOutRow, user, settings.RESOURCE_CACHE_CONTROL, USER_VERSION_FIELDS)
+
+
+@router.post("/{user_id}/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
+async def heartbeat(user_id: str, collection=Depends(get_users_collection)):
+    """Marca o usuário como ativo agora; gravado em lote pelo buffer de presença."""
+    user_controller = UserController(collection)
+    if not await user_controller.heartbeat(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return None
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(user_id: str, user_update: UserUpdate, collection=Depends(get_users_collection)):
+async def update_user(user_id: str, user_update: UserUpdate, collection=Depends(get_users_collection)):
     user_controller = UserController(collection)
-    user = user_controller.update_user(user_id, user_update)
+    user = await user_controller.update_user(user_id, user_update)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return UserOut(**user.model_dump())
 
 
-@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: str, collection=Depends(get_users_collection)):
+@router.put("/{user_id}/public-key", response_model=UserOut)
+async def rotate_public_key(
+    user_id: str,
+    key_in: PublicKeyIn,
+    caller_id: str = Depends(get_current_user_id),
+    collection=Depends(get_users_collection),
+):
+    """
+    Troca a chave pública (E2EE) do próprio usuário autenticado; key_version
+    sobe quando a chave muda.
+    """
+    if caller_id != user_id:
+        raise HTTPException(status_code=403, detail="Cannot change another user's key")
     user_controller = UserController(collection)
-    deleted = user_controller.delete_user(user_id)
+    user = await user_controller.rotate_public_key(user_id, key_in.public_key)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return json_response(UserOutRow, user)
+
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user(
+    user_id: str,
+    collection=Depends(get_users_collection),
+    tombstones_collection=Depends(get_tombstones_collection),
+):
+    user_controller = UserController(collection, tombstones_collection)
+    deleted = await user_controller.delete_user(user_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="User not found")
     return None
+
+
+@router.get("/{user_id}/chats", response_model=ChatListOut)
+async def list_user_chats(
+    user_id: str,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    collection=Depends(get_chats_collection),
+):
+    """Caixa de entrada: chats do usuário ordenados por atividade recente."""
+    chat_controller = ChatController(collection)
+    try:
+        chats, next_cursor = await chat_controller.list_user_chats(user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return json_response(ChatListRow, {"chats": chats, "next_cursor": next_cursor})
+
+
+@router.get("/{user_id}/unread", response_model=UnreadListOut)
+async def list_unread(
+    user_id: str,
+    counters_collection=Depends(get_unread_counters_collection),
+    buckets_collection=Depends(get_message_buckets_collection),
+):
+    """Contadores de não lidas do usuário (apenas chats com mensagens não lidas)."""
+    unread_controller = UnreadController(counters_collection, buckets_collection)
+    counters = await unread_controller.list_user_counters(user_id)
+    return json_response(UnreadListRow, {"chats": counters, "total": sum(counter["count"] for counter in counters)})
+
+
+@router.post("/{user_id}/unread/read", status_code=status.HTTP_204_NO_CONTENT)
+async def mark_read(
+    user_id: str,
+    mark_read_in: MarkReadIn,
+    counters_collection=Depends(get_unread_counters_collection),
+    buckets_collection=Depends(get_message_buckets_collection),
+):
+    """
+    Confirmação de leitura em lote: marca cada chat como lido até a mensagem
+    (created_at) informada em up_to.
+    """
+    if len(mark_read_in.reads) > settings.MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.MAX_BATCH_IDS} chats per request")
+    unread_controller = UnreadController(counters_collection, buckets_collection)
+    await unread_controller.mark_read(user_id, [(read.chat_id, read.up_to) for read in mark_read_in.reads])
+    return None
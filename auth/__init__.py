@@ -0,0 +1,4 @@
+from .tokens import check_secret_key, create_access_token, verify_access_token
+
+
+__all__ = ["check_secret_key", "create_access_token", "verify_access_token"]
@@ -0,0 +1,20 @@
+"""
+Emite um token de acesso (auth.tokens) para um usuário:
+
+    python -m auth <user_id> [--ttl SECONDS]
+"""
+import argparse
+
+from auth.tokens import create_access_token
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m auth", description="Emite um token de acesso para um usuário.")
+    parser.add_argument("user_id")
+    parser.add_argument("--ttl", type=int, default=None, help="validade em segundos (padrão ACCESS_TOKEN_TTL_SECONDS)")
+    args = parser.parse_args()
+    print(create_access_token(args.user_id, args.ttl))
+
+
+if __name__ == "__main__":
+    main()
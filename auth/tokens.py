@@ -0,0 +1,62 @@
+"""
+Tokens de acesso assinados com SECRET_KEY.
+
+Os tokens são emitidos pelo serviço de login (verificação de telefone), que
+compartilha SECRET_KEY com a API; para integrações e operação, também pela
+linha de comando:
+
+    python -m auth <user_id> [--ttl SECONDS]
+"""
+import base64
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+from config import settings
+
+
+# Valores vazios ou de exemplo não assinam tokens: qualquer um poderia gerá-los
+_PLACEHOLDER_KEYS = {"", "change-me"}
+_TESTING_KEY = "testing-secret"
+
+
+def _secret_key() -> bytes:
+    key = settings.SECRET_KEY
+    if key in _PLACEHOLDER_KEYS:
+        if not settings.TESTING:
+            raise RuntimeError("SECRET_KEY is not set")
+        key = _TESTING_KEY
+    return key.encode()
+
+
+def check_secret_key() -> None:
+    '''Falha (RuntimeError) se SECRET_KEY não foi configurada; chamada no startup.'''
+    _secret_key()
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_secret_key(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def create_access_token(user_id: str, ttl_seconds: Optional[int] = None) -> str:
+    '''
+    Gera um token assinado (HMAC-SHA256) no formato "<user_id>.<exp>.<assinatura>".
+    '''
+    expires_at = int(time.time()) + (ttl_seconds or settings.ACCESS_TOKEN_TTL_SECONDS)
+    payload = f"{user_id}.{expires_at}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_access_token(token: str) -> Optional[str]:
+    '''Retorna o user_id do token, ou None se a assinatura é inválida ou expirou.'''
+    try:
+        user_id, expires_at, signature = token.rsplit(".", 2)
+        expired = int(expires_at) < time.time()
+    except (ValueError, AttributeError):
+        return None
+    if expired or not hmac.compare_digest(signature, _sign(f"{user_id}.{expires_at}")):
+        return None
+    return user_id
+
@@ -0,0 +1,54 @@
+"""
+Vazão de importação de usuários: POST /users/ item a item contra
+POST /users/bulk, em processo, contra o MongoDB configurado no .env.
+
+Uso:
+    python -m benchmarks.bench_bulk --users 5000 --batch 1000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from database.mongodb import MongoDB
+from main import app
+
+
+def _user(prefix: str, i: int) -> dict:
+    return {"display_name": f"Bulk {i}", "public_key": f"key_{i}", "phone_number": f"+{prefix}{i:08d}"}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        prefix = uuid.uuid4().int % 10**6
+        start = time.perf_counter()
+        for i in range(args.users):
+            await client.post("/users/", json=_user(f"1{prefix}", i))
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, args.users, args.batch):
+            items = [_user(f"2{prefix}", i) for i in range(offset, min(offset + args.batch, args.users))]
+            response = await client.post("/users/bulk", json={"items": items})
+            assert response.json()["failed"] == 0
+        bulk = time.perf_counter() - start
+
+    print(f"POST /users/       {args.users / single:10.0f} usuários/s")
+    print(f"POST /users/bulk   {args.users / bulk:10.0f} usuários/s ({single / bulk:.1f}x)")
+
+    # Remove os usuários criados pelo benchmark
+    users = MongoDB.get_async_collection("users")
+    await users.delete_many({"phone_number": {"$regex": f"^\\+[12]{prefix}"}})
+    await MongoDB.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
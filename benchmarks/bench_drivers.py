@@ -0,0 +1,81 @@
+"""
+Compara requisições/segundo entre MONGO_DRIVER=async e MONGO_DRIVER=sync.
+
+Roda a aplicação em processo (httpx + ASGITransport) contra o MongoDB
+configurado no .env, com N clientes concorrentes disparando
+GET /users/{id}/chats. A caixa de entrada sempre consulta o MongoDB; GET
+/users/{id} seria servido pelo cache LRU de perfis e não mediria o driver.
+
+Uso:
+    python -m benchmarks.bench_drivers --concurrency 500 --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from config import settings
+from main import app
+
+
+async def _seed_user(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/users/",
+        json={
+            "display_name": "Bench User",
+            "public_key": "bench_public_key",
+            "phone_number": "+5500000000000",
+        },
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def _seed_chat(client: httpx.AsyncClient, user_id: str) -> str:
+    response = await client.post(
+        "/chats/",
+        json={"type": "group", "participant_ids": [user_id, "bench_peer"]},
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def run_driver(driver: str, concurrency: int, total_requests: int) -> float:
+    settings.MONGO_DRIVER = driver
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        user_id = await _seed_user(client)
+        chat_id = await _seed_chat(client, user_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(total_requests):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.get(f"/users/{user_id}/chats")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        await client.delete(f"/chats/{chat_id}")
+        await client.delete(f"/users/{user_id}")
+    return total_requests / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--drivers", default="sync,async")
+    args = parser.parse_args()
+
+    for driver in args.drivers.split(","):
+        rps = await run_driver(driver, args.concurrency, args.requests)
+        print(f"{driver:>5}: {rps:10.1f} req/s ({args.concurrency} clientes concorrentes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Carga do hub de tempo real: conexões por worker e latência de entrega.
+
+Registra N conexões em memória (sockets falsos, sem rede) distribuídas em
+chats de tamanho fixo, publica eventos e mede a latência publicação ->
+escrita no socket (p50/p95/p99) e a memória por conexão (tracemalloc).
+Isola o custo do fan-out do hub; o custo de rede do servidor ASGI fica de fora.
+
+Uso:
+    python -m benchmarks.bench_realtime --connections 10000 --chat-size 50
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.common import format_latencies
+from services.realtime_hub import InMemoryBroker, RealtimeConnection, RealtimeHub
+
+
+class TimingWebSocket:
+    def __init__(self, latencies: list[float]):
+        self._latencies = latencies
+
+    async def send_text(self, text: str) -> None:
+        sent_at = float(text[text.index(":") + 1:-1])
+        self._latencies.append(time.perf_counter() - sent_at)
+
+    async def receive_text(self) -> str:
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--chat-size", type=int, default=50)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+
+    hub = RealtimeHub(InMemoryBroker())
+    latencies: list[float] = []
+    chat_count = max(1, args.connections // args.chat_size)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tasks = []
+    for i in range(args.connections):
+        connection = RealtimeConnection(TimingWebSocket(latencies), f"user{i}", args.queue_size)
+        hub.register(connection, [f"chat{i % chat_count}"])
+        tasks.append(asyncio.create_task(connection.run()))
+    await asyncio.sleep(0)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for n in range(args.events):
+        await hub.publish(f"chat{n % chat_count}", {"t": time.perf_counter()})
+        await asyncio.sleep(0)
+    while len(latencies) < args.events * args.chat_size and time.perf_counter() - start < 30:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    await hub.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"conexões:           {args.connections} em {chat_count} chats")
+    print(f"memória/conexão:    {(after - before) / args.connections / 1024:.1f} KiB")
+    print(f"entregas:           {len(latencies)} em {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+    print(f"latência:           {format_latencies(latencies)}")
+    print(f"desconexões por fila cheia: {hub.stats()['dropped_connections']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Micro-benchmarks de serialização dos modelos (models/), sem banco e sem HTTP.
+
+Para cada recurso compara o caminho pelos modelos Pydantic (documento ->
+modelo -> modelo de saída -> JSON, como as rotas faziam antes das rows) com
+as rows compiladas (documento -> JSON), conferindo que o JSON é o mesmo.
+Aceita --save/--baseline/--threshold como a suíte (benchmarks.suite).
+
+Uso:
+    python -m benchmarks.bench_serialization --items 100 --iterations 2000
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from benchmarks.common import (
+    compare_to_baseline,
+    measure_alloc_sync,
+    print_results,
+    save_results,
+    summarize,
+    time_sync,
+)
+from models.chat import Chat, ChatOut, ChatPageOut, ChatPageRow, ChatSummary, ChatListOut, ChatListRow
+from models.message import Message, MessageOut, MessagePageOut, MessagePageRow
+from models.user import User, UserOut, UserListOut, UserListRow
+from utils.serialization import dump_json
+
+
+def _with_str_id(document: dict) -> dict:
+    return {**document, "_id": str(document["_id"])}
+
+
+def _dump_model(model) -> bytes:
+    return model.model_dump_json(by_alias=True).encode()
+
+
+def _cases(items: int) -> dict:
+    now = datetime.now(timezone.utc)
+    participants = [str(ObjectId()) for _ in range(3)]
+    users = [
+        {"_id": ObjectId(), "display_name": f"User {i}", "public_key": "key", "avatar_url": None,
+         "created_at": now, "updated_at": now, "last_active_at": now}
+        for i in range(items)
+    ]
+    chats = [
+        {"_id": ObjectId(), "type": "group", "participant_ids": participants,
+         "created_at": now, "updated_at": now, "last_message_at": now}
+        for _ in range(items)
+    ]
+    messages = [
+        {"_id": ObjectId(), "chat_id": "c", "sender_id": participants[0], "content": f"mensagem {i}", "created_at": now}
+        for i in range(items)
+    ]
+
+    return {
+        "users/modelos": lambda: _dump_model(UserListOut(users=[
+            UserOut(**User(**_with_str_id(user)).model_dump()) for user in users
+        ])),
+        "users/rows": lambda: dump_json(UserListRow, {"users": users}),
+        "chats/modelos": lambda: _dump_model(ChatPageOut(chats=[
+            ChatOut(**Chat(**_with_str_id(chat)).model_dump()) for chat in chats
+        ], next_cursor=None)),
+        "chats/rows": lambda: dump_json(ChatPageRow, {"chats": chats, "next_cursor": None}),
+        "inbox/modelos": lambda: _dump_model(ChatListOut(chats=[
+            ChatSummary(**_with_str_id(chat)) for chat in chats
+        ], next_cursor=None)),
+        "inbox/rows": lambda: dump_json(ChatListRow, {"chats": chats, "next_cursor": None}),
+        "messages/modelos": lambda: _dump_model(MessagePageOut(messages=[
+            MessageOut(**Message(**_with_str_id(message)).model_dump()) for message in messages
+        ], next_cursor=None)),
+        "messages/rows": lambda: dump_json(MessagePageRow, {"messages": messages, "next_cursor": None}),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="itens por página/lista")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--alloc-iterations", type=int, default=100)
+    parser.add_argument("--save", default="")
+    parser.add_argument("--baseline", default="")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cases = _cases(args.items)
+    for name in cases:
+        if name.endswith("/modelos"):
+            resource = name.split("/")[0]
+            assert json.loads(cases[name]()) == json.loads(cases[f"{resource}/rows"]()), resource
+
+    results = {}
+    for name, func in cases.items():
+        time_sync(lambda i: func(), 20)
+        latencies, elapsed = time_sync(lambda i: func(), args.iterations)
+        alloc = measure_alloc_sync(lambda i: func(), args.alloc_iterations)
+        results[f"{args.items}/{name}"] = summarize(latencies, elapsed, alloc)
+    print_results(results)
+
+    if args.save:
+        save_results(args.save, results, {"items": args.items, "iterations": args.iterations})
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
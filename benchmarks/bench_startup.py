@@ -0,0 +1,154 @@
+"""
+Benchmark de cold start: importação de main:app e tempo até a primeira resposta 200.
+
+Cada rodada é um processo Python novo que importa main, roda (com --lifespan)
+o startup da aplicação e atende GET / direto pela interface ASGI, sem
+servidor HTTP, como um worker recém-criado. O tempo "ready" vai do spawn do
+processo até a resposta. Antes das rodadas, `python -X importtime` lista os
+pacotes e módulos mais caros da importação.
+
+Com --save grava os resultados como baseline; com --baseline compara como a
+suíte (benchmarks.suite). Termina com código 1 se o p50 de "ready" passar de
+--target-ms.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 10 --target-ms 300
+    python -m benchmarks.bench_startup --lifespan  # conecta no MongoDB do .env
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import compare_to_baseline, print_results, save_results, summarize
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado em um processo novo a cada rodada. time.monotonic() usa o mesmo
+# relógio do sistema nos dois processos, então o pai calcula spawn -> 200.
+CHILD = """
+import asyncio, json, sys, time
+start = time.monotonic()
+from main import app
+imported = time.monotonic()
+
+
+async def first_response():
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    assert status == [200], status
+    return time.monotonic()
+
+
+async def run(lifespan):
+    if not lifespan:
+        return await first_response()
+    async with app.router.lifespan_context(app):
+        return await first_response()
+
+
+ready = asyncio.run(run(sys.argv[1] == "1"))
+print(json.dumps({"start": start, "imported": imported, "ready": ready}))
+"""
+
+
+def import_report(top: int) -> None:
+    '''Resumo do `python -X importtime -c "import main"`: tempo próprio por pacote e por módulo.'''
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+
+    packages: dict[str, int] = defaultdict(int)
+    for self_us, _, name in modules:
+        packages[name.split(".")[0]] += self_us
+    total = sum(packages.values())
+    print(f"importação de main: {total / 1000:.1f} ms (soma do tempo próprio de {len(modules)} módulos)")
+    print(f"\n{'pacote':40} {'ms':>9}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:40} {self_us / 1000:9.1f}")
+    print(f"\n{'módulo':60} {'próprio ms':>11} {'acumulado ms':>13}")
+    for self_us, cumulative_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"{name:60} {self_us / 1000:11.1f} {cumulative_us / 1000:13.1f}")
+    print()
+
+
+def measure(runs: int, lifespan: bool) -> dict[str, list[float]]:
+    '''Latências (s) por fase: importação, primeira requisição e spawn -> 200.'''
+    phases: dict[str, list[float]] = defaultdict(list)
+    # A primeira rodada aquece __pycache__ e o cache de disco e é descartada
+    for run in range(runs + 1):
+        spawn = time.monotonic()
+        completed = subprocess.run(
+            [sys.executable, "-c", CHILD, "1" if lifespan else "0"],
+            cwd=ROOT_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr)
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        if run == 0:
+            continue
+        phases["import"].append(timings["imported"] - timings["start"])
+        phases["first_request"].append(timings["ready"] - timings["imported"])
+        phases["ready"].append(timings["ready"] - spawn)
+    return phases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--lifespan", action="store_true", help="roda o startup (MongoDB, índices, hub) antes da requisição")
+    parser.add_argument("--top", type=int, default=15, help="linhas do relatório do importtime")
+    parser.add_argument("--target-ms", type=float, default=300, help="meta para o p50 de spawn -> 200")
+    parser.add_argument("--save", default="")
+    parser.add_argument("--baseline", default="")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    import_report(args.top)
+    phases = measure(args.runs, args.lifespan)
+    results = {f"startup/{phase}": summarize(latencies, 0) for phase, latencies in phases.items()}
+    print_results(results)
+
+    if args.save:
+        save_results(args.save, results, {"runs": args.runs, "lifespan": args.lifespan, "python": sys.version.split()[0]})
+    failed = False
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}")
+        failed = bool(regressions)
+    ready_ms = results["startup/ready"]["p50_ms"]
+    print(f"\nspawn -> 200 (p50): {ready_ms:.1f} ms, meta {args.target_ms:.0f} ms")
+    if ready_ms > args.target_ms:
+        print("ACIMA DA META")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Latência de PUT /users/{id} e PUT /chats/{id}.
+
+Compara o caminho atual (find_one_and_update, um round trip) com o
+anterior (update_one seguido de find_one) contra o MongoDB configurado no
+.env, e mede o endpoint completo em processo. O cenário de PUT /chats
+alterna type entre tipos de grupo (um round trip, sem participant_key);
+tornar um chat privado sem informar participant_ids é o único caminho que
+lê os participantes antes da escrita.
+
+Uso:
+    python -m benchmarks.bench_updates --iterations 2000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+from bson import ObjectId
+
+from benchmarks.common import format_latencies, time_async
+from database.mongodb import MongoDB
+from main import app
+
+
+async def _legacy_update(collection, document_id, fields: dict) -> dict:
+    '''Caminho anterior: escrita e releitura em dois round trips.'''
+    fields = {**fields, "updated_at": datetime.now(timezone.utc)}
+    await collection.update_one({"_id": document_id}, {"$set": fields})
+    return await collection.find_one({"_id": document_id})
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        user_id = (await client.post("/users/", json={
+            "display_name": "Bench User", "public_key": "bench_key", "phone_number": "+5500000000001",
+        })).json()["id"]
+        chat_id = (await client.post("/chats/", json={
+            "type": "group", "participant_ids": [user_id, "bench"],
+        })).json()["id"]
+
+        scenarios = {
+            "PUT /users/{id}": lambda i: client.put(f"/users/{user_id}", json={"display_name": f"Bench {i}"}),
+            "PUT /chats/{id}": lambda i: client.put(f"/chats/{chat_id}", json={"type": f"group{i % 2}"}),
+        }
+        for name, request in scenarios.items():
+            print(f"{name:24} {format_latencies((await time_async(request, args.iterations))[0])}")
+
+        users = MongoDB.get_async_collection("users")
+        chats = MongoDB.get_async_collection("chats")
+        legacy = {
+            "users legado (2 RTT)": lambda i: _legacy_update(users, ObjectId(user_id), {"display_name": f"L{i}"}),
+            "chats legado (2 RTT)": lambda i: _legacy_update(chats, ObjectId(chat_id), {"type": f"group{i % 2}"}),
+        }
+        for name, update in legacy.items():
+            print(f"{name:24} {format_latencies((await time_async(update, args.iterations))[0])}")
+
+        await client.delete(f"/chats/{chat_id}")
+        await client.delete(f"/users/{user_id}")
+    await MongoDB.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Falha (exit 1) quando alguma consulta quente cai em COLLSCAN.
+
+Executa explain() das consultas usadas pelos services contra o MongoDB
+configurado no .env (mongomock não implementa explain), depois de
+reconciliar os índices declarados nos modelos.
+
+Uso:
+    python -m benchmarks.check_query_plans
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from database.indexes import ensure_indexes
+from database.mongodb import MongoDB
+
+
+# (nome, coleção, filtro, ordenação) das consultas de caminho quente
+HOT_QUERIES = [
+    ("chats_by_participant", "chats", {"participant_ids": "user"}, None),
+    ("user_inbox_first_page", "chats", {"participant_ids": "user"}, [("last_message_at", -1), ("_id", -1)]),
+    (
+        "user_inbox_next_page",
+        "chats",
+        {"participant_ids": "user", "$or": [
+            {"last_message_at": {"$lt": datetime.now(timezone.utc)}},
+            {"last_message_at": datetime.now(timezone.utc), "_id": {"$lt": ObjectId()}},
+            {"last_message_at": None},
+        ]},
+        [("last_message_at", -1), ("_id", -1)],
+    ),
+    ("chats_page", "chats", {"_id": {"$gt": ObjectId()}}, [("_id", 1)]),
+    ("message_open_bucket", "message_buckets", {"chat_id": "chat", "count": {"$lt": 100}}, [("seq", -1)]),
+    ("message_history", "message_buckets", {"chat_id": "chat", "first_at": {"$lte": datetime.now(timezone.utc)}}, [("first_at", -1)]),
+    ("user_by_id", "users", {"_id": ObjectId()}, None),
+    ("user_by_phone", "users", {"phone_number": "+5500000000000"}, None),
+    ("user_search_name_prefix", "users", {"search_key": {"$gte": "jo", "$lt": "jp"}}, [("search_key", 1)]),
+    ("user_search_word_prefix", "users", {"search_tokens": {"$elemMatch": {"$gte": "si", "$lt": "sj"}}}, None),
+    ("sync_chats", "chats", {"participant_ids": "user", "updated_at": {"$gt": datetime.now(timezone.utc)}}, [("updated_at", 1), ("_id", 1)]),
+    ("sync_users", "users", {"_id": {"$in": [ObjectId()]}, "updated_at": {"$gt": datetime.now(timezone.utc)}}, [("updated_at", 1), ("_id", 1)]),
+    (
+        "sync_tombstones",
+        "tombstones",
+        {"$or": [{"participant_ids": "user"}, {"kind": "user", "entity_id": {"$in": ["user"]}}], "deleted_at": {"$gt": datetime.now(timezone.utc)}},
+        [("deleted_at", 1), ("_id", 1)],
+    ),
+]
+
+
+def _stages(plan: dict):
+    '''Percorre recursivamente os estágios de um plano de execução.'''
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan", "winningPlan"):
+        yield from _stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def check_query_plans() -> list[str]:
+    await ensure_indexes()
+    failures = []
+    for name, collection_name, query, sort in HOT_QUERIES:
+        cursor = MongoDB.get_async_collection(collection_name).find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(50).explain()
+        stages = list(_stages(explain["queryPlanner"]["winningPlan"]))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{name:32} {status:8} {' <- '.join(stages)}")
+        if status == "COLLSCAN":
+            failures.append(name)
+    return failures
+
+
+async def main() -> None:
+    try:
+        failures = await check_query_plans()
+    finally:
+        await MongoDB.close()
+    if failures:
+        print(f"Consultas com COLLSCAN: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Utilitários compartilhados pelos benchmarks."""
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Optional
+
+
+def percentile(values: list[float], q: int) -> float:
+    '''Percentil q (1-99) de uma amostra.'''
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def format_latencies(latencies: list[float]) -> str:
+    '''Resumo p50/p95/p99 em milissegundos.'''
+    return " / ".join(f"{percentile(latencies, q) * 1000:.2f}" for q in (50, 95, 99)) + " ms (p50/p95/p99)"
+
+
+def summarize(latencies: list[float], elapsed: float, alloc_bytes: Optional[float] = None) -> dict:
+    '''Resultado de um cenário: latências em ms, vazão e alocação média por chamada.'''
+    result = {
+        "iterations": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+        "ops_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+    if alloc_bytes is not None:
+        result["alloc_kib"] = round(alloc_bytes / 1024, 2)
+    return result
+
+
+async def time_async(func: Callable[[int], Awaitable], iterations: int) -> tuple[list[float], float]:
+    '''Executa func(i) em sequência; retorna as latências e o tempo total.'''
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        await func(i)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def time_sync(func: Callable[[int], object], iterations: int) -> tuple[list[float], float]:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+async def measure_alloc_async(func: Callable[[int], Awaitable], iterations: int) -> float:
+    '''
+    Pico médio de memória alocada por chamada (tracemalloc), em bytes.
+    Roda separado da medição de tempo, já que o tracemalloc deixa tudo mais lento.
+    '''
+    tracemalloc.start()
+    total = 0
+    try:
+        for i in range(iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await func(i)
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return total / iterations if iterations else 0.0
+
+
+def measure_alloc_sync(func: Callable[[int], object], iterations: int) -> float:
+    tracemalloc.start()
+    total = 0
+    try:
+        for i in range(iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func(i)
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return total / iterations if iterations else 0.0
+
+
+def print_results(results: dict[str, dict]) -> None:
+    print(f"{'cenário':40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'KiB/op':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:40} {result['p50_ms']:9.3f} {result['p95_ms']:9.3f} {result['p99_ms']:9.3f}"
+            f" {result['ops_per_s']:10.1f} {result.get('alloc_kib', 0):9.2f}"
+        )
+
+
+def save_results(path: str, results: dict[str, dict], meta: dict) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results: dict[str, dict], baseline_path: str, threshold: float) -> list[str]:
+    '''
+    Compara com uma baseline salva por save_results. Retorna as regressões
+    acima de threshold (ex.: 0.2 = 20%) em p50/p95 ou na alocação por chamada.
+    '''
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = json.load(file)["results"]
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "alloc_kib"):
+            before, after = previous.get(metric), result.get(metric)
+            if before and after is not None and after > before * (1 + threshold):
+                regressions.append(f"{name} {metric}: {before:.3f} -> {after:.3f} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
@@ -0,0 +1,216 @@
+"""
+Suíte de benchmarks dos caminhos quentes da API.
+
+Roda a aplicação em processo (httpx + ASGITransport) contra um MongoDB em
+memória (mongomock, como nos testes) ou, com --mongo-uri, contra um mongod
+local (banco descartável "talkhub_bench"). Para cada tamanho de base em
+--chats, popula usuários/chats/mensagens e mede latência (p50/p95/p99),
+vazão e alocação por requisição (tracemalloc, em uma passada separada).
+
+Com --save grava os resultados como baseline; com --baseline compara e
+termina com código 1 se algum cenário regredir mais que --threshold.
+
+Uso:
+    python -m benchmarks.suite --chats 1000,10000 --iterations 500 --save baseline.json
+    python -m benchmarks.suite --chats 1000,10000 --baseline baseline.json --threshold 0.2
+    python -m benchmarks.suite --mongo-uri mongodb://localhost:27017 --chats 1000000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import platform
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+
+MESSAGES_PER_CHAT = 20
+
+
+def _configure(mongo_uri: str):
+    '''Aponta a aplicação para o banco do benchmark; retorna a função que dá as coleções.'''
+    from config import Settings
+
+    if mongo_uri:
+        os.environ["MONGO_DRIVER"] = "async"
+        Settings.MONGO_URI = mongo_uri
+        Settings.MONGO_DRIVER = "async"
+        Settings.MONGO_DB_NAME = "talkhub_bench"
+        from database.mongodb import MongoDB
+        return MongoDB.get_async_collection
+
+    # Mesmo arranjo dos testes: mongomock síncrono executado no threadpool
+    from mongomock import MongoClient as MockMongoClient
+    from database.mongodb import MongoDB
+    from database.threaded import ThreadedCollection
+
+    Settings.MONGO_DRIVER = "sync"
+    database = MockMongoClient()["talkhub_bench"]
+    MongoDB.get_collection = staticmethod(lambda name: database[name])
+    return lambda name: ThreadedCollection(database[name])
+
+
+async def _seed(get_collection, chat_count: int) -> dict:
+    '''Popula a base diretamente no banco (insert_many), fora da medição.'''
+    for name in ("users", "chats", "message_buckets"):
+        await get_collection(name).delete_many({})
+    now = datetime.now(timezone.utc)
+    user_count = max(100, chat_count // 10)
+    users = [
+        {
+            "_id": ObjectId(),
+            "display_name": f"User {i}",
+            "public_key": f"key_{i}",
+            "phone_number": f"+55{i:011d}",
+            "phone_verified": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(user_count)
+    ]
+    user_ids = [str(user["_id"]) for user in users]
+    for offset in range(0, user_count, 10000):
+        await get_collection("users").insert_many(users[offset:offset + 10000])
+
+    rng = random.Random(42)
+    for offset in range(0, chat_count, 10000):
+        chats = []
+        for i in range(offset, min(offset + 10000, chat_count)):
+            chats.append({
+                "type": "group" if i % 4 == 0 else "private",
+                "participant_ids": rng.sample(user_ids, 3 if i % 4 == 0 else 2),
+                "created_at": now,
+                "updated_at": now,
+                "last_message_at": now - timedelta(seconds=i),
+            })
+        await get_collection("chats").insert_many(chats)
+
+    chat = await get_collection("chats").find_one({})
+    messages = [
+        {"_id": ObjectId(), "sender_id": chat["participant_ids"][0], "content": f"msg {i}", "created_at": now + timedelta(milliseconds=i)}
+        for i in range(MESSAGES_PER_CHAT)
+    ]
+    await get_collection("message_buckets").insert_one({
+        "chat_id": str(chat["_id"]),
+        "seq": 0,
+        "bucket_key": f"{chat['_id']}:0",
+        "count": len(messages),
+        "first_at": messages[0]["created_at"],
+        "last_at": messages[-1]["created_at"],
+        "messages": messages,
+    })
+    # Usuário com mais chats, para a caixa de entrada ter páginas cheias
+    busiest = await (await get_collection("chats").aggregate([
+        {"$unwind": "$participant_ids"},
+        {"$group": {"_id": "$participant_ids", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 1},
+    ])).to_list(1)
+    return {"user_ids": user_ids, "chat_id": str(chat["_id"]), "inbox_user_id": busiest[0]["_id"]}
+
+
+def _scenarios(client, seed: dict) -> dict:
+    user_ids = seed["user_ids"]
+    chat_id = seed["chat_id"]
+    # Telefones únicos entre aquecimento, medição e passada de alocação
+    phone_prefix = random.randrange(10**6)
+    phone_numbers = (f"+9{phone_prefix}{n:09d}" for n in itertools.count())
+
+    async def check(request):
+        response = await request
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url}: {response.status_code} {response.text}")
+        return response
+
+    async def list_chats_second_page(i):
+        first = await check(client.get("/chats/", params={"limit": 50}))
+        await check(client.get("/chats/", params={"limit": 50, "cursor": first.json()["next_cursor"]}))
+
+    return {
+        "create_user": lambda i: check(client.post("/users/", json={
+            "display_name": f"Bench {i}", "public_key": "bench", "phone_number": next(phone_numbers),
+        })),
+        "get_user": lambda i: check(client.get(f"/users/{user_ids[i % len(user_ids)]}")),
+        "get_users_batch": lambda i: check(client.get("/users", params={"ids": ",".join(user_ids[:50])})),
+        "update_user": lambda i: check(client.put(f"/users/{user_ids[i % len(user_ids)]}", json={"display_name": f"Renamed {i}"})),
+        "create_chat": lambda i: check(client.post("/chats/", json={"type": "private", "participant_ids": user_ids[i % len(user_ids):][:2] or user_ids[:2]})),
+        "list_chats": lambda i: check(client.get("/chats/", params={"limit": 50})),
+        "list_chats_page_2": list_chats_second_page,
+        "list_chats_by_participant": lambda i: check(client.get("/chats/", params={"participant_id": user_ids[i % len(user_ids)]})),
+        "user_inbox": lambda i: check(client.get(f"/users/{seed['inbox_user_id']}/chats", params={"limit": 50})),
+        "list_messages": lambda i: check(client.get(f"/chats/{chat_id}/messages", params={"limit": 50})),
+    }
+
+
+async def run(args) -> dict:
+    get_collection = _configure(args.mongo_uri)
+    import httpx
+    from benchmarks.common import measure_alloc_async, summarize, time_async
+    from database.indexes import ensure_indexes
+    from main import app
+
+    await ensure_indexes(get_collection)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for chat_count in args.chats:
+            print(f"populando {chat_count} chats...", file=sys.stderr)
+            seed = await _seed(get_collection, chat_count)
+            scenarios = _scenarios(client, seed)
+            selected = args.scenarios or list(scenarios)
+            for name in selected:
+                scenario = scenarios[name]
+                await time_async(scenario, args.warmup)
+                latencies, elapsed = await time_async(scenario, args.iterations)
+                alloc = await measure_alloc_async(scenario, min(args.iterations, args.alloc_iterations))
+                results[f"{chat_count}/{name}"] = summarize(latencies, elapsed, alloc)
+                print(f"  {name}: {results[f'{chat_count}/{name}']['p50_ms']:.2f} ms p50", file=sys.stderr)
+
+    if args.mongo_uri:
+        from database.mongodb import MongoDB
+        await MongoDB.get_async_client().drop_database("talkhub_bench")
+        await MongoDB.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", default="1000", help="tamanhos da base, separados por vírgula (ex.: 1000,100000,1000000)")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alloc-iterations", type=int, default=50)
+    parser.add_argument("--scenarios", default="", help="subconjunto de cenários, separados por vírgula")
+    parser.add_argument("--mongo-uri", default="", help="usa um mongod em vez do mongomock")
+    parser.add_argument("--save", default="", help="grava os resultados como baseline JSON")
+    parser.add_argument("--baseline", default="", help="compara com uma baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regressão tolerada (0.2 = 20%%)")
+    args = parser.parse_args()
+    args.chats = [int(size) for size in args.chats.split(",") if size]
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+
+    # Sem logs por requisição durante a medição
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from benchmarks.common import compare_to_baseline, print_results, save_results
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.save:
+        save_results(args.save, results, {
+            "backend": "mongod" if args.mongo_uri else "mongomock",
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+        })
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSÃO {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"sem regressões acima de {args.threshold * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,3 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
 import os
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
@@ -14,24 +12,121 @@ class Settings:
     MONGO_PASSWORD: str = os.getenv("MONGO_PASSWORD", "")
     MONGO_CLUSTER: str = os.getenv("MONGO_CLUSTER", "")
     MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "testdb")
+    # URI completa (ex.: mongodb://localhost:27017); tem precedência sobre host/usuário/senha
+    MONGO_URI: str = os.getenv("MONGO_URI", "")
+    # "async" usa o AsyncMongoClient; "sync" mantém o pymongo síncrono no threadpool
+    MONGO_DRIVER: str = os.getenv("MONGO_DRIVER", "async")
+
+    # Reconcilia os índices declarados nos modelos no startup da aplicação
+    MONGO_ENSURE_INDEXES: bool = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
+    # Pool de conexões (um único cliente por worker)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+    # Lista separada por vírgulas, ex.: "zstd,snappy,zlib"
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
 
     @classmethod
     def get_mongo_uri(cls) -> str:
+        if cls.MONGO_URI:
+            return cls.MONGO_URI
         password_encoded = quote_plus(cls.MONGO_PASSWORD)
         return f"mongodb+srv://{cls.MONGO_USERNAME}:{password_encoded}@{cls.MONGO_HOST}?appname={cls.MONGO_CLUSTER}"
+
+    @classmethod
+    def get_mongo_client_options(cls) -> dict:
+        options = {"maxPoolSize": cls.MONGO_MAX_POOL_SIZE, "minPoolSize": cls.MONGO_MIN_POOL_SIZE}
+        # 0 significa "sem limite": não repassa para manter o padrão do driver
+        if cls.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+            options["waitQueueTimeoutMS"] = cls.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        if cls.MONGO_MAX_IDLE_TIME_MS:
+            options["maxIdleTimeMS"] = cls.MONGO_MAX_IDLE_TIME_MS
+        if cls.MONGO_COMPRESSORS:
+            options["compressors"] = cls.MONGO_COMPRESSORS
+        return options
     
-    ALLOWED_ORIGINS: list = os.getenv("ALLOWED_ORIGINS", "").split(",")
+    # Quantidade máxima de mensagens por documento de bucket
+    MESSAGE_BUCKET_SIZE: int = int(os.getenv("MESSAGE_BUCKET_SIZE", "100"))
 
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Tempo real (WebSocket): broker entre workers ("memory" ou "mongo", que
+    # exige MONGO_DRIVER=async) e tamanho da fila de envio por conexão antes
+    # de desconectar o cliente lento
+    REALTIME_BROKER: str = os.getenv("REALTIME_BROKER", "memory")
+    REALTIME_SEND_QUEUE_SIZE: int = int(os.getenv("REALTIME_SEND_QUEUE_SIZE", "256"))
 
+    # Máximo de IDs aceitos em uma busca em lote (GET /users?ids=)
+    MAX_BATCH_IDS: int = int(os.getenv("MAX_BATCH_IDS", "500"))
 
-settings = Settings()
+    # Chaves públicas podem ficar em cache por tempo indeterminado, mas
+    # sempre revalidadas (If-None-Match), para nunca cifrar com chave trocada
+    KEYS_CACHE_CONTROL: str = os.getenv("KEYS_CACHE_CONTROL", "public, no-cache")
+    # GET /users/{id} e /chats/{id}: ETag e Last-Modified a partir de updated_at
+    RESOURCE_CACHE_CONTROL: str = os.getenv("RESOURCE_CACHE_CONTROL", "no-cache")
+
+    # Cache de leitura dos perfis de usuário (UserService)
+    USER_CACHE_BACKEND: str = os.getenv("USER_CACHE_BACKEND", "memory")
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "100000"))
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+    USER_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+
+    # Buffer de presença: heartbeats (last_active_at) gravados em lote a cada intervalo,
+    # ou antes, quando o número de usuários pendentes chega ao máximo
+    PRESENCE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("PRESENCE_FLUSH_INTERVAL_SECONDS", "5"))
+    PRESENCE_MAX_PENDING: int = int(os.getenv("PRESENCE_MAX_PENDING", "10000"))
+
+    # Paginação por cursor: limite padrão e teto rígido por página
+    DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", "100"))
 
+    # Máximo de itens por requisição de criação em lote (POST /users/bulk, /chats/bulk)
+    MAX_BULK_ITEMS: int = int(os.getenv("MAX_BULK_ITEMS", "1000"))
 
-def get_mongo_client() -> MongoClient:
-    uri = settings.get_mongo_uri()
-    client = MongoClient(uri, server_api=ServerApi('1'))
-    return client
+    # Exportação NDJSON (GET /users/export, GET /chats/export): documentos por lote do cursor
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    MAX_EXPORT_BATCH_SIZE: int = int(os.getenv("MAX_EXPORT_BATCH_SIZE", "10000"))
 
+    # Descoberta de contatos (POST /users/discover): sal do hash dos telefones,
+    # compartilhado com os clientes; hashes por requisição e por consulta $in;
+    # cota de hashes por chamador, reposta ao longo da janela
+    PHONE_HASH_SALT: str = os.getenv("PHONE_HASH_SALT", "talkhub")
+    DISCOVER_MAX_HASHES: int = int(os.getenv("DISCOVER_MAX_HASHES", "10000"))
+    DISCOVER_CHUNK_SIZE: int = int(os.getenv("DISCOVER_CHUNK_SIZE", "1000"))
+    DISCOVER_QUOTA_HASHES: int = int(os.getenv("DISCOVER_QUOTA_HASHES", "50000"))
+    DISCOVER_QUOTA_WINDOW_SECONDS: float = float(os.getenv("DISCOVER_QUOTA_WINDOW_SECONDS", "3600"))
 
-mongo_client = get_mongo_client()
+    # Sincronização incremental (GET /sync): tombstones de exclusões expiram
+    # após o TTL (checkpoints mais antigos exigem sincronização completa) e
+    # mudanças mais recentes que SYNC_SETTLE_SECONDS ficam para a próxima
+    # chamada, para não pular escritas ainda em andamento
+    SYNC_TOMBSTONE_TTL_SECONDS: int = int(os.getenv("SYNC_TOMBSTONE_TTL_SECONDS", "2592000"))
+    SYNC_SETTLE_SECONDS: float = float(os.getenv("SYNC_SETTLE_SECONDS", "1"))
+
+    # Assinatura dos tokens de acesso (auth.tokens). Obrigatória fora dos
+    # testes: a aplicação não sobe sem ela
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "")
+    TESTING: bool = os.getenv("TESTING", "false").lower() == "true"
+    ACCESS_TOKEN_TTL_SECONDS: int = int(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "86400"))
+
+    ALLOWED_ORIGINS: list = os.getenv("ALLOWED_ORIGINS", "").split(",")
+
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+
+    # Profiling sob demanda (desligado por padrão): requisições com o cabeçalho
+    # X-Profile igual a PROFILING_ADMIN_TOKEN, ou 1 a cada PROFILING_SAMPLE_EVERY
+    # (0 desliga), são amostradas e gravadas em PROFILING_DIR, mantendo no
+    # máximo PROFILING_MAX_FILES perfis ("speedscope" ou "collapsed")
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_ADMIN_TOKEN: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_SAMPLE_EVERY: int = int(os.getenv("PROFILING_SAMPLE_EVERY", "0"))
+    PROFILING_INTERVAL_SECONDS: float = float(os.getenv("PROFILING_INTERVAL_SECONDS", "0.001"))
+    PROFILING_FORMAT: str = os.getenv("PROFILING_FORMAT", "speedscope")
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "profiles")
+    PROFILING_MAX_FILES: int = int(os.getenv("PROFILING_MAX_FILES", "50"))
+
+    # Métricas (middleware HTTP, listener de comandos do MongoDB e GET /metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+
+settings = Settings()
@@ -1,5 +1,8 @@
 from .user_controller import UserController
 from .chat_controller import ChatController
+from .message_controller import MessageController
+from .unread_controller import UnreadController
+from .sync_controller import SyncController
 
 
-__all__ = ["UserController", "ChatController"]
\ No newline at end of file
+__all__ = ["UserController", "ChatController", "MessageController", "UnreadController", "SyncController"]
\ No newline at end of file
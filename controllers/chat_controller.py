@@ -1,23 +1,57 @@
-from services.chat_service import ChatService
+from services.chat_service import ChatService, CHAT_READ_PROJECTION, CHAT_VERSION_PROJECTION
 from models.chat import ChatCreate, ChatUpdate, Chat
 from typing import Optional
+from datetime import datetime
 
 
 class ChatController:
-    def __init__(self, collection):
-        self.chat_service = ChatService(collection)
+    def __init__(self, collection, tombstones_collection=None):
+        self.chat_service = ChatService(collection, tombstones_collection)
 
-    def create_chat(self, chat_create: ChatCreate) -> Chat:
-        return self.chat_service.create_chat(chat_create)
+    async def create_chat(self, chat_create: ChatCreate) -> tuple[Chat, bool]:
+        return await self.chat_service.create_chat(chat_create)
     
-    def get_chat(self, chat_id: str) -> Optional[Chat]:
-        return self.chat_service.get_chat_by_id(chat_id)        
+    async def create_chats(self, chat_creates: list[ChatCreate]) -> list[tuple[Optional[str], Optional[str]]]:
+        return await self.chat_service.create_chats(chat_creates)
+
+    async def get_chat(self, chat_id: str) -> Optional[Chat]:
+        return await self.chat_service.get_chat_by_id(chat_id)        
+
+    async def get_chat_document(self, chat_id: str) -> Optional[dict]:
+        return await self.chat_service.get_chat_document(chat_id, CHAT_READ_PROJECTION)
+
+    async def get_chat_version(self, chat_id: str) -> Optional[dict]:
+        """Só _id e updated_at do chat, para revalidar uma cópia em cache do cliente."""
+        return await self.chat_service.get_chat_document(chat_id, CHAT_VERSION_PROJECTION)
     
-    def update_chat(self, chat_id: str, chat_update: ChatUpdate) -> Optional[Chat]:
-        return self.chat_service.update_chat(chat_id, chat_update)
+    async def update_chat(self, chat_id: str, chat_update: ChatUpdate) -> Optional[Chat]:
+        return await self.chat_service.update_chat(chat_id, chat_update)
+
+    async def delete_chat(self, chat_id: str) -> bool:
+        return await self.chat_service.delete_chat(chat_id)
+
+    async def list_chats(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        chat_type: Optional[str] = None,
+        participant_id: Optional[str] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        return await self.chat_service.list_chats(limit, cursor, chat_type, participant_id)
+
+    def export_chats(
+        self,
+        batch_size: int,
+        after_id: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        updated_until: Optional[datetime] = None,
+    ):
+        return self.chat_service.export_chats(batch_size, after_id, updated_since, updated_until)
 
-    def delete_chat(self, chat_id: str) -> bool:
-        return self.chat_service.delete_chat(chat_id)
+    async def list_user_chat_ids(self, user_id: str) -> list[str]:
+        return await self.chat_service.list_user_chat_ids(user_id)
 
-    def list_chats(self) -> list[Chat]:
-        return self.chat_service.list_chats()
\ No newline at end of file
+    async def list_user_chats(
+        self, user_id: str, limit: int, cursor: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        return await self.chat_service.list_user_chats(user_id, limit, cursor)
\ No newline at end of file
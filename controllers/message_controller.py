@@ -0,0 +1,19 @@
+from services.message_service import MessageService
+from models.message import MessageCreate, Message
+from typing import Optional
+
+
+class MessageController:
+    def __init__(self, buckets_collection, chats_collection, counters_collection=None):
+        self.message_service = MessageService(buckets_collection, chats_collection, counters_collection)
+
+    async def send_message(self, chat_id: str, message_create: MessageCreate) -> Optional[Message]:
+        return await self.message_service.send_message(chat_id, message_create)
+
+    async def list_messages(
+        self, chat_id: str, limit: int, before: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        return await self.message_service.list_messages(chat_id, limit, before)
+
+    async def delete_chat_messages(self, chat_id: str) -> int:
+        return await self.message_service.delete_chat_messages(chat_id)
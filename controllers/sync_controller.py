@@ -0,0 +1,10 @@
+from services.sync_service import SyncService
+from typing import Optional
+
+
+class SyncController:
+    def __init__(self, chats_collection, users_collection, tombstones_collection):
+        self.sync_service = SyncService(chats_collection, users_collection, tombstones_collection)
+
+    async def sync(self, user_id: str, checkpoint: Optional[str], limit: int) -> dict:
+        return await self.sync_service.sync(user_id, checkpoint, limit)
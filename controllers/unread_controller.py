@@ -0,0 +1,16 @@
+from services.unread_service import UnreadService
+from datetime import datetime
+
+
+class UnreadController:
+    def __init__(self, counters_collection, buckets_collection):
+        self.unread_service = UnreadService(counters_collection, buckets_collection)
+
+    async def list_user_counters(self, user_id: str) -> list[dict]:
+        return await self.unread_service.list_user_counters(user_id)
+
+    async def mark_read(self, user_id: str, reads: list[tuple[str, datetime]]) -> int:
+        return await self.unread_service.mark_read(user_id, reads)
+
+    async def delete_chat_counters(self, chat_id: str) -> int:
+        return await self.unread_service.delete_chat_counters(chat_id)
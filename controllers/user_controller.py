@@ -1,20 +1,77 @@
-from services.user_service import UserService
+from services.user_service import CachedUserService, get_user_cache
+from services.presence import get_presence_buffer
 from models.user import UserCreate, UserUpdate, User
-from typing import Optional
+from typing import AsyncIterator, Optional
+from datetime import datetime, timezone
 
 
 class UserController:
-    def __init__(self, collection):
-        self.user_service = UserService(collection)
+    def __init__(self, collection, tombstones_collection=None):
+        self.user_service = CachedUserService(collection, get_user_cache(), tombstones_collection)
+        self.presence = get_presence_buffer()
 
-    def create_user(self, user_create: UserCreate) -> User:
-        return self.user_service.create_user(user_create)
+    async def create_user(self, user_create: UserCreate) -> User:
+        return await self.user_service.create_user(user_create)
     
-    def get_user(self, user_id: str) -> Optional[User]:
-        return self.user_service.get_user_by_id(user_id)        
+    async def create_users(self, user_creates: list[UserCreate]) -> list[tuple[Optional[str], Optional[str]]]:
+        return await self.user_service.create_users(user_creates)
+
+    async def get_user(self, user_id: str) -> Optional[User]:
+        user = await self.user_service.get_user_by_id(user_id)
+        return self._merge_presence(user)
     
-    def update_user(self, user_id: str, user_update: UserUpdate) -> Optional[User]:
-        return self.user_service.update_user(user_id, user_update)
+    async def get_user_document(self, user_id: str) -> Optional[dict]:
+        return self.presence.merge(user_id, await self.user_service.get_user_document(user_id))
+
+    async def get_user_documents(self, user_ids: list[str]) -> dict[str, dict]:
+        documents = await self.user_service.get_user_documents(user_ids)
+        return {user_id: self.presence.merge(user_id, document) for user_id, document in documents.items()}
+
+    async def search_users(self, query: str, limit: int) -> list[dict]:
+        documents = await self.user_service.search_users(query, limit)
+        return [self.presence.merge(str(document["_id"]), document) for document in documents]
+
+    async def get_public_keys(self, user_ids: list[str]) -> list[dict]:
+        return await self.user_service.get_public_keys(user_ids)
+
+    def discover_users(self, phone_hashes: list[str], chunk_size: int) -> AsyncIterator[list[dict]]:
+        return self.user_service.discover_users(phone_hashes, chunk_size)
+
+    async def update_user(self, user_id: str, user_update: UserUpdate) -> Optional[User]:
+        # last_active_at é heartbeat: vai para o buffer de presença em vez de uma escrita própria
+        last_active_at = user_update.last_active_at
+        if last_active_at is not None:
+            user_update = user_update.model_copy(update={"last_active_at": None})
+        user = await self.user_service.update_user(user_id, user_update)
+        if user is not None and last_active_at is not None:
+            self.presence.record(user_id, last_active_at)
+        return self._merge_presence(user)
+
+    async def rotate_public_key(self, user_id: str, public_key: str) -> Optional[dict]:
+        return self.presence.merge(user_id, await self.user_service.rotate_public_key(user_id, public_key))
+
+    async def heartbeat(self, user_id: str) -> bool:
+        """Registra atividade do usuário agora. Retorna False se o usuário não existe."""
+        if await self.user_service.get_user_document(user_id) is None:
+            return False
+        self.presence.record(user_id, datetime.now(timezone.utc))
+        return True
+
+    async def delete_user(self, user_id: str) -> bool:
+        return await self.user_service.delete_user(user_id)
+
+    def export_users(
+        self,
+        batch_size: int,
+        after_id: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        updated_until: Optional[datetime] = None,
+    ):
+        return self.user_service.export_users(batch_size, after_id, updated_since, updated_until)
 
-    def delete_user(self, user_id: str) -> bool:
-        return self.user_service.delete_user(user_id)
+    def _merge_presence(self, user: Optional[User]) -> Optional[User]:
+        if user is None:
+            return None
+        presence = {"last_active_at": user.last_active_at}
+        merged = self.presence.merge(user.id, presence)
+        return user if merged is presence else user.model_copy(update=merged)
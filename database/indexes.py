@@ -0,0 +1,100 @@
+"""
+Reconciliação declarativa dos índices do MongoDB.
+
+Os índices são declarados junto aos modelos (USER_INDEXES, CHAT_INDEXES...) e
+aplicados de forma idempotente no startup ou via linha de comando:
+
+    python -m database.indexes [--prune]
+"""
+import argparse
+import asyncio
+
+from pymongo import IndexModel
+
+from database.mongodb import MongoDB
+from models.chat import CHAT_INDEXES
+from models.message import MESSAGE_BUCKET_INDEXES
+from models.sync import TOMBSTONE_INDEXES
+from models.unread import UNREAD_COUNTER_INDEXES
+from models.user import USER_INDEXES
+
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": USER_INDEXES,
+    "chats": CHAT_INDEXES,
+    "message_buckets": MESSAGE_BUCKET_INDEXES,
+    "unread_counters": UNREAD_COUNTER_INDEXES,
+    "tombstones": TOMBSTONE_INDEXES,
+}
+
+# Opções que diferenciam dois índices com a mesma chave
+_INDEX_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "collation")
+
+
+def _index_spec(index: dict) -> tuple:
+    key = tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                for field, direction in dict(index["key"]).items())
+    options = tuple((option, index[option]) for option in _INDEX_OPTIONS if index.get(option))
+    return key, options
+
+
+async def ensure_collection_indexes(collection, indexes: list[IndexModel], prune: bool = False) -> dict[str, list[str]]:
+    '''
+    Cria os índices ausentes, recria os que mudaram de definição e, com prune,
+    remove índices não declarados. Retorna os nomes afetados por ação.
+    '''
+    existing = {index["name"]: index async for index in await collection.list_indexes()}
+    report: dict[str, list[str]] = {"created": [], "rebuilt": [], "dropped": [], "unchanged": []}
+
+    to_create = []
+    for model in indexes:
+        document = model.document
+        name = document["name"]
+        current = existing.get(name)
+        if current is None:
+            to_create.append(model)
+            report["created"].append(name)
+        elif _index_spec(current) != _index_spec(document):
+            await collection.drop_index(name)
+            to_create.append(model)
+            report["rebuilt"].append(name)
+        else:
+            report["unchanged"].append(name)
+
+    if prune:
+        declared = {model.document["name"] for model in indexes}
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                await collection.drop_index(name)
+                report["dropped"].append(name)
+
+    if to_create:
+        await collection.create_indexes(to_create)
+    return report
+
+
+async def ensure_indexes(get_collection=None, prune: bool = False) -> dict[str, dict[str, list[str]]]:
+    '''Reconcilia os índices de todas as coleções declaradas em INDEXES.'''
+    get_collection = get_collection or MongoDB.get_async_collection
+    return {
+        name: await ensure_collection_indexes(get_collection(name), indexes, prune=prune)
+        for name, indexes in INDEXES.items()
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconcilia os índices do MongoDB.")
+    parser.add_argument("--prune", action="store_true", help="remove índices não declarados")
+    args = parser.parse_args()
+    try:
+        report = await ensure_indexes(prune=args.prune)
+    finally:
+        await MongoDB.close()
+    for collection_name, actions in report.items():
+        for action, names in actions.items():
+            for name in names:
+                print(f"{collection_name}.{name}: {action}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+"""
+Migrações de dados, idempotentes e retomáveis, executadas via linha de comando:
+
+    python -m database.migrations participant_keys
+    python -m database.migrations user_search_keys
+    python -m database.migrations user_phone_hashes
+"""
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from config import settings
+from database.indexes import ensure_collection_indexes
+from database.mongodb import MongoDB
+from models.chat import CHAT_INDEXES
+from models.user import USER_INDEXES
+from services.chat_service import participant_key
+from services.message_service import bucket_key
+from utils.phone import hash_phone_number
+from utils.search import search_fields
+
+
+async def _merge_buckets(buckets_collection, chat_id: str, merged_chat_id: str) -> None:
+    '''
+    Reescreve os buckets dos dois chats como buckets de chat_id, em ordem de
+    created_at. Depois de uma fusão, os buckets se sobrepõem no tempo, e o
+    histórico (MessageService.list_messages) supõe buckets sem sobreposição;
+    os seq dos dois chats também colidiriam no índice bucket_key_unique.
+    '''
+    buckets = await buckets_collection.find(
+        {"chat_id": {"$in": [chat_id, merged_chat_id]}}, {"chat_id": 1, "seq": 1, "messages": 1}
+    ).to_list(None)
+    messages = sorted(
+        (message for bucket in buckets for message in bucket["messages"]),
+        key=lambda message: (message["created_at"], message["_id"]),
+    )
+    # Novos seq acima dos atuais de chat_id: os antigos ainda existem até o delete
+    first_seq = max((bucket.get("seq", -1) for bucket in buckets if bucket["chat_id"] == chat_id), default=-1) + 1
+    size = settings.MESSAGE_BUCKET_SIZE
+    rewritten = [
+        {
+            "chat_id": chat_id,
+            "seq": first_seq + index,
+            "bucket_key": bucket_key(chat_id, first_seq + index),
+            "messages": chunk,
+            "count": len(chunk),
+            "first_at": chunk[0]["created_at"],
+            "last_at": chunk[-1]["created_at"],
+        }
+        for index, chunk in enumerate(messages[offset:offset + size] for offset in range(0, len(messages), size))
+    ]
+    # Grava os novos antes de apagar os antigos (por _id): uma interrupção duplica, não perde
+    if rewritten:
+        await buckets_collection.insert_many(rewritten)
+    await buckets_collection.delete_many({"_id": {"$in": [bucket["_id"] for bucket in buckets]}})
+
+
+async def backfill_participant_keys(chats_collection, buckets_collection) -> dict[str, int]:
+    '''
+    Preenche participant_key nos chats privados antigos e funde os duplicados.
+
+    Os chats sem chave são percorridos em ordem de _id: o primeiro de cada
+    par de participantes recebe a chave; os seguintes batem no índice único
+    e são fundidos nele (buckets de mensagens movidos, last_message_at pelo
+    maior valor) e apagados. Pode ser interrompida e executada de novo;
+    rode com o envio de mensagens parado, já que os buckets dos chats
+    fundidos são reescritos.
+    '''
+    # O índice único é o que detecta os duplicados
+    await ensure_collection_indexes(chats_collection, CHAT_INDEXES)
+    report = {"keyed": 0, "merged": 0}
+    cursor = chats_collection.find(
+        {"type": "private", "participant_key": {"$exists": False}},
+        {"type": 1, "participant_ids": 1, "last_message_at": 1},
+    ).sort("_id", 1)
+    async for chat in cursor:
+        key = participant_key(chat["type"], chat["participant_ids"])
+        try:
+            await chats_collection.update_one({"_id": chat["_id"]}, {"$set": {"participant_key": key}})
+            report["keyed"] += 1
+            continue
+        except DuplicateKeyError:
+            pass
+
+        keeper = await chats_collection.find_one({"participant_key": key}, {"last_message_at": 1})
+        await _merge_buckets(buckets_collection, str(keeper["_id"]), str(chat["_id"]))
+        last_message_at = chat.get("last_message_at")
+        if last_message_at is not None and (keeper.get("last_message_at") is None or last_message_at > keeper["last_message_at"]):
+            await chats_collection.update_one({"_id": keeper["_id"]}, {"$set": {"last_message_at": last_message_at}})
+        await chats_collection.delete_one({"_id": chat["_id"]})
+        report["merged"] += 1
+    return report
+
+
+async def _bulk_update(users_collection, operations: list, report: dict[str, int]) -> None:
+    # Conflitos no índice único (ex.: telefones antigos que só diferem na
+    # formatação geram o mesmo phone_hash) ficam no relatório sem abortar a migração
+    try:
+        await users_collection.bulk_write(operations, ordered=False)
+        report["updated"] += len(operations)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        report["updated"] += len(operations) - len(errors)
+        report["conflicts"] += len(errors)
+
+
+async def _backfill_users(users_collection, query: dict, fields, batch_size: int) -> dict[str, int]:
+    '''Aplica $set com fields(usuário) nos usuários de query, um bulk_write a cada batch_size.'''
+    report = {"updated": 0, "conflicts": 0}
+    cursor = users_collection.find(query, {"display_name": 1, "phone_number": 1}).batch_size(batch_size)
+    operations = []
+    async for user in cursor:
+        operations.append(UpdateOne({"_id": user["_id"]}, {"$set": fields(user)}))
+        if len(operations) >= batch_size:
+            await _bulk_update(users_collection, operations, report)
+            operations = []
+    if operations:
+        await _bulk_update(users_collection, operations, report)
+    return report
+
+
+async def backfill_user_search_keys(users_collection, batch_size: int = 1000) -> dict[str, int]:
+    '''Preenche search_key/search_tokens dos usuários criados antes da busca.'''
+    return await _backfill_users(
+        users_collection,
+        {"search_key": {"$exists": False}},
+        lambda user: search_fields(user.get("display_name") or ""),
+        batch_size,
+    )
+
+
+async def backfill_user_phone_hashes(users_collection, batch_size: int = 1000) -> dict[str, int]:
+    '''
+    Preenche phone_hash dos usuários criados antes da descoberta de contatos.
+    Usuários cujo hash já pertence a outro (mesmo telefone com outra
+    formatação) ficam sem hash e são contados em conflicts.
+    '''
+    # O índice único é o que detecta os conflitos
+    await ensure_collection_indexes(users_collection, USER_INDEXES)
+    return await _backfill_users(
+        users_collection,
+        {"phone_hash": {"$exists": False}, "phone_number": {"$type": "string"}},
+        lambda user: {"phone_hash": hash_phone_number(user["phone_number"])},
+        batch_size,
+    )
+
+
+MIGRATIONS = {
+    "participant_keys": lambda: backfill_participant_keys(
+        MongoDB.get_async_collection("chats"), MongoDB.get_async_collection("message_buckets")
+    ),
+    "user_search_keys": lambda: backfill_user_search_keys(MongoDB.get_async_collection("users")),
+    "user_phone_hashes": lambda: backfill_user_phone_hashes(MongoDB.get_async_collection("users")),
+}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Executa uma migração de dados.")
+    parser.add_argument("name", choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+    try:
+        report = await MIGRATIONS[args.name]()
+    finally:
+        await MongoDB.close()
+    for action, count in report.items():
+        print(f"{args.name}.{action}: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,19 +1,94 @@
+from typing import TYPE_CHECKING
+
+from anyio import to_thread
 from pymongo import MongoClient
+from pymongo.server_api import ServerApi
 from config import settings
+from database.threaded import ThreadedCollection
+from database.monitoring import get_command_metrics
 
+if TYPE_CHECKING:
+    from pymongo import AsyncMongoClient
 
-# Cria o cliente MongoDB usando a URI do config.py
-client = MongoClient(settings.get_mongo_uri())
 
-# Seleciona o banco de dados
-db = client[settings.MONGO_DB_NAME]
+def _client_options() -> dict:
+    options = settings.get_mongo_client_options()
+    if settings.METRICS_ENABLED:
+        options["event_listeners"] = [get_command_metrics()]
+    return options
 
 
 class MongoDB:
     '''
     Classe para interagir com o banco de dados MongoDB.
+
+    Mantém um único cliente por processo, criado sob demanda (ou no lifespan
+    da aplicação via connect) com as opções de pool definidas em Settings.
+    Apenas o cliente do driver ativo (MONGO_DRIVER) é criado.
     '''
+    _client: MongoClient | None = None
+    _async_client: "AsyncMongoClient | None" = None
+
+    @classmethod
+    def get_client(cls) -> MongoClient:
+        if cls._client is None:
+            cls._client = MongoClient(
+                settings.get_mongo_uri(),
+                server_api=ServerApi('1'),
+                **_client_options(),
+            )
+        return cls._client
+
+    @classmethod
+    def get_async_client(cls) -> "AsyncMongoClient":
+        if cls._async_client is None:
+            # Só o driver async usa: não entra no caminho de MONGO_DRIVER=sync
+            from pymongo import AsyncMongoClient
+
+            cls._async_client = AsyncMongoClient(
+                settings.get_mongo_uri(),
+                server_api=ServerApi('1'),
+                **_client_options(),
+            )
+        return cls._async_client
+
     @staticmethod
     def get_collection(collection_name):
-        return db[collection_name]
-    
+        return MongoDB.get_client()[settings.MONGO_DB_NAME][collection_name]
+
+    @staticmethod
+    def get_async_collection(collection_name):
+        '''
+        Retorna a coleção com interface assíncrona usada pelos services.
+
+        Com MONGO_DRIVER=async usa o AsyncMongoClient do pymongo; com
+        MONGO_DRIVER=sync envolve a coleção síncrona em um ThreadedCollection.
+        '''
+        if settings.MONGO_DRIVER == "sync":
+            return ThreadedCollection(MongoDB.get_collection(collection_name))
+        return MongoDB.get_async_client()[settings.MONGO_DB_NAME][collection_name]
+
+    @classmethod
+    async def connect(cls) -> None:
+        '''
+        Cria o cliente do driver ativo e aquece o pool com um ping.
+
+        Nada de rede acontece na importação: o MongoClient síncrono resolve o
+        registro SRV (mongodb+srv) já no construtor, então é criado no
+        threadpool para não bloquear o event loop.
+        '''
+        if settings.MONGO_DRIVER == "sync":
+            client = await to_thread.run_sync(cls.get_client)
+            await to_thread.run_sync(client.admin.command, "ping")
+        else:
+            await cls.get_async_client().admin.command("ping")
+
+    @classmethod
+    async def close(cls) -> None:
+        '''Fecha os clientes abertos; chamado no shutdown da aplicação.'''
+        if cls._async_client is not None:
+            await cls._async_client.close()
+            cls._async_client = None
+        if cls._client is not None:
+            await to_thread.run_sync(cls._client.close)
+            cls._client = None
@@ -0,0 +1,66 @@
+from typing import Optional
+
+from pymongo import monitoring
+
+from utils.metrics import current_request_timings, registry
+
+
+MONGO_COMMAND_DURATION = registry.histogram(
+    "talkhub_mongo_command_duration_seconds",
+    "Duração dos comandos do MongoDB por coleção e comando.",
+    ("collection", "command"),
+)
+MONGO_COMMAND_FAILURES = registry.counter(
+    "talkhub_mongo_command_failures_total",
+    "Comandos do MongoDB que falharam, por coleção e comando.",
+    ("collection", "command"),
+)
+
+
+def _collection_name(event: monitoring.CommandStartedEvent) -> str:
+    command = event.command
+    if event.command_name == "getMore":
+        value = command.get("collection")
+    else:
+        value = command.get(event.command_name)
+    return value if isinstance(value, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    '''
+    Listener de comandos do pymongo: registra a duração de cada comando por
+    coleção e soma o tempo na requisição HTTP corrente (RequestTimings).
+    '''
+    def __init__(self):
+        # request_id do comando -> coleção, do started até o succeeded/failed
+        self._collections: dict[int, str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._collections[event.request_id] = _collection_name(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._record(event)
+        MONGO_COMMAND_FAILURES.inc(collection, event.command_name)
+
+    def _record(self, event) -> str:
+        collection = self._collections.pop(event.request_id, "")
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_DURATION.observe(collection, event.command_name, value=seconds)
+        timings = current_request_timings()
+        if timings is not None:
+            timings.mongo_seconds += seconds
+            timings.mongo_commands += 1
+        return collection
+
+
+_command_metrics: Optional[CommandMetrics] = None
+
+
+def get_command_metrics() -> CommandMetrics:
+    global _command_metrics
+    if _command_metrics is None:
+        _command_metrics = CommandMetrics()
+    return _command_metrics
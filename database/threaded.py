@@ -0,0 +1,124 @@
+import time
+from itertools import islice
+from typing import Any, Optional
+
+from anyio import to_thread
+
+from utils.metrics import current_request_timings, registry
+
+
+THREADPOOL_WAIT = registry.histogram(
+    "talkhub_threadpool_wait_seconds",
+    "Espera na fila do threadpool antes de uma operação do driver síncrono começar.",
+)
+
+
+async def _run(func, *args, **kwargs):
+    submitted = time.perf_counter()
+
+    def call():
+        waited = time.perf_counter() - submitted
+        THREADPOOL_WAIT.observe(value=waited)
+        timings = current_request_timings()
+        if timings is not None:
+            timings.threadpool_wait_seconds += waited
+        return func(*args, **kwargs)
+
+    return await to_thread.run_sync(call)
+
+
+class ThreadedCursor:
+    '''
+    Cursor assíncrono sobre um cursor síncrono do pymongo.
+
+    Cada lote é buscado no threadpool, então a iteração não bloqueia o
+    event loop. Expõe o subconjunto da API do AsyncCursor usado pelos services.
+    '''
+    def __init__(self, cursor, batch_size: int = 100):
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._buffer: list = []
+
+    def sort(self, *args, **kwargs) -> "ThreadedCursor":
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int) -> "ThreadedCursor":
+        self._cursor.limit(limit)
+        return self
+
+    def skip(self, skip: int) -> "ThreadedCursor":
+        self._cursor.skip(skip)
+        return self
+
+    def hint(self, index) -> "ThreadedCursor":
+        self._cursor.hint(index)
+        return self
+
+    def batch_size(self, batch_size: int) -> "ThreadedCursor":
+        self._cursor.batch_size(batch_size)
+        self._batch_size = batch_size
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        items = self._buffer[:length] if length is not None else self._buffer
+        self._buffer = self._buffer[len(items):]
+        remaining = None if length is None else length - len(items)
+        if remaining == 0:
+            return list(items)
+        return list(items) + await _run(lambda: list(islice(self._cursor, remaining)))
+
+    async def explain(self) -> dict:
+        return await _run(self._cursor.explain)
+
+    async def close(self) -> None:
+        await _run(self._cursor.close)
+
+    def __aiter__(self) -> "ThreadedCursor":
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._buffer:
+            self._buffer = await _run(lambda: list(islice(self._cursor, self._batch_size)))
+            if not self._buffer:
+                raise StopAsyncIteration
+        return self._buffer.pop(0)
+
+
+class ThreadedCollection:
+    '''
+    Adapta uma coleção síncrona (pymongo/mongomock) para a interface do
+    AsyncCollection, executando cada operação no threadpool.
+
+    É o caminho usado quando MONGO_DRIVER=sync: o comportamento equivale ao
+    das rotas síncronas, mas os services só precisam de uma implementação.
+    '''
+    def __init__(self, collection):
+        self._collection = collection
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    @property
+    def sync_collection(self):
+        return self._collection
+
+    def find(self, *args, **kwargs) -> ThreadedCursor:
+        return ThreadedCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs) -> ThreadedCursor:
+        return ThreadedCursor(await _run(self._collection.aggregate, *args, **kwargs))
+
+    async def list_indexes(self, *args, **kwargs) -> ThreadedCursor:
+        return ThreadedCursor(await _run(self._collection.list_indexes, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await _run(attr, *args, **kwargs)
+
+        return method
@@ -1,13 +1,47 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from api.dependencies import get_realtime_hub
+from auth.tokens import check_secret_key
 from api.routes.user_routes import router as user_router
 from api.routes.chat_routes import router as chat_router
+from api.routes.message_routes import router as message_router
+from api.routes.realtime_routes import router as realtime_router
+from api.routes.sync_routes import router as sync_router
 from config import settings
+from database.mongodb import MongoDB
+from database.indexes import ensure_indexes
+from services.user_service import get_user_cache
+from services.presence import get_presence_buffer
+
+
+logging.basicConfig(level=settings.LOG_LEVEL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Abre o pool do MongoDB antes de aceitar tráfego e o fecha no shutdown."""
+    # Sem SECRET_KEY qualquer um assinaria tokens: não sobe
+    check_secret_key()
+    await MongoDB.connect()
+    if settings.MONGO_ENSURE_INDEXES:
+        await ensure_indexes()
+    await get_realtime_hub().start()
+    await get_presence_buffer().start()
+    yield
+    # Grava os heartbeats pendentes antes de fechar o cliente
+    await get_presence_buffer().close()
+    await get_realtime_hub().close()
+    await MongoDB.close()
+
 
 app = FastAPI(
     title="TalkHub API",
     description="Backend for TalkHub messaging application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -18,10 +52,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Profiling e métricas só são importados quando habilitados
+if settings.PROFILING_ENABLED:
+    from api.dependencies import get_profile_ring
+    from api.middleware import ProfilingMiddleware
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        ring=get_profile_ring(),
+        admin_token=settings.PROFILING_ADMIN_TOKEN,
+        sample_every=settings.PROFILING_SAMPLE_EVERY,
+        interval=settings.PROFILING_INTERVAL_SECONDS,
+        profile_format=settings.PROFILING_FORMAT,
+    )
+if settings.METRICS_ENABLED:
+    from api.middleware import MetricsMiddleware
+
+    app.add_middleware(MetricsMiddleware)
 
 # Registrar rotas
 app.include_router(user_router)
 app.include_router(chat_router)
+app.include_router(message_router)
+app.include_router(realtime_router)
+app.include_router(sync_router)
+if settings.PROFILING_ENABLED:
+    from api.routes.debug_routes import router as debug_router
+
+    app.include_router(debug_router)
 
 
 @app.get("/")
@@ -37,4 +95,33 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "user_cache": get_user_cache().stats(),
+        "presence": get_presence_buffer().stats(),
+    }
+
+
+def _runtime_stats() -> dict:
+    """Estatísticas do cache, da presença e do hub como gauges do /metrics."""
+    sources = {
+        "user_cache": get_user_cache().stats(),
+        "presence": get_presence_buffer().stats(),
+        "realtime": get_realtime_hub().stats(),
+    }
+    return {
+        f"talkhub_{prefix}_{name}": value
+        for prefix, stats in sources.items()
+        for name, value in stats.items()
+    }
+
+
+if settings.METRICS_ENABLED:
+    from utils.metrics import registry
+
+    registry.add_collector(_runtime_stats)
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        """Métricas no formato texto do Prometheus."""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
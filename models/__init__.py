@@ -1,5 +1,9 @@
-from .user import User, UserCreate, UserUpdate, UserOut
-from .chat import Chat, ChatCreate, ChatUpdate, ChatOut, ChatSummary
+from .user import User, UserCreate, UserUpdate, UserOut, UserListOut
+from .chat import Chat, ChatCreate, ChatUpdate, ChatOut, ChatPageOut, ChatSummary
+from .message import Message, MessageCreate, MessageOut, MessagePageOut
+from .bulk import BulkIn, BulkItemResult, BulkOut
+from .unread import UnreadCounterOut, UnreadListOut, ReadMarker, MarkReadIn
+from .sync import TombstoneOut, SyncOut
 
 
 __all__ = [
@@ -7,9 +11,24 @@ __all__ = [
     "UserCreate",
     "UserUpdate",
     "UserOut",
+    "UserListOut",
     "Chat",
     "ChatCreate",
     "ChatUpdate",
     "ChatOut",
+    "ChatPageOut",
     "ChatSummary",
+    "Message",
+    "MessageCreate",
+    "MessageOut",
+    "MessagePageOut",
+    "BulkIn",
+    "BulkItemResult",
+    "BulkOut",
+    "UnreadCounterOut",
+    "UnreadListOut",
+    "ReadMarker",
+    "MarkReadIn",
+    "TombstoneOut",
+    "SyncOut",
 ]
\ No newline at end of file
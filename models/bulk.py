@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+
+
+class BulkIn(BaseModel):
+    # Itens validados um a um pela rota, para que um item inválido não rejeite o lote
+    items: list[Any]
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkOut(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
@@ -1,7 +1,30 @@
 from pydantic import BaseModel, Field, HttpUrl, ConfigDict, field_serializer
-from typing import Optional
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
 from bson import ObjectId
 from datetime import datetime
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from utils.serialization import IsoDatetime, ObjectIdStr
+
+
+# Índices da coleção "chats", reconciliados por database.indexes.ensure_indexes
+CHAT_INDEXES = [
+    # Multikey: atende buscas por participant_ids e a caixa de entrada ordenada
+    # por atividade recente com desempate por _id (um índice só em
+    # participant_ids seria prefixo redundante deste)
+    IndexModel(
+        [("participant_ids", ASCENDING), ("last_message_at", DESCENDING), ("_id", DESCENDING)],
+        name="participant_ids_last_message_at",
+    ),
+    # Um chat privado por par de participantes (get-or-create em ChatService);
+    # sparse: chats em grupo não têm a chave
+    IndexModel([("participant_key", ASCENDING)], name="participant_key_unique", unique=True, sparse=True),
+    # Chats do usuário alterados desde um checkpoint (GET /sync), em ordem de (updated_at, _id)
+    IndexModel(
+        [("participant_ids", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)],
+        name="participant_ids_updated_at",
+    ),
+]
 
 
 class Chat(BaseModel):
@@ -51,6 +74,11 @@ class ChatOut(BaseModel):
         return value.isoformat()
     
 
+class ChatPageOut(BaseModel):
+    chats: list[ChatOut]
+    next_cursor: Optional[str] = None
+
+
 class ChatSummary(BaseModel):
     id: Optional[str] = Field(default=None, alias="_id", serialization_alias="id")
     type: str
@@ -68,6 +96,7 @@ class ChatSummary(BaseModel):
 
 class ChatListOut(BaseModel):
     chats: list[ChatSummary]
+    next_cursor: Optional[str] = None
 
     model_config = ConfigDict(
         populate_by_name=True
@@ -75,4 +104,39 @@ class ChatListOut(BaseModel):
 
     @field_serializer('chats')
     def serialize_chats(self, value: list[ChatSummary]) -> list[dict]:
-        return [chat.model_dump() for chat in value]
\ No newline at end of file
+        return [chat.model_dump() for chat in value]
+
+
+# Rows: serialização direta documento -> JSON (utils.serialization), com a
+# mesma saída de ChatOut/ChatSummary
+class ChatOutRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    type: str
+    participant_ids: list[str]
+    created_at: IsoDatetime
+
+
+class ChatPageRow(TypedDict):
+    chats: list[ChatOutRow]
+    next_cursor: Optional[str]
+
+
+class ChatSummaryRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    type: str
+    participant_ids: list[str]
+    last_message_at: Annotated[Optional[IsoDatetime], Field(default=None)]
+
+
+class ChatListRow(TypedDict):
+    chats: list[ChatSummaryRow]
+    next_cursor: Optional[str]
+
+
+class ChatExportRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    type: str
+    participant_ids: list[str]
+    created_at: IsoDatetime
+    updated_at: IsoDatetime
+    last_message_at: Annotated[Optional[IsoDatetime], Field(default=None)]
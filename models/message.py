@@ -0,0 +1,75 @@
+from pydantic import BaseModel, Field, ConfigDict, field_serializer
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
+from datetime import datetime
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from utils.serialization import IsoDatetime, ObjectIdStr
+
+
+# Índices da coleção "message_buckets", reconciliados por database.indexes.ensure_indexes
+MESSAGE_BUCKET_INDEXES = [
+    # Atende a leitura do histórico
+    IndexModel([("chat_id", ASCENDING), ("first_at", DESCENDING)], name="chat_id_first_at"),
+    # Atende o envio: bucket aberto mais recente e próximo seq
+    IndexModel([("chat_id", ASCENDING), ("seq", DESCENDING)], name="chat_id_seq"),
+    # "chat_id:seq": envios concorrentes não abrem dois buckets com o mesmo seq.
+    # Esparso: buckets anteriores ao seq não têm a chave
+    IndexModel([("bucket_key", ASCENDING)], name="bucket_key_unique", unique=True, sparse=True),
+]
+
+
+class Message(BaseModel):
+    id: Optional[str] = Field(default=None, alias="_id")
+    chat_id: str
+    sender_id: str
+    content: str  # payload cifrado pelo cliente (E2EE)
+    created_at: datetime
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
+
+    @field_serializer('created_at')
+    def serialize_datetime(self, value: datetime) -> str:
+        return value.isoformat()
+
+
+class MessageCreate(BaseModel):
+    sender_id: str
+    content: str
+
+
+class MessageOut(BaseModel):
+    id: Optional[str] = Field(default=None, alias="_id", serialization_alias="id")
+    chat_id: str
+    sender_id: str
+    content: str
+    created_at: datetime
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
+
+    @field_serializer('created_at')
+    def serialize_datetime(self, value: datetime) -> str:
+        return value.isoformat()
+
+
+class MessagePageOut(BaseModel):
+    messages: list[MessageOut]
+    next_cursor: Optional[str] = None
+
+
+# Rows: serialização direta documento -> JSON (utils.serialization), com a
+# mesma saída de MessageOut
+class MessageOutRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    chat_id: str
+    sender_id: str
+    content: str
+    created_at: IsoDatetime
+
+
+class MessagePageRow(TypedDict):
+    messages: list[MessageOutRow]
+    next_cursor: Optional[str]
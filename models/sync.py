@@ -0,0 +1,65 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
+from datetime import datetime, timezone
+from pymongo import IndexModel, ASCENDING
+from config import settings
+from models.chat import Chat, ChatExportRow
+from models.user import User, UserExportRow
+from utils.serialization import IsoDatetime
+
+
+# Índices da coleção "tombstones", reconciliados por database.indexes.ensure_indexes
+TOMBSTONE_INDEXES = [
+    # Exclusões de chats, vistas pelos participantes (GET /sync)
+    IndexModel(
+        [("participant_ids", ASCENDING), ("deleted_at", ASCENDING), ("_id", ASCENDING)],
+        name="participant_ids_deleted_at",
+    ),
+    # Exclusões de usuários, vistas por quem divide chats com eles
+    IndexModel([("entity_id", ASCENDING), ("deleted_at", ASCENDING)], name="entity_id_deleted_at"),
+    IndexModel([("deleted_at", ASCENDING)], name="deleted_at_ttl", expireAfterSeconds=settings.SYNC_TOMBSTONE_TTL_SECONDS),
+]
+
+
+def new_tombstone(kind: str, entity_id: str, participant_ids: Optional[list[str]] = None) -> dict:
+    '''Documento de "tombstones" registrando a exclusão de um chat ou usuário.'''
+    now = datetime.now(timezone.utc)
+    tombstone = {
+        "kind": kind,
+        "entity_id": entity_id,
+        # O MongoDB armazena milissegundos: trunca para o checkpoint bater com o documento
+        "deleted_at": now.replace(microsecond=now.microsecond // 1000 * 1000),
+    }
+    if participant_ids is not None:
+        tombstone["participant_ids"] = participant_ids
+    return tombstone
+
+
+class TombstoneOut(BaseModel):
+    kind: str  # "chat" ou "user"
+    id: str
+    deleted_at: datetime
+
+
+class SyncOut(BaseModel):
+    chats: list[Chat]
+    users: list[User]
+    deleted: list[TombstoneOut]
+    checkpoint: str
+    has_more: bool
+
+
+# Rows: serialização direta documento -> JSON (utils.serialization)
+class TombstoneRow(TypedDict):
+    kind: str
+    id: Annotated[str, Field(validation_alias="entity_id")]
+    deleted_at: IsoDatetime
+
+
+class SyncRow(TypedDict):
+    chats: list[ChatExportRow]
+    users: list[UserExportRow]
+    deleted: list[TombstoneRow]
+    checkpoint: str
+    has_more: bool
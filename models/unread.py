@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
+from datetime import datetime
+from pymongo import IndexModel, ASCENDING
+from utils.serialization import IsoDatetime
+
+
+# Índices da coleção "unread_counters", reconciliados por database.indexes.ensure_indexes
+UNREAD_COUNTER_INDEXES = [
+    # Um contador por (usuário, chat); o prefixo user_id atende GET /users/{id}/unread
+    IndexModel([("user_id", ASCENDING), ("chat_id", ASCENDING)], name="user_id_chat_id_unique", unique=True),
+]
+
+
+class UnreadCounterOut(BaseModel):
+    chat_id: str
+    count: int
+    last_message_at: Optional[datetime] = None
+
+
+class UnreadListOut(BaseModel):
+    chats: list[UnreadCounterOut]
+    total: int
+
+
+class ReadMarker(BaseModel):
+    chat_id: str
+    # created_at da última mensagem lida no chat
+    up_to: datetime
+
+
+class MarkReadIn(BaseModel):
+    reads: list[ReadMarker]
+
+
+# Rows: serialização direta documento -> JSON (utils.serialization), com a
+# mesma saída de UnreadCounterOut/UnreadListOut
+class UnreadCounterRow(TypedDict):
+    chat_id: str
+    count: int
+    last_message_at: Annotated[Optional[IsoDatetime], Field(default=None)]
+
+
+class UnreadListRow(TypedDict):
+    chats: list[UnreadCounterRow]
+    total: int
@@ -1,13 +1,32 @@
-from pydantic import BaseModel, Field, HttpUrl, ConfigDict, field_serializer
-from typing import Optional
+from pydantic import BaseModel, Field, HttpUrl, ConfigDict, StringConstraints, field_serializer
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
 from bson import ObjectId
 from datetime import datetime
+from pymongo import IndexModel, ASCENDING
+from utils.serialization import IsoDatetime, ObjectIdStr
+
+
+# Índices da coleção "users", reconciliados por database.indexes.ensure_indexes
+USER_INDEXES = [
+    IndexModel([("phone_number", ASCENDING)], name="phone_number_unique", unique=True),
+    # Busca por prefixo (UserService.search_users): nome inteiro e palavras do
+    # display_name normalizados (utils.search)
+    IndexModel([("search_key", ASCENDING)], name="search_key"),
+    IndexModel([("search_tokens", ASCENDING)], name="search_tokens"),
+    # Descoberta de contatos (utils.phone.hash_phone_number); sparse até o backfill
+    IndexModel([("phone_hash", ASCENDING)], name="phone_hash_unique", unique=True, sparse=True),
+    # Perfis alterados desde um checkpoint (GET /sync) e filtros updated_since da exportação
+    IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at"),
+]
 
 
 class User(BaseModel):
     id: Optional[str] = Field(default=None, alias="_id")
     display_name: str
     public_key: str
+    # Incrementado a cada troca de public_key; 0 em usuários anteriores ao campo
+    key_version: int = 0
     avatar_url: Optional[HttpUrl] = None
     created_at: datetime
     updated_at: datetime
@@ -39,17 +58,89 @@ class UserUpdate(BaseModel):
     last_active_at: Optional[datetime] = None
 
 
+class PublicKeyIn(BaseModel):
+    public_key: str
+
+
+class UserBatchIn(BaseModel):
+    ids: list[str]
+
+
+class DiscoverIn(BaseModel):
+    # SHA-256 em hex minúsculo de PHONE_HASH_SALT + telefone em E.164
+    hashes: list[Annotated[str, StringConstraints(pattern=r"^[0-9a-f]{64}$")]]
+
+
 class UserOut(BaseModel):
     id: Optional[str] = Field(default=None, alias="_id", serialization_alias="id")
     display_name: str
     public_key: str
+    key_version: int = 0
     avatar_url: Optional[HttpUrl] = None
     created_at: datetime
+    last_active_at: Optional[datetime] = None
 
     model_config = ConfigDict(
         populate_by_name=True
     )
 
-    @field_serializer('created_at')
-    def serialize_datetime(self, value: datetime) -> str:
-        return value.isoformat()
\ No newline at end of file
+    @field_serializer('created_at', 'last_active_at')
+    def serialize_datetime(self, value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() if value else None
+
+
+class UserListOut(BaseModel):
+    users: list[UserOut]
+
+
+class UserKeyOut(BaseModel):
+    id: str
+    public_key: str
+    key_version: int
+
+
+class UserKeyListOut(BaseModel):
+    keys: list[UserKeyOut]
+
+
+# Rows: serialização direta documento -> JSON (utils.serialization), com a
+# mesma saída de UserOut
+class UserOutRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    display_name: str
+    public_key: str
+    key_version: Annotated[int, Field(default=0)]
+    avatar_url: Annotated[Optional[str], Field(default=None)]
+    created_at: IsoDatetime
+    last_active_at: Annotated[Optional[IsoDatetime], Field(default=None)]
+
+
+class UserListRow(TypedDict):
+    users: list[UserOutRow]
+
+
+class UserExportRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    display_name: str
+    public_key: str
+    key_version: Annotated[int, Field(default=0)]
+    avatar_url: Annotated[Optional[str], Field(default=None)]
+    created_at: IsoDatetime
+    updated_at: IsoDatetime
+    last_active_at: Annotated[Optional[IsoDatetime], Field(default=None)]
+
+
+class UserDiscoverRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    public_key: str
+    phone_hash: str
+
+
+class UserKeyRow(TypedDict):
+    id: Annotated[ObjectIdStr, Field(validation_alias="_id")]
+    public_key: str
+    key_version: Annotated[int, Field(default=0)]
+
+
+class UserKeyListRow(TypedDict):
+    keys: list[UserKeyRow]
@@ -1,5 +1,9 @@
-from .user_service import UserService
+from .user_service import UserService, CachedUserService
 from .chat_service import ChatService
+from .message_service import MessageService
+from .presence import PresenceBuffer
+from .unread_service import UnreadService
+from .sync_service import SyncService
 
 
-__all__ = ["UserService", "ChatService"]
\ No newline at end of file
+__all__ = ["UserService", "CachedUserService", "ChatService", "MessageService", "PresenceBuffer", "UnreadService", "SyncService"]
\ No newline at end of file
@@ -1,54 +1,313 @@
-from models.chat import Chat, ChatCreate, ChatUpdate, ChatSummary
+from models.chat import Chat, ChatCreate, ChatUpdate
+from models.sync import new_tombstone
 from typing import Optional
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from utils.pagination import encode_cursor, decode_cursor, export_query
+from utils.bulk import insert_many_unordered
+
+
+# Apenas os campos do modelo Chat
+CHAT_PROJECTION = {name: 1 for name in Chat.model_fields if name != "id"}
+
+# Campos do ChatOut, para as leituras serializadas direto em JSON
+CHAT_OUT_PROJECTION = {"type": 1, "participant_ids": 1, "created_at": 1}
+
+# GET /chats/{id}: ChatOut mais o updated_at dos validadores HTTP (ETag/Last-Modified),
+# e só o updated_at para responder revalidações (304) sem trazer o documento
+CHAT_READ_PROJECTION = {**CHAT_OUT_PROJECTION, "updated_at": 1}
+CHAT_VERSION_PROJECTION = {"updated_at": 1}
+
+# Campos do ChatSummary, para a caixa de entrada não trafegar o documento inteiro
+CHAT_SUMMARY_PROJECTION = {"type": 1, "participant_ids": 1, "last_message_at": 1}
+
+
+def participant_key(chat_type: str, participant_ids: list[str]) -> Optional[str]:
+    """
+    Chave canônica de um chat privado (participantes distintos, ordenados),
+    coberta pelo índice único participant_key_unique. Chats de outros tipos
+    não têm chave.
+    """
+    if chat_type != "private":
+        return None
+    return ",".join(sorted(set(participant_ids)))
+
+
+def _describe_write_error(error: dict) -> str:
+    if error.get("code") == 11000:
+        return "Private chat already exists"
+    return "Write failed"
 
 
 class ChatService:
-    def __init__(self, collection):
+    '''
+    Com tombstones_collection, delete_chat registra a exclusão para a
+    sincronização incremental (GET /sync) dos participantes, e update_chat
+    a registra para os participantes removidos do chat.
+    '''
+    def __init__(self, collection, tombstones_collection=None):
         self.collection = collection
+        self.tombstones_collection = tombstones_collection
 
-    def create_chat(self, chat_create: ChatCreate) -> Chat:
+    def _new_chat_document(self, chat_create: ChatCreate) -> dict:
         chat_dict = chat_create.model_dump()
         chat_dict["created_at"] = datetime.now(timezone.utc)
         chat_dict["updated_at"] = datetime.now(timezone.utc)
-        result = self.collection.insert_one(chat_dict)
-        chat_dict["_id"] = str(result.inserted_id)
-        return Chat(**chat_dict)
+        key = participant_key(chat_create.type, chat_create.participant_ids)
+        if key is not None:
+            chat_dict["participant_key"] = key
+        return chat_dict
+
+    async def create_chat(self, chat_create: ChatCreate) -> tuple[Chat, bool]:
+        """
+        Cria o chat e retorna (chat, criado).
+
+        Chats privados são get-or-create pela participant_key: um upsert
+        atômico no índice único devolve o chat já existente entre os mesmos
+        participantes em um único round trip, sem duplicados mesmo com
+        criações concorrentes ou retentativas do cliente.
+        """
+        chat_dict = self._new_chat_document(chat_create)
+        key = chat_dict.pop("participant_key", None)
+        if key is None:
+            result = await self.collection.insert_one(chat_dict)
+            chat_dict["_id"] = str(result.inserted_id)
+            return Chat(**chat_dict), True
 
-    def get_chat_by_id(self, chat_id: str) -> Optional[Chat]:
+        chat_dict["_id"] = ObjectId()
+        try:
+            chat_data = await self.collection.find_one_and_update(
+                {"participant_key": key},
+                {"$setOnInsert": chat_dict},
+                projection=CHAT_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Upsert concorrente venceu a corrida: o chat já existe
+            chat_data = await self.collection.find_one({"participant_key": key}, CHAT_PROJECTION)
+        created = chat_data["_id"] == chat_dict["_id"]
+        chat_data["_id"] = str(chat_data["_id"])
+        return Chat(**chat_data), created
+
+    async def create_chats(self, chat_creates: list[ChatCreate]) -> list[tuple[Optional[str], Optional[str]]]:
+        """
+        Cria vários chats com um único insert_many(ordered=False).
+        Retorna (id, erro) por chat, na ordem recebida.
+        """
+        documents = [self._new_chat_document(chat_create) for chat_create in chat_creates]
+        return await insert_many_unordered(self.collection, documents, _describe_write_error)
+
+    async def get_chat_document(self, chat_id: str, projection: dict = CHAT_OUT_PROJECTION) -> Optional[dict]:
+        """Documento projetado do chat, sem construir o modelo."""
         try:
             mongo_id = ObjectId(chat_id)
         except Exception:
             return None
-        chat_data = self.collection.find_one({"_id": mongo_id})
+        return await self.collection.find_one({"_id": mongo_id}, projection)
+
+    async def get_chat_by_id(self, chat_id: str) -> Optional[Chat]:
+        chat_data = await self.get_chat_document(chat_id, CHAT_PROJECTION)
         if chat_data:
             chat_data["_id"] = str(chat_data["_id"])
             return Chat(**chat_data)
         return None
 
-    def update_chat(self, chat_id: str, chat_update: ChatUpdate) -> Optional[Chat]:
+    async def update_chat(self, chat_id: str, chat_update: ChatUpdate) -> Optional[Chat]:
+        """
+        Atualiza os campos informados. Mudanças de type ou participant_ids
+        recalculam a participant_key; lança DuplicateKeyError se o chat
+        passaria a duplicar um chat privado existente. Participantes
+        removidos recebem um tombstone do chat.
+
+        Uma única escrita, exceto ao tornar privado um chat sem informar
+        participant_ids: a chave depende dos participantes gravados, lidos
+        antes da escrita.
+        """
         try:
             mongo_id = ObjectId(chat_id)
         except Exception:
             return None
         update_data = {k: v for k, v in chat_update.model_dump().items() if v is not None}
-        if update_data:
-            update_data["updated_at"] = datetime.now(timezone.utc)
-            self.collection.update_one({"_id": mongo_id}, {"$set": update_data})
-        return self.get_chat_by_id(chat_id)
+        if not update_data:
+            return await self.get_chat_by_id(chat_id)
+        update_data["updated_at"] = datetime.now(timezone.utc)
+        if "participant_ids" in update_data:
+            return await self._update_participants(chat_id, mongo_id, update_data)
+        if "type" not in update_data:
+            return await self._write_chat_update({"_id": mongo_id}, {"$set": update_data})
+        if update_data["type"] != "private":
+            return await self._write_chat_update(
+                {"_id": mongo_id}, {"$set": update_data, "$unset": {"participant_key": ""}}
+            )
+
+        # A escrita só vale se participant_ids ainda é o que foi lido; senão,
+        # outra atualização venceu e a chave é recalculada (cada nova
+        # tentativa implica que uma escrita concorrente foi concluída)
+        while True:
+            current = await self.collection.find_one({"_id": mongo_id}, {"participant_ids": 1})
+            if current is None:
+                return None
+            fields = {**update_data, "participant_key": participant_key("private", current["participant_ids"])}
+            chat = await self._write_chat_update(
+                {"_id": mongo_id, "participant_ids": current["participant_ids"]}, {"$set": fields}
+            )
+            if chat is not None:
+                return chat
 
-    def delete_chat(self, chat_id: str) -> bool:
+    async def _update_participants(self, chat_id: str, mongo_id: ObjectId, update_data: dict) -> Optional[Chat]:
+        """
+        Troca participant_ids em uma única escrita. Sem type na atualização,
+        a chave é decidida pelo type gravado dentro da própria escrita
+        (update em pipeline); com tombstones, o documento anterior informa
+        quem saiu do chat.
+        """
+        if "type" in update_data:
+            key = participant_key(update_data["type"], update_data["participant_ids"])
+            update = {"$set": {**update_data, "participant_key": key}}
+            if key is None:
+                update = {"$set": update_data, "$unset": {"participant_key": ""}}
+        else:
+            # Valores como $literal: strings iniciadas por "$" não viram caminhos de campo
+            update = [{"$set": {
+                **{field: {"$literal": value} for field, value in update_data.items()},
+                "participant_key": {"$cond": [
+                    {"$eq": ["$type", "private"]},
+                    {"$literal": participant_key("private", update_data["participant_ids"])},
+                    "$$REMOVE",
+                ]},
+            }}]
+        if self.tombstones_collection is None:
+            return await self._write_chat_update({"_id": mongo_id}, update)
+
+        before = await self.collection.find_one_and_update(
+            {"_id": mongo_id}, update, projection=CHAT_PROJECTION, return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return None
+        removed = [participant_id for participant_id in dict.fromkeys(before["participant_ids"])
+                   if participant_id not in update_data["participant_ids"]]
+        if removed:
+            await self.tombstones_collection.insert_one(new_tombstone("chat", chat_id, removed))
+        before["_id"] = chat_id
+        return Chat(**{**before, **update_data})
+
+    async def _write_chat_update(self, query: dict, update) -> Optional[Chat]:
+        # Escrita e leitura atômicas em um único round trip
+        chat_data = await self.collection.find_one_and_update(
+            query,
+            update,
+            projection=CHAT_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if chat_data:
+            chat_data["_id"] = str(chat_data["_id"])
+            return Chat(**chat_data)
+        return None
+
+    async def delete_chat(self, chat_id: str) -> bool:
         try:
             mongo_id = ObjectId(chat_id)
         except Exception:
             return False
-        result = self.collection.delete_one({"_id": mongo_id})
-        return result.deleted_count > 0
+        if self.tombstones_collection is None:
+            result = await self.collection.delete_one({"_id": mongo_id})
+            return result.deleted_count > 0
+        chat_data = await self.collection.find_one_and_delete({"_id": mongo_id}, projection={"participant_ids": 1})
+        if chat_data is None:
+            return False
+        await self.tombstones_collection.insert_one(new_tombstone("chat", chat_id, chat_data["participant_ids"]))
+        return True
 
-    def list_chats(self) -> list[Chat]:
-        chats = []
-        for chat_data in self.collection.find():
-            chat_data["_id"] = str(chat_data["_id"])
-            chats.append(Chat(**chat_data))
-        return chats
\ No newline at end of file
+    async def list_chats(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        chat_type: Optional[str] = None,
+        participant_id: Optional[str] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Lista chats paginados por _id (keyset), com filtros aplicados no MongoDB.
+
+        Retorna os documentos da página (projetados nos campos do ChatOut) e
+        o cursor da próxima (None na última página).
+        Lança ValueError se o cursor for inválido.
+        """
+        query: dict = {}
+        if chat_type is not None:
+            query["type"] = chat_type
+        if participant_id is not None:
+            query["participant_ids"] = participant_id
+        if cursor is not None:
+            try:
+                query["_id"] = {"$gt": ObjectId(decode_cursor(cursor)["id"])}
+            except Exception as exc:
+                raise ValueError("Invalid cursor") from exc
+
+        # Busca um item extra para saber se existe próxima página
+        documents = await self.collection.find(query, CHAT_OUT_PROJECTION).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor({"id": str(documents[-1]["_id"])})
+        return documents, next_cursor
+
+    def export_chats(
+        self,
+        batch_size: int,
+        after_id: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        updated_until: Optional[datetime] = None,
+    ):
+        """
+        Cursor de exportação em ordem de _id. Lança ValueError se after_id for inválido.
+        """
+        query = export_query(after_id, updated_since, updated_until)
+        return self.collection.find(query, CHAT_PROJECTION).sort("_id", 1).batch_size(batch_size)
+
+    async def list_user_chat_ids(self, user_id: str) -> list[str]:
+        """IDs de todos os chats do usuário (inscrição no hub de tempo real)."""
+        documents = await self.collection.find({"participant_ids": user_id}, {"_id": 1}).to_list(None)
+        return [str(document["_id"]) for document in documents]
+
+    async def list_user_chats(
+        self, user_id: str, limit: int, cursor: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Lista os chats de um usuário, do mais recente para o mais antigo,
+        como documentos projetados nos campos do ChatSummary.
+
+        Paginação keyset em (last_message_at desc, _id desc), atendida pelo
+        índice participant_ids_last_message_at. Chats sem mensagens (null)
+        vêm por último. Lança ValueError se o cursor for inválido.
+        """
+        query: dict = {"participant_ids": user_id}
+        if cursor is not None:
+            try:
+                position = decode_cursor(cursor)
+                last_at, last_id = position["at"], ObjectId(position["id"])
+            except Exception as exc:
+                raise ValueError("Invalid cursor") from exc
+            if last_at is None:
+                query.update({"last_message_at": None, "_id": {"$lt": last_id}})
+            else:
+                query["$or"] = [
+                    {"last_message_at": {"$lt": last_at}},
+                    {"last_message_at": last_at, "_id": {"$lt": last_id}},
+                    {"last_message_at": None},
+                ]
+
+        documents = await (
+            self.collection.find(query, CHAT_SUMMARY_PROJECTION)
+            .sort([("last_message_at", -1), ("_id", -1)])
+            .limit(limit + 1)
+            .to_list(limit + 1)
+        )
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor({"at": last.get("last_message_at"), "id": str(last["_id"])})
+        return documents, next_cursor
@@ -0,0 +1,170 @@
+from models.message import Message, MessageCreate
+from typing import Optional
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from config import settings
+from utils.pagination import encode_cursor, decode_cursor
+from services.unread_service import UnreadService
+
+
+def bucket_key(chat_id: str, seq: int) -> str:
+    """Chave única do bucket seq do chat, coberta pelo índice bucket_key_unique."""
+    return f"{chat_id}:{seq}"
+
+
+class MessageService:
+    '''
+    Mensagens armazenadas em buckets: cada documento de "message_buckets"
+    guarda até MESSAGE_BUCKET_SIZE mensagens de um chat, com first_at/last_at
+    delimitando o intervalo de tempo coberto.
+
+    Com counters_collection, o envio também incrementa os contadores de não
+    lidas dos demais participantes (UnreadService).
+    '''
+    def __init__(self, buckets_collection, chats_collection, counters_collection=None):
+        self.buckets_collection = buckets_collection
+        self.chats_collection = chats_collection
+        self.unread = UnreadService(counters_collection, buckets_collection) if counters_collection is not None else None
+
+    async def send_message(self, chat_id: str, message_create: MessageCreate) -> Optional[Message]:
+        """
+        Registra a mensagem e avança last_message_at do chat.
+
+        O remetente é validado (participante do chat) antes de qualquer
+        escrita. A mensagem é gravada no bucket antes de avançar o chat:
+        last_message_at nunca aponta para uma mensagem que não está no
+        histórico. Se o chat deixou de aceitar o remetente entre a validação
+        e o avanço, a mensagem é retirada do bucket sem devolver a vaga:
+        count só cresce, então um bucket antigo nunca volta a receber
+        mensagens e os intervalos dos buckets não se sobrepõem. $max mantém
+        last_message_at monotônico mesmo com envios concorrentes. Retorna
+        None se o chat não existe ou o remetente não participa dele.
+        """
+        try:
+            mongo_id = ObjectId(chat_id)
+        except Exception:
+            return None
+        chat_filter = {"_id": mongo_id, "participant_ids": message_create.sender_id}
+        chat = await self.chats_collection.find_one(chat_filter, {"participant_ids": 1})
+        if chat is None:
+            return None
+
+        now = datetime.now(timezone.utc)
+        # O MongoDB armazena milissegundos: trunca para o cursor bater com o histórico
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        message_dict = message_create.model_dump()
+        message_dict["_id"] = ObjectId()
+        message_dict["created_at"] = now
+        await self._append_to_bucket(chat_id, message_dict)
+
+        advanced = await self.chats_collection.find_one_and_update(
+            chat_filter,
+            {"$max": {"last_message_at": now}, "$set": {"updated_at": now}},
+            projection={"_id": 1},
+        )
+        if advanced is None:
+            await self.buckets_collection.update_one(
+                {"chat_id": chat_id, "messages._id": message_dict["_id"]},
+                {"$pull": {"messages": {"_id": message_dict["_id"]}}},
+            )
+            return None
+        if self.unread is not None:
+            recipients = [user_id for user_id in chat["participant_ids"] if user_id != message_create.sender_id]
+            await self.unread.increment(chat_id, recipients, now)
+        message_dict["_id"] = str(message_dict["_id"])
+        return Message(chat_id=chat_id, **message_dict)
+
+    async def _append_to_bucket(self, chat_id: str, message_dict: dict) -> None:
+        """
+        Empilha a mensagem no bucket aberto (o de maior seq com espaço) ou
+        abre o seguinte. O índice único bucket_key_unique garante um único
+        bucket por seq: quem perde a corrida para abri-lo empilha nele.
+        """
+        now = message_dict["created_at"]
+        while True:
+            bucket = await self.buckets_collection.find_one_and_update(
+                {"chat_id": chat_id, "count": {"$lt": settings.MESSAGE_BUCKET_SIZE}},
+                {
+                    "$push": {"messages": message_dict},
+                    "$inc": {"count": 1},
+                    "$min": {"first_at": now},
+                    "$max": {"last_at": now},
+                },
+                projection={"_id": 1},
+                sort=[("seq", -1)],
+            )
+            if bucket is not None:
+                return
+            newest = await self.buckets_collection.find_one({"chat_id": chat_id}, {"seq": 1}, sort=[("seq", -1)])
+            # Buckets anteriores ao seq (sem o campo) contam como -1
+            seq = newest.get("seq", -1) + 1 if newest is not None else 0
+            try:
+                await self.buckets_collection.insert_one({
+                    "chat_id": chat_id,
+                    "seq": seq,
+                    "bucket_key": bucket_key(chat_id, seq),
+                    "messages": [message_dict],
+                    "count": 1,
+                    "first_at": now,
+                    "last_at": now,
+                })
+                return
+            except DuplicateKeyError:
+                continue  # envio concorrente abriu este bucket: empilha nele
+
+    async def list_messages(
+        self, chat_id: str, limit: int, before: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Histórico do chat, da mensagem mais recente para a mais antiga, como
+        documentos de mensagem (campos do MessageOut).
+
+        Lê os buckets em ordem decrescente de first_at até reunir limit
+        mensagens anteriores ao cursor before. Lança ValueError se o cursor
+        for inválido.
+        """
+        query: dict = {"chat_id": chat_id}
+        position = None
+        if before is not None:
+            try:
+                decoded = decode_cursor(before)
+                position = (decoded["at"], ObjectId(decoded["id"]))
+            except Exception as exc:
+                raise ValueError("Invalid cursor") from exc
+            query["first_at"] = {"$lte": position[0]}
+
+        cursor = (
+            self.buckets_collection.find(query, {"messages": 1, "last_at": 1})
+            .sort("first_at", -1)
+            .batch_size(4)
+        )
+        collected: list[dict] = []
+        has_more = False
+        async for bucket in cursor:
+            if len(collected) >= limit:
+                threshold = sorted(
+                    (message["created_at"] for message in collected), reverse=True
+                )[limit - 1]
+                if bucket["last_at"] < threshold:
+                    has_more = True
+                    break
+            for message in bucket["messages"]:
+                if position is None or (message["created_at"], message["_id"]) < position:
+                    collected.append(message)
+        await cursor.close()
+
+        collected.sort(key=lambda message: (message["created_at"], message["_id"]), reverse=True)
+        if len(collected) > limit:
+            has_more = True
+        page = collected[:limit]
+        next_cursor = None
+        if has_more and page:
+            next_cursor = encode_cursor({"at": page[-1]["created_at"], "id": str(page[-1]["_id"])})
+        for message_data in page:
+            message_data["chat_id"] = chat_id
+        return page, next_cursor
+
+    async def delete_chat_messages(self, chat_id: str) -> int:
+        result = await self.buckets_collection.delete_many({"chat_id": chat_id})
+        return result.deleted_count
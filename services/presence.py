@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config import settings
+from database.mongodb import MongoDB
+from services.user_service import get_user_cache
+from utils.cache import CacheBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # O MongoDB devolve datetimes ingênuos em UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class PresenceBuffer:
+    '''
+    Buffer write-behind dos heartbeats (last_active_at).
+
+    Cada heartbeat só atualiza um dicionário em memória, mantendo o maior
+    timestamp por usuário. Periodicamente o buffer é gravado com um único
+    bulk_write(ordered=False) usando $max, então gravações fora de ordem
+    (ou de outros workers) nunca fazem o valor regredir. Leituras mesclam
+    o valor ainda não gravado via merge().
+    '''
+    def __init__(
+        self,
+        get_collection: Callable,
+        cache: Optional[CacheBackend] = None,
+        flush_interval: float = 5.0,
+        max_pending: int = 10000,
+    ):
+        self._get_collection = get_collection
+        self.cache = cache
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[str, datetime] = {}
+        # Lote em gravação: continua visível para merge() até o bulk_write terminar
+        self._flushing: dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._flushes = 0
+        self._flushed_updates = 0
+        self._heartbeats = 0
+        self._errors = 0
+        self._last_flush_size = 0
+        self._last_flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+
+    def record(self, user_id: str, at: datetime) -> None:
+        '''Registra um heartbeat; repetidos do mesmo usuário viram um só.'''
+        self._heartbeats += 1
+        self._coalesce(user_id, _as_utc(at))
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _coalesce(self, user_id: str, at: datetime) -> None:
+        current = self._pending.get(user_id)
+        if current is None or at > current:
+            self._pending[user_id] = at
+
+    def pending(self, user_id: str) -> Optional[datetime]:
+        pending = self._pending.get(user_id)
+        flushing = self._flushing.get(user_id)
+        if pending is None or flushing is None:
+            return pending or flushing
+        return max(pending, flushing)
+
+    def merge(self, user_id: str, document: Optional[dict]) -> Optional[dict]:
+        '''Documento com last_active_at mesclado ao valor pendente (sem alterar o original).'''
+        pending = self.pending(user_id)
+        if document is None or pending is None:
+            return document
+        stored = document.get("last_active_at")
+        if stored is not None and _as_utc(stored) >= pending:
+            return document
+        return {**document, "last_active_at": pending}
+
+    async def flush(self) -> int:
+        '''Grava os heartbeats pendentes; retorna quantos usuários foram atualizados.'''
+        if not self._pending:
+            return 0
+        # Troca o buffer antes do await: heartbeats que chegarem durante a escrita
+        # entram no próximo flush
+        pending, self._pending = self._pending, {}
+        self._flushing = pending
+        operations = [
+            UpdateOne({"_id": ObjectId(user_id)}, {"$max": {"last_active_at": at}})
+            for user_id, at in pending.items()
+        ]
+        start = time.perf_counter()
+        try:
+            await self._get_collection().bulk_write(operations, ordered=False)
+        except BaseException as exc:
+            # Inclusive cancelamento: o lote já saiu de _pending e se perderia
+            for user_id, at in pending.items():
+                self._coalesce(user_id, at)
+            if not isinstance(exc, Exception):
+                raise
+            self._errors += 1
+            logger.exception("Falha gravando %d heartbeats; mantendo para o próximo flush", len(pending))
+            return 0
+        finally:
+            self._flushing = {}
+        elapsed = time.perf_counter() - start
+        self._flushes += 1
+        self._flushed_updates += len(pending)
+        self._last_flush_size = len(pending)
+        self._last_flush_seconds = elapsed
+        self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+        if self.cache is not None:
+            # Os documentos em cache ficaram com last_active_at antigo
+            for user_id in pending:
+                await self.cache.delete(user_id)
+        return len(pending)
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                # O flush final fica com close()
+                break
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Falha no flush de presença")
+
+    async def close(self) -> None:
+        '''Para o flush periódico e grava o que restou no buffer.'''
+        if self._task is not None:
+            # Sem cancel(): um flush em andamento termina antes do flush final
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def clear(self) -> None:
+        '''Descarta os heartbeats pendentes sem gravá-los.'''
+        self._pending = {}
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "heartbeats": self._heartbeats,
+            "flushes": self._flushes,
+            "flushed_updates": self._flushed_updates,
+            "errors": self._errors,
+            "last_flush_size": self._last_flush_size,
+            "last_flush_ms": round(self._last_flush_seconds * 1000, 3),
+            "max_flush_ms": round(self._max_flush_seconds * 1000, 3),
+        }
+
+
+_presence: Optional[PresenceBuffer] = None
+
+
+def get_presence_buffer() -> PresenceBuffer:
+    '''Buffer de presença do processo, criado sob demanda.'''
+    global _presence
+    if _presence is None:
+        _presence = PresenceBuffer(
+            lambda: MongoDB.get_async_collection("users"),
+            get_user_cache(),
+            settings.PRESENCE_FLUSH_INTERVAL_SECONDS,
+            settings.PRESENCE_MAX_PENDING,
+        )
+    return _presence
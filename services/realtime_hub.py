@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Iterable, Optional
+
+import anyio
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from config import settings
+from database.mongodb import MongoDB
+
+
+logger = logging.getLogger(__name__)
+
+EnvelopeHandler = Callable[[dict], Awaitable[None]]
+
+
+class Broker(ABC):
+    '''
+    Transporta envelopes do hub entre workers.
+
+    Todo envelope publicado é entregue ao handler de todos os workers,
+    inclusive o que publicou; cada hub faz o fan-out para as próprias conexões.
+    '''
+    def __init__(self):
+        self._handler: Optional[EnvelopeHandler] = None
+
+    def set_handler(self, handler: EnvelopeHandler) -> None:
+        self._handler = handler
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, envelope: dict) -> None:
+        ...
+
+
+class InMemoryBroker(Broker):
+    '''Broker de um único processo: entrega direto ao handler local.'''
+    async def publish(self, envelope: dict) -> None:
+        await self._handler(envelope)
+
+
+class MongoBroker(Broker):
+    '''
+    Broker entre workers sobre uma capped collection do MongoDB lida com
+    cursor tailable. Não exige replica set; requer MONGO_DRIVER=async (com
+    sync, start falha em vez de abrir um segundo pool só para o broker).
+    '''
+    def __init__(self, collection_name: str = "realtime_events", size_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if settings.MONGO_DRIVER != "async":
+            raise RuntimeError("REALTIME_BROKER=mongo requires MONGO_DRIVER=async")
+        database = MongoDB.get_async_client()[settings.MONGO_DB_NAME]
+        try:
+            await database.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # já existe
+        self._collection = database[self.collection_name]
+        self._task = asyncio.create_task(self._tail())
+
+    async def _tail(self) -> None:
+        # Os _id (ObjectId) vêm do relógio de cada worker e não seguem a ordem
+        # da capped collection: a leitura é sempre em ordem de inserção
+        # ($natural), sem filtro por _id. Ao (re)abrir o cursor, pula até o
+        # último evento já visto (na partida, o mais recente existente)
+        newest = await self._collection.find({}, {"_id": 1}).sort("$natural", -1).limit(1).to_list(1)
+        last_id = newest[0]["_id"] if newest else None
+        while True:
+            # Se o último visto já saiu da capped collection, todos os restantes são novos
+            skipping = last_id is not None and await self._collection.find_one({"_id": last_id}, {"_id": 1}) is not None
+            cursor = self._collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for document in cursor:
+                    if skipping:
+                        skipping = document["_id"] != last_id
+                        continue
+                    last_id = document["_id"]
+                    await self._handler(document["envelope"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Falha lendo eventos de %s; reabrindo cursor", self.collection_name)
+            finally:
+                await cursor.close()
+            # Cursor tailable morre quando a coleção está vazia: tenta de novo em seguida
+            await asyncio.sleep(0.1)
+
+    async def publish(self, envelope: dict) -> None:
+        await self._collection.insert_one({"envelope": envelope})
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RealtimeConnection:
+    '''
+    Uma conexão WebSocket com fila de envio limitada.
+
+    O fan-out só enfileira (put_nowait); uma tarefa dedicada escreve no
+    socket. Se a fila enche, o cliente é considerado lento e desconectado
+    com o código 1013, sem atrasar as demais conexões.
+    '''
+    def __init__(self, websocket, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self._closed = asyncio.Event()
+
+    def offer(self, text: str) -> bool:
+        if self._closed.is_set():
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self._closed.set()
+            return False
+
+    def close(self) -> None:
+        self._closed.set()
+
+    async def _send_loop(self) -> None:
+        while True:
+            text = await self.queue.get()
+            await self.websocket.send_text(text)
+
+    async def _receive_loop(self) -> None:
+        while True:
+            text = await self.websocket.receive_text()
+            if text == "ping":
+                self.offer(json.dumps({"type": "pong"}))
+
+    async def run(self) -> None:
+        '''Executa até o cliente desconectar, a conexão ser fechada ou a fila estourar.'''
+        async with anyio.create_task_group() as task_group:
+            async def until_done(func):
+                try:
+                    await func()
+                except Exception:
+                    pass  # desconexão do cliente ou falha de escrita encerram a conexão
+                finally:
+                    task_group.cancel_scope.cancel()
+
+            task_group.start_soon(until_done, self._send_loop)
+            task_group.start_soon(until_done, self._receive_loop)
+            task_group.start_soon(until_done, self._closed.wait)
+        if self._closed.is_set():
+            try:
+                await self.websocket.close(code=1013 if self.overflowed else 1000)
+            except Exception:
+                pass
+
+
+class RealtimeHub:
+    '''
+    Fan-out em processo: mapeia chat_id -> conexões inscritas.
+
+    Operações que precisam alcançar todos os workers (eventos e mudanças de
+    participantes) passam pelo broker; a entrega local acontece em _dispatch.
+    '''
+    def __init__(self, broker: Broker):
+        self.broker = broker
+        self.broker.set_handler(self._dispatch)
+        self._chats: dict[str, set[RealtimeConnection]] = {}
+        self._users: dict[str, set[RealtimeConnection]] = {}
+        self._subscriptions: dict[RealtimeConnection, set[str]] = {}
+        self.dropped_connections = 0
+
+    async def start(self) -> None:
+        await self.broker.start()
+
+    async def close(self) -> None:
+        await self.broker.close()
+        for connection in list(self._subscriptions):
+            connection.close()
+
+    def register(self, connection: RealtimeConnection, chat_ids: Iterable[str]) -> None:
+        self._users.setdefault(connection.user_id, set()).add(connection)
+        self._subscriptions[connection] = set()
+        for chat_id in chat_ids:
+            self._subscribe(connection, chat_id)
+
+    def unregister(self, connection: RealtimeConnection) -> None:
+        for chat_id in self._subscriptions.pop(connection, set()):
+            self._unsubscribe(connection, chat_id)
+        user_connections = self._users.get(connection.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection)
+            if not user_connections:
+                del self._users[connection.user_id]
+
+    def _subscribe(self, connection: RealtimeConnection, chat_id: str) -> None:
+        self._chats.setdefault(chat_id, set()).add(connection)
+        self._subscriptions[connection].add(chat_id)
+
+    def _unsubscribe(self, connection: RealtimeConnection, chat_id: str) -> None:
+        members = self._chats.get(chat_id)
+        if members is not None:
+            members.discard(connection)
+            if not members:
+                del self._chats[chat_id]
+
+    async def publish(self, chat_id: str, event: dict) -> None:
+        '''Publica um evento para todos os inscritos no chat, em qualquer worker.'''
+        # Serializa uma única vez; o mesmo texto é enfileirado em todas as conexões
+        await self.broker.publish({"op": "event", "chat_id": chat_id, "data": json.dumps(event)})
+
+    async def set_chat_members(self, chat_id: str, user_ids: list[str]) -> None:
+        await self.broker.publish({"op": "members", "chat_id": chat_id, "user_ids": user_ids})
+
+    async def close_chat(self, chat_id: str) -> None:
+        await self.broker.publish({"op": "close_chat", "chat_id": chat_id})
+
+    async def _dispatch(self, envelope: dict) -> None:
+        op = envelope.get("op")
+        chat_id = envelope.get("chat_id")
+        if op == "event":
+            self._deliver(chat_id, envelope["data"])
+        elif op == "members":
+            self._set_members(chat_id, envelope["user_ids"])
+        elif op == "close_chat":
+            for connection in list(self._chats.get(chat_id, ())):
+                self._subscriptions[connection].discard(chat_id)
+            self._chats.pop(chat_id, None)
+
+    def _deliver(self, chat_id: str, text: str) -> int:
+        delivered = 0
+        for connection in list(self._chats.get(chat_id, ())):
+            if connection.offer(text):
+                delivered += 1
+            elif connection.overflowed:
+                self.dropped_connections += 1
+                self.unregister(connection)
+        return delivered
+
+    def _set_members(self, chat_id: str, user_ids: list[str]) -> None:
+        wanted = set()
+        for user_id in user_ids:
+            wanted.update(self._users.get(user_id, ()))
+        for connection in self._chats.get(chat_id, set()) - wanted:
+            self._subscriptions[connection].discard(chat_id)
+            self._unsubscribe(connection, chat_id)
+        for connection in wanted:
+            self._subscribe(connection, chat_id)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._subscriptions),
+            "chats": len(self._chats),
+            "dropped_connections": self.dropped_connections,
+        }
+
+
+def create_broker(name: str) -> Broker:
+    if name == "mongo":
+        return MongoBroker()
+    if name == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unknown realtime broker: {name}")
+
+
+_hub: Optional[RealtimeHub] = None
+
+
+def get_realtime_hub() -> RealtimeHub:
+    '''Hub do processo, criado sob demanda com o broker de REALTIME_BROKER.'''
+    global _hub
+    if _hub is None:
+        _hub = RealtimeHub(create_broker(settings.REALTIME_BROKER))
+    return _hub
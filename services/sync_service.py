@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from bson import ObjectId
+from config import settings
+from utils.pagination import encode_cursor, decode_cursor
+from services.chat_service import CHAT_PROJECTION
+from services.user_service import USER_PROJECTION
+
+
+TOMBSTONE_PROJECTION = {"kind": 1, "entity_id": 1, "deleted_at": 1}
+
+# Fluxos do checkpoint e o campo que os ordena, com desempate por _id
+STREAMS = {"chats": "updated_at", "users": "updated_at", "deleted": "deleted_at"}
+
+# Posição em um fluxo: já entregue tudo até (at, _id); com _id None, tudo até at inclusive
+Position = Optional[tuple[datetime, Optional[ObjectId]]]
+
+
+class CheckpointExpiredError(ValueError):
+    '''Checkpoint anterior à retenção dos tombstones: exclusões podem ter se perdido.'''
+
+
+def _utcnow() -> datetime:
+    # O driver devolve datetimes sem fuso (UTC); checkpoints usam a mesma base,
+    # truncados em milissegundos como no MongoDB
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def encode_checkpoint(positions: dict[str, Position]) -> str:
+    values = {}
+    for name in STREAMS:
+        at, last_id = positions[name] or (None, None)
+        values[f"{name}_at"] = at
+        values[f"{name}_id"] = str(last_id) if last_id is not None else None
+    return encode_cursor(values)
+
+
+def decode_checkpoint(checkpoint: str) -> dict[str, Position]:
+    '''Decodifica um checkpoint de encode_checkpoint. Lança ValueError se inválido.'''
+    try:
+        values = decode_cursor(checkpoint)
+        positions: dict[str, Position] = {}
+        for name in STREAMS:
+            at, last_id = values[f"{name}_at"], values[f"{name}_id"]
+            if at is None:
+                positions[name] = None
+                continue
+            if not isinstance(at, datetime):
+                raise ValueError("Invalid checkpoint")
+            positions[name] = (at.replace(tzinfo=None), ObjectId(last_id) if last_id is not None else None)
+    except Exception as exc:
+        raise ValueError("Invalid checkpoint") from exc
+    if positions["deleted"] is None:
+        raise ValueError("Invalid checkpoint")
+    return positions
+
+
+async def _read_stream(collection, query: dict, field: str, position: Position, until: datetime, projection: dict, limit: int):
+    '''
+    Próxima página de um fluxo em ordem de (field, _id), limitada a
+    field <= until. Retorna (documentos, há mais, nova posição).
+    '''
+    if position is None:
+        bounds: dict = {field: {"$lte": until}}
+    elif position[1] is None:
+        bounds = {field: {"$gt": position[0], "$lte": until}}
+    else:
+        at, last_id = position
+        bounds = {"$or": [{field: {"$gt": at, "$lte": until}}, {field: at, "_id": {"$gt": last_id}}]}
+    documents = await (
+        collection.find({"$and": [query, bounds]}, projection)
+        .sort([(field, 1), ("_id", 1)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        return documents, True, (last[field], last["_id"])
+    # Fluxo esgotado até until; a posição nunca recua (relógios de outros workers)
+    if position is not None and position[0] > until:
+        return documents, False, position
+    return documents, False, (until, None)
+
+
+def _object_ids(user_ids: list[str]) -> list[ObjectId]:
+    object_ids = []
+    for user_id in user_ids:
+        try:
+            object_ids.append(ObjectId(user_id))
+        except Exception:
+            continue
+    return object_ids
+
+
+class SyncService:
+    '''
+    Sincronização incremental de um usuário: chats de que participa,
+    perfis dos participantes desses chats e exclusões (coleção
+    "tombstones", gravada por ChatService/UserService) posteriores a um
+    checkpoint.
+
+    Cada fluxo é lido em ordem de (updated_at/deleted_at, _id) pelos
+    índices participant_ids_updated_at, updated_at e
+    participant_ids_deleted_at, até limit documentos por fluxo. O
+    checkpoint opaco guarda a posição de cada fluxo e serve tanto para a
+    próxima página (has_more) quanto para a próxima reconexão.
+    '''
+    def __init__(self, chats_collection, users_collection, tombstones_collection):
+        self.chats_collection = chats_collection
+        self.users_collection = users_collection
+        self.tombstones_collection = tombstones_collection
+
+    async def sync(self, user_id: str, checkpoint: Optional[str], limit: int) -> dict:
+        """
+        Página de mudanças desde o checkpoint (ou tudo, sem checkpoint).
+        Lança ValueError se o checkpoint for inválido e CheckpointExpiredError
+        se for mais antigo que SYNC_TOMBSTONE_TTL_SECONDS.
+        """
+        now = _utcnow()
+        # Escritas com updated_at muito recente podem ainda não estar visíveis
+        until = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+        if checkpoint is None:
+            # Sincronização completa: não há exclusões anteriores a entregar
+            positions: dict[str, Position] = {"chats": None, "users": None, "deleted": (until, None)}
+        else:
+            positions = decode_checkpoint(checkpoint)
+            if positions["deleted"][0] < now - timedelta(seconds=settings.SYNC_TOMBSTONE_TTL_SECONDS):
+                raise CheckpointExpiredError("Checkpoint expired")
+
+        participant_ids = await self.chats_collection.distinct("participant_ids", {"participant_ids": user_id})
+        audience = list(dict.fromkeys([user_id, *participant_ids]))
+        user_object_ids = _object_ids(audience)
+
+        streams = {
+            "chats": (self.chats_collection, {"participant_ids": user_id}, CHAT_PROJECTION),
+            "users": (self.users_collection, {"_id": {"$in": user_object_ids}}, USER_PROJECTION),
+            "deleted": (
+                self.tombstones_collection,
+                {"$or": [{"participant_ids": user_id}, {"kind": "user", "entity_id": {"$in": audience}}]},
+                TOMBSTONE_PROJECTION,
+            ),
+        }
+        page: dict = {"has_more": False}
+        for name, (collection, query, projection) in streams.items():
+            documents, more, positions[name] = await _read_stream(
+                collection, query, STREAMS[name], positions[name], until, projection, limit
+            )
+            page[name] = documents
+            page["has_more"] = page["has_more"] or more
+        page["users"].extend(await self._participant_profiles(user_id, page["chats"], page["users"]))
+        page["checkpoint"] = encode_checkpoint(positions)
+        return page
+
+    async def _participant_profiles(self, user_id: str, chats: list[dict], users: list[dict]) -> list[dict]:
+        '''
+        Perfis dos participantes dos chats da página que o fluxo de usuários
+        não trouxe: quem entrou em um chat pode ter updated_at anterior ao
+        checkpoint e o cliente ainda não ter o perfil. O do próprio usuário
+        segue só pelo fluxo.
+        '''
+        delivered = {user_id, *(str(user["_id"]) for user in users)}
+        missing = [
+            participant_id
+            for participant_id in dict.fromkeys(participant_id for chat in chats for participant_id in chat["participant_ids"])
+            if participant_id not in delivered
+        ]
+        object_ids = _object_ids(missing)
+        if not object_ids:
+            return []
+        return await self.users_collection.find({"_id": {"$in": object_ids}}, USER_PROJECTION).to_list(None)
@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pymongo import UpdateOne
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # O driver devolve datetimes sem fuso (UTC); compara na mesma base
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class UnreadService:
+    '''
+    Contadores de não lidas por (usuário, chat) na coleção "unread_counters",
+    mantidos pelo servidor: incrementados no envio de mensagens e abatidos
+    quando o usuário marca o chat como lido até uma mensagem.
+    '''
+    def __init__(self, counters_collection, buckets_collection):
+        self.counters_collection = counters_collection
+        self.buckets_collection = buckets_collection
+
+    async def increment(self, chat_id: str, user_ids: list[str], at: datetime) -> None:
+        """Soma uma mensagem para cada destinatário, em um único bulk_write (upserts)."""
+        if not user_ids:
+            return
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "chat_id": chat_id},
+                {"$inc": {"count": 1}, "$max": {"last_message_at": at}},
+                upsert=True,
+            )
+            for user_id in user_ids
+        ]
+        await self.counters_collection.bulk_write(operations, ordered=False)
+
+    async def list_user_counters(self, user_id: str) -> list[dict]:
+        """Contadores não zerados do usuário, em uma consulta pelo índice user_id_chat_id_unique."""
+        return await self.counters_collection.find(
+            {"user_id": user_id, "count": {"$gt": 0}},
+            {"_id": 0, "chat_id": 1, "count": 1, "last_message_at": 1},
+        ).to_list(None)
+
+    async def _count_between(self, user_id: str, ranges: dict[str, tuple[datetime, datetime]]) -> dict[str, int]:
+        """
+        Mensagens de outros participantes com after < created_at <= until,
+        por chat ({chat_id: (after, until)}), em uma única agregação.
+        """
+        if not ranges:
+            return {}
+        bucket_filters = [{"chat_id": chat_id, "last_at": {"$gt": after}} for chat_id, (after, _) in ranges.items()]
+        message_filters = [
+            {"chat_id": chat_id, "messages.created_at": {"$gt": after, "$lte": until}}
+            for chat_id, (after, until) in ranges.items()
+        ]
+        cursor = await self.buckets_collection.aggregate([
+            {"$match": {"$or": bucket_filters}},
+            {"$project": {"chat_id": 1, "messages.created_at": 1, "messages.sender_id": 1}},
+            {"$unwind": "$messages"},
+            {"$match": {"$or": message_filters, "messages.sender_id": {"$ne": user_id}}},
+            {"$group": {"_id": "$chat_id", "count": {"$sum": 1}}},
+        ])
+        return {document["_id"]: document["count"] for document in await cursor.to_list(None)}
+
+    async def mark_read(self, user_id: str, reads: list[tuple[str, datetime]]) -> int:
+        """
+        Marca chats como lidos até a mensagem (created_at) informada por chat.
+        Retorna quantos contadores foram alterados.
+
+        Lê os contadores envolvidos em uma consulta e os abate com $inc em um
+        único bulk_write: mensagens que chegam entre a leitura e a escrita
+        continuam contadas. Se já há mensagens depois de up_to, só elas
+        permanecem, recontadas para todos os chats em uma única agregação.
+        read_up_to impede abater duas vezes a mesma leitura.
+        """
+        up_to_by_chat: dict[str, datetime] = {}
+        for chat_id, up_to in reads:
+            up_to = _naive_utc(up_to)
+            if chat_id not in up_to_by_chat or up_to > up_to_by_chat[chat_id]:
+                up_to_by_chat[chat_id] = up_to
+        if not up_to_by_chat:
+            return 0
+
+        counters = await self.counters_collection.find(
+            {"user_id": user_id, "chat_id": {"$in": list(up_to_by_chat)}, "count": {"$gt": 0}},
+            {"chat_id": 1, "count": 1, "last_message_at": 1, "read_up_to": 1},
+        ).to_list(None)
+        pending = []
+        for counter in counters:
+            up_to = up_to_by_chat[counter["chat_id"]]
+            read_up_to: Optional[datetime] = counter.get("read_up_to")
+            if read_up_to is None or read_up_to < up_to:
+                pending.append(counter)
+        # Só o que o contador lido já incluía (até last_message_at): mensagens
+        # posteriores somam no próprio $inc e não podem ser contadas duas vezes
+        remaining_by_chat = await self._count_between(user_id, {
+            counter["chat_id"]: (up_to_by_chat[counter["chat_id"]], counter["last_message_at"])
+            for counter in pending
+            if counter["last_message_at"] > up_to_by_chat[counter["chat_id"]]
+        })
+        operations = []
+        for counter in pending:
+            up_to = up_to_by_chat[counter["chat_id"]]
+            remaining = remaining_by_chat.get(counter["chat_id"], 0)
+            if remaining >= counter["count"]:
+                continue
+            operations.append(UpdateOne(
+                {
+                    "_id": counter["_id"],
+                    "$or": [{"read_up_to": {"$lt": up_to}}, {"read_up_to": None}],
+                },
+                {"$inc": {"count": remaining - counter["count"]}, "$set": {"read_up_to": up_to}},
+            ))
+        if operations:
+            await self.counters_collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def delete_chat_counters(self, chat_id: str) -> int:
+        result = await self.counters_collection.delete_many({"chat_id": chat_id})
+        return result.deleted_count
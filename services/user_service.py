@@ -1,53 +1,312 @@
 from models.user import User, UserCreate, UserUpdate
-from typing import Optional
+from models.sync import new_tombstone
+from typing import AsyncIterator, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+from config import settings
+from utils.cache import CacheBackend, LRUCache, MISSING
+from utils.pagination import export_query
+from utils.bulk import insert_many_unordered
+from utils.search import normalize_text, prefix_range, search_fields
+from utils.phone import hash_phone_number
+
+
+# Apenas os campos do modelo User (sem phone_number e demais campos internos)
+USER_PROJECTION = {name: 1 for name in User.model_fields if name != "id"}
+
+# Campos do UserOut (mais a chave de ordenação), para os resultados da busca
+SEARCH_PROJECTION = {"display_name": 1, "public_key": 1, "key_version": 1, "avatar_url": 1, "created_at": 1, "last_active_at": 1, "search_key": 1}
+
+# Diretório de chaves públicas (POST/GET /users/keys)
+KEY_PROJECTION = {"public_key": 1, "key_version": 1}
+
+
+def _describe_write_error(error: dict) -> str:
+    if error.get("code") == 11000:
+        return "Phone number already registered"
+    return "Write failed"
+
+
+def _to_user(document: Optional[dict]) -> Optional[User]:
+    # Não altera o documento: ele pode estar compartilhado com o cache
+    if document is None:
+        return None
+    return User(**{**document, "_id": str(document["_id"])})
 
 
 class UserService:
-    def __init__(self, collection):
+    '''
+    Com tombstones_collection, delete_user registra a exclusão para a
+    sincronização incremental (GET /sync) de quem divide chats com o usuário.
+    '''
+    def __init__(self, collection, tombstones_collection=None):
         self.collection = collection
+        self.tombstones_collection = tombstones_collection
 
-    def create_user(self, user_create: UserCreate) -> User:
+    def _new_user_document(self, user_create: UserCreate) -> dict:
         user_dict = user_create.model_dump()
         # Converte HttpUrl para string antes de salvar no MongoDB
         if "avatar_url" in user_dict and user_dict["avatar_url"]:
             user_dict["avatar_url"] = str(user_dict["avatar_url"])
         user_dict["created_at"] = datetime.now(timezone.utc)
         user_dict["updated_at"] = datetime.now(timezone.utc)
-        result = self.collection.insert_one(user_dict)
+        user_dict.update(search_fields(user_dict["display_name"]))
+        user_dict["phone_hash"] = hash_phone_number(user_dict["phone_number"])
+        user_dict["key_version"] = 1
+        return user_dict
+
+    async def create_user(self, user_create: UserCreate) -> User:
+        user_dict = self._new_user_document(user_create)
+        result = await self.collection.insert_one(user_dict)
         user_dict["_id"] = str(result.inserted_id)
         return User(**user_dict)
 
-    def get_user_by_id(self, user_id: str) -> Optional[User]:
+    async def create_users(self, user_creates: list[UserCreate]) -> list[tuple[Optional[str], Optional[str]]]:
+        """
+        Cria vários usuários com um único insert_many(ordered=False).
+        Retorna (id, erro) por usuário, na ordem recebida.
+        """
+        documents = [self._new_user_document(user_create) for user_create in user_creates]
+        return await insert_many_unordered(self.collection, documents, _describe_write_error)
+
+    async def get_user_document(self, user_id: str) -> Optional[dict]:
+        """Documento projetado (USER_PROJECTION) do usuário, sem construir o modelo."""
         try:
             mongo_id = ObjectId(user_id)
         except Exception:
             return None
-        user_data = self.collection.find_one({"_id": mongo_id})
-        if user_data:
-            user_data["_id"] = str(user_data["_id"])
-            return User(**user_data)
-        return None
+        return await self.collection.find_one({"_id": mongo_id}, USER_PROJECTION)
+
+    async def get_user_documents(self, user_ids: list[str]) -> dict[str, dict]:
+        """Busca vários usuários com um único $in. IDs inválidos ou inexistentes ficam de fora."""
+        mongo_ids = []
+        for user_id in dict.fromkeys(user_ids):
+            try:
+                mongo_ids.append(ObjectId(user_id))
+            except Exception:
+                continue
+        documents = {}
+        if not mongo_ids:
+            return documents
+        async for user_data in self.collection.find({"_id": {"$in": mongo_ids}}, USER_PROJECTION):
+            documents[str(user_data["_id"])] = user_data
+        return documents
+
+    async def get_public_keys(self, user_ids: list[str]) -> list[dict]:
+        """
+        Chaves públicas (_id, public_key, key_version) de vários usuários, na
+        ordem pedida, com um único $in direto do MongoDB: o cache de perfis
+        pode estar atrasado em relação a uma troca de chave.
+        """
+        mongo_ids = []
+        for user_id in dict.fromkeys(user_ids):
+            try:
+                mongo_ids.append(ObjectId(user_id))
+            except Exception:
+                continue
+        if not mongo_ids:
+            return []
+        documents = {
+            document["_id"]: document
+            async for document in self.collection.find({"_id": {"$in": mongo_ids}}, KEY_PROJECTION)
+        }
+        return [documents[mongo_id] for mongo_id in mongo_ids if mongo_id in documents]
 
-    def update_user(self, user_id: str, user_update: UserUpdate) -> Optional[User]:
+    async def update_user_document(self, user_id: str, user_update: UserUpdate) -> Optional[dict]:
         try:
             mongo_id = ObjectId(user_id)
         except Exception:
             return None
         update_data = {k: v for k, v in user_update.model_dump().items() if v is not None}
-        if update_data:
-            # Converte HttpUrl para string antes de salvar no MongoDB
-            if "avatar_url" in update_data and update_data["avatar_url"]:
-                update_data["avatar_url"] = str(update_data["avatar_url"])
-            update_data["updated_at"] = datetime.now(timezone.utc)
-            self.collection.update_one({"_id": mongo_id}, {"$set": update_data})
-        return self.get_user_by_id(user_id)
-
-    def delete_user(self, user_id: str) -> bool:
+        if not update_data:
+            return await self.get_user_document(user_id)
+        # Converte HttpUrl para string antes de salvar no MongoDB
+        if "avatar_url" in update_data and update_data["avatar_url"]:
+            update_data["avatar_url"] = str(update_data["avatar_url"])
+        update_data["updated_at"] = datetime.now(timezone.utc)
+        if "display_name" in update_data:
+            update_data.update(search_fields(update_data["display_name"]))
+        # Escrita e leitura atômicas em um único round trip
+        return await self.collection.find_one_and_update(
+            {"_id": mongo_id},
+            {"$set": update_data},
+            projection=USER_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def rotate_public_key(self, user_id: str, public_key: str) -> Optional[dict]:
+        """
+        Troca a chave pública do usuário; key_version só sobe quando a chave
+        muda de fato. Retorna o documento atualizado, ou None se o usuário
+        não existe.
+        """
+        try:
+            mongo_id = ObjectId(user_id)
+        except Exception:
+            return None
+        document = await self.collection.find_one_and_update(
+            {"_id": mongo_id, "public_key": {"$ne": public_key}},
+            {"$set": {"public_key": public_key, "updated_at": datetime.now(timezone.utc)}, "$inc": {"key_version": 1}},
+            projection=USER_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is not None:
+            return document
+        # Mesma chave (ou usuário inexistente)
+        return await self.collection.find_one({"_id": mongo_id}, USER_PROJECTION)
+
+    async def get_user_by_id(self, user_id: str) -> Optional[User]:
+        return _to_user(await self.get_user_document(user_id))
+
+    async def get_users_by_ids(self, user_ids: list[str]) -> dict[str, User]:
+        documents = await self.get_user_documents(user_ids)
+        return {user_id: _to_user(document) for user_id, document in documents.items()}
+
+    async def update_user(self, user_id: str, user_update: UserUpdate) -> Optional[User]:
+        return _to_user(await self.update_user_document(user_id, user_update))
+
+    async def delete_user(self, user_id: str) -> bool:
         try:
             mongo_id = ObjectId(user_id)
         except Exception:
             return False
-        result = self.collection.delete_one({"_id": mongo_id})
+        result = await self.collection.delete_one({"_id": mongo_id})
+        if result.deleted_count and self.tombstones_collection is not None:
+            await self.tombstones_collection.insert_one(new_tombstone("user", user_id))
         return result.deleted_count > 0
+
+    async def search_users(self, query: str, limit: int) -> list[dict]:
+        """
+        Busca por prefixo no display_name, sem diferenciar maiúsculas nem
+        acentos, direto do MongoDB (sem cache).
+
+        Primeiro vêm os nomes que começam com a busca, em ordem alfabética
+        (índice search_key); depois, os nomes em que cada termo é início de
+        uma palavra (índice multikey search_tokens). As duas consultas são
+        limitadas a limit e só percorrem o intervalo do prefixo no índice,
+        então a latência não cresce com o número de usuários.
+        """
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+        documents = await (
+            self.collection.find({"search_key": prefix_range(normalized)}, SEARCH_PROJECTION)
+            .sort("search_key", 1)
+            .limit(limit)
+            .to_list(limit)
+        )
+        remaining = limit - len(documents)
+        if remaining > 0:
+            terms = [{"$elemMatch": prefix_range(term)} for term in normalized.split()]
+            token_query: dict = {"search_tokens": terms[0] if len(terms) == 1 else {"$all": terms}}
+            if documents:
+                token_query["_id"] = {"$nin": [document["_id"] for document in documents]}
+            more = await self.collection.find(token_query, SEARCH_PROJECTION).limit(remaining).to_list(remaining)
+            documents.extend(sorted(more, key=lambda document: document.get("search_key", "")))
+        return documents
+
+    async def discover_users(self, phone_hashes: list[str], chunk_size: int) -> AsyncIterator[list[dict]]:
+        """
+        Resolve hashes de telefone (utils.phone) em usuários cadastrados, com
+        uma consulta $in no índice phone_hash_unique a cada chunk_size hashes.
+        Gera os usuários encontrados (_id, public_key, phone_hash) por lote,
+        sem montar o resultado inteiro em memória.
+        """
+        unique_hashes = list(dict.fromkeys(phone_hashes))
+        for offset in range(0, len(unique_hashes), chunk_size):
+            chunk = unique_hashes[offset:offset + chunk_size]
+            yield await self.collection.find(
+                {"phone_hash": {"$in": chunk}}, {"public_key": 1, "phone_hash": 1}
+            ).to_list(None)
+
+    def export_users(
+        self,
+        batch_size: int,
+        after_id: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        updated_until: Optional[datetime] = None,
+    ):
+        """
+        Cursor de exportação em ordem de _id, lido direto do MongoDB (sem cache).
+        Lança ValueError se after_id for inválido.
+        """
+        query = export_query(after_id, updated_since, updated_until)
+        return self.collection.find(query, USER_PROJECTION).sort("_id", 1).batch_size(batch_size)
+
+
+class CachedUserService(UserService):
+    """
+    UserService com cache read-through dos documentos de perfil por ID.
+
+    Buscas negativas (IDs inexistentes) também ficam em cache, com TTL
+    menor. Escritas (update, rotação de chave, exclusão) invalidam a entrada
+    do usuário: gravar o documento retornado poderia deixar em cache uma
+    versão mais antiga, se duas atualizações concorrentes terminassem fora
+    de ordem.
+    """
+    def __init__(self, collection, cache: CacheBackend, tombstones_collection=None):
+        super().__init__(collection, tombstones_collection)
+        self.cache = cache
+
+    async def get_user_document(self, user_id: str) -> Optional[dict]:
+        cached = await self.cache.get(user_id)
+        if cached is not MISSING:
+            return cached
+        document = await super().get_user_document(user_id)
+        await self._store(user_id, document)
+        return document
+
+    async def get_user_documents(self, user_ids: list[str]) -> dict[str, dict]:
+        documents = {}
+        missing_ids = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = await self.cache.get(user_id)
+            if cached is MISSING:
+                missing_ids.append(user_id)
+            elif cached is not None:
+                documents[user_id] = cached
+        if missing_ids:
+            fetched = await super().get_user_documents(missing_ids)
+            for user_id in missing_ids:
+                await self._store(user_id, fetched.get(user_id))
+            documents.update(fetched)
+        return documents
+
+    async def update_user_document(self, user_id: str, user_update: UserUpdate) -> Optional[dict]:
+        document = await super().update_user_document(user_id, user_update)
+        await self.cache.delete(user_id)
+        return document
+
+    async def rotate_public_key(self, user_id: str, public_key: str) -> Optional[dict]:
+        document = await super().rotate_public_key(user_id, public_key)
+        await self.cache.delete(user_id)
+        return document
+
+    async def delete_user(self, user_id: str) -> bool:
+        deleted = await super().delete_user(user_id)
+        await self.cache.delete(user_id)
+        return deleted
+
+    async def _store(self, user_id: str, document: Optional[dict]) -> None:
+        if document is None:
+            await self.cache.set(user_id, None, settings.USER_CACHE_NEGATIVE_TTL_SECONDS)
+        else:
+            await self.cache.set(user_id, document)
+
+
+def create_user_cache(name: str) -> CacheBackend:
+    if name == "memory":
+        return LRUCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown user cache backend: {name}")
+
+
+_user_cache: Optional[CacheBackend] = None
+
+
+def get_user_cache() -> CacheBackend:
+    """Cache de usuários do processo, criado sob demanda com USER_CACHE_BACKEND."""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = create_user_cache(settings.USER_CACHE_BACKEND)
+    return _user_cache
@@ -10,9 +10,17 @@ sys.path.insert(0, str(root_dir))
 
 # Define ambiente de teste antes de importar
 os.environ["TESTING"] = "true"
+# mongomock é síncrono: usa o driver sync (executado no threadpool)
+os.environ["MONGO_DRIVER"] = "sync"
 
 from fastapi.testclient import TestClient
 from mongomock import MongoClient as MockMongoClient
+from mongomock.collection import BulkOperationBuilder
+
+# O UpdateOne do pymongo 4.x repassa sort para o bulk_write, que o mongomock
+# 4.3 não aceita; sem sort, a operação é a mesma
+_add_update = BulkOperationBuilder.add_update
+BulkOperationBuilder.add_update = lambda self, *args, sort=None, **kwargs: _add_update(self, *args, **kwargs)
 
 # Cliente de teste MongoDB em memória usando mongomock
 test_client_mongo = MockMongoClient()
@@ -26,16 +34,25 @@ def override_get_collection(collection_name: str):
 
 # Importa e configura após definir o override
 from database.mongodb import MongoDB
+from database.threaded import ThreadedCollection
+from database.indexes import ensure_indexes
+import asyncio
 MongoDB.get_collection = staticmethod(override_get_collection)
+# Aplica os índices declarados (ex.: phone_number único) no banco de testes
+asyncio.run(ensure_indexes(lambda name: ThreadedCollection(test_db[name])))
 
 from main import app
+from services.user_service import get_user_cache
+from services.presence import get_presence_buffer
 # Cria o cliente de teste FastAPI
 client = TestClient(app)
 
 
 @pytest.fixture(scope="function", autouse=True)
 def setup_database():
-    """Limpa o banco de dados antes de cada teste."""
+    """Limpa o banco de dados (e o cache de usuários) antes de cada teste."""
+    asyncio.run(get_user_cache().clear())
+    get_presence_buffer().clear()
     # Limpa todas as coleções
     for collection_name in test_db.list_collection_names():
         test_db[collection_name].delete_many({})
@@ -69,3 +86,37 @@ def test_user_data():
         "phone_number": "+5511888888888",
         "phone_verified": True
     }
+
+
+@pytest.fixture
+def create_user():
+    """Fábrica de usuários: cria pela API e retorna o ID (telefone e chave derivados de index)."""
+    def create(index: int = 0, **fields):
+        user_data = {
+            "display_name": f"User {index}",
+            "public_key": f"key_{index}",
+            "phone_number": f"+55119000000{index:02d}",
+            **fields,
+        }
+        response = client.post("/users/", json=user_data)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+    return create
+
+
+@pytest.fixture
+def create_chat():
+    """Fábrica de chats: cria pela API e retorna o ID."""
+    def create(participant_ids=("user1", "user2"), chat_type: str = "group"):
+        response = client.post("/chats/", json={"type": chat_type, "participant_ids": list(participant_ids)})
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+    return create
+
+
+@pytest.fixture
+def send_message():
+    """Envia uma mensagem pela API e retorna a resposta."""
+    def send(chat_id: str, content: str = "oi", sender_id: str = "user1"):
+        return client.post(f"/chats/{chat_id}/messages", json={"sender_id": sender_id, "content": content})
+    return send
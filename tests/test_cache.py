@@ -0,0 +1,70 @@
+"""Testes para o cache LRU com TTL."""
+import asyncio
+
+from utils.cache import LRUCache, MISSING
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+    """Testes para LRUCache."""
+
+    def test_hit_and_miss(self):
+        """Testa contadores de acerto e falha."""
+        cache = LRUCache(max_size=10, ttl_seconds=60)
+
+        async def scenario():
+            assert await cache.get("a") is MISSING
+            await cache.set("a", 1)
+            assert await cache.get("a") == 1
+
+        asyncio.run(scenario())
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_negative_entries(self):
+        """Testa que None é armazenado como resultado negativo."""
+        cache = LRUCache(max_size=10, ttl_seconds=60)
+
+        async def scenario():
+            await cache.set("missing", None)
+            return await cache.get("missing")
+
+        assert asyncio.run(scenario()) is None
+
+    def test_ttl_expiration(self):
+        """Testa expiração por TTL, inclusive TTL por entrada."""
+        clock = FakeClock()
+        cache = LRUCache(max_size=10, ttl_seconds=60, clock=clock)
+
+        async def scenario():
+            await cache.set("a", 1)
+            await cache.set("b", 2, ttl_seconds=5)
+            clock.now = 10
+            assert await cache.get("a") == 1
+            assert await cache.get("b") is MISSING
+            clock.now = 61
+            assert await cache.get("a") is MISSING
+
+        asyncio.run(scenario())
+        assert cache.stats()["size"] == 0
+
+    def test_lru_eviction(self):
+        """Testa que a entrada menos usada recentemente é removida."""
+        cache = LRUCache(max_size=2, ttl_seconds=60)
+
+        async def scenario():
+            await cache.set("a", 1)
+            await cache.set("b", 2)
+            await cache.get("a")
+            await cache.set("c", 3)
+            return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+        assert asyncio.run(scenario()) == (1, MISSING, 3)
+        assert cache.stats()["evictions"] == 1
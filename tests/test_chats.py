@@ -1,5 +1,14 @@
 """Testes para rotas de chats."""
-from tests.conftest import client
+import asyncio
+import json
+import time
+
+from bson import ObjectId
+
+from database.threaded import ThreadedCollection
+from models.chat import ChatUpdate
+from services.chat_service import ChatService
+from tests.conftest import client, test_db
 
 
 class TestChatCreation:
@@ -82,6 +91,32 @@ class TestChatRetrieval:
         response = client.get("/chats/invalid_id")
         assert response.status_code == 404
 
+    def test_get_chat_conditional(self):
+        """Testa 304 por If-None-Match/If-Modified-Since e novo ETag após atualização."""
+        chat_id = client.post("/chats/", json={"type": "group", "participant_ids": ["user1", "user2"]}).json()["id"]
+        response = client.get(f"/chats/{chat_id}")
+        etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+        cached = client.get(f"/chats/{chat_id}", headers={"If-None-Match": f'W/"other", {etag}'})
+        assert cached.status_code == 304
+        assert cached.headers["last-modified"] == last_modified
+        assert client.get(f"/chats/{chat_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+        # If-None-Match tem precedência sobre If-Modified-Since
+        response = client.get(f"/chats/{chat_id}", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        assert response.status_code == 200
+
+        # updated_at tem precisão de milissegundos
+        time.sleep(0.002)
+        client.put(f"/chats/{chat_id}", json={"participant_ids": ["user1", "user2", "user3"]})
+        changed = client.get(f"/chats/{chat_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()["participant_ids"] == ["user1", "user2", "user3"]
+
+    def test_get_nonexistent_chat_conditional(self):
+        """Testa 404 também em revalidações."""
+        response = client.get("/chats/507f1f77bcf86cd799439011", headers={"If-None-Match": "*"})
+        assert response.status_code == 404
+
 
 class TestChatUpdate:
     """Testes para atualização de chats."""
@@ -222,8 +257,8 @@ class TestChatList:
         response = client.get("/chats/")
         assert response.status_code == 200
         data = response.json()
-        assert isinstance(data, list)
-        assert len(data) == 0
+        assert data["chats"] == []
+        assert data["next_cursor"] is None
 
     def test_list_chats_with_data(self):
         """Testa listagem de chats com dados."""
@@ -246,8 +281,218 @@ class TestChatList:
         # Listar chats
         response = client.get("/chats/")
         assert response.status_code == 200
-        data = response.json()
+        data = response.json()["chats"]
         assert isinstance(data, list)
         assert len(data) == 2
         assert data[0]["type"] in ["private", "group"]
         assert data[1]["type"] in ["private", "group"]
+
+    def test_list_chats_pagination(self):
+        """Testa paginação por cursor percorrendo todas as páginas."""
+        created_ids = []
+        for i in range(5):
+            response = client.post(
+                "/chats/",
+                json={
+                    "type": "group",
+                    "participant_ids": ["user1", f"user{i + 2}"]
+                }
+            )
+            created_ids.append(response.json()["id"])
+
+        seen_ids = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/chats/", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data["chats"]) <= 2
+            seen_ids.extend(chat["id"] for chat in data["chats"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen_ids == created_ids
+
+    def test_list_chats_filters(self):
+        """Testa filtros por tipo e participante."""
+        client.post("/chats/", json={"type": "private", "participant_ids": ["user1", "user2"]})
+        client.post("/chats/", json={"type": "group", "participant_ids": ["user1", "user3", "user4"]})
+        client.post("/chats/", json={"type": "group", "participant_ids": ["user2", "user3"]})
+
+        response = client.get("/chats/", params={"type": "group"})
+        assert len(response.json()["chats"]) == 2
+
+        response = client.get("/chats/", params={"participant_id": "user1"})
+        assert len(response.json()["chats"]) == 2
+
+        response = client.get("/chats/", params={"type": "group", "participant_id": "user1"})
+        chats = response.json()["chats"]
+        assert len(chats) == 1
+        assert chats[0]["participant_ids"] == ["user1", "user3", "user4"]
+
+    def test_list_chats_limit_above_max(self):
+        """Testa erro quando limit excede o tamanho máximo da página."""
+        response = client.get("/chats/", params={"limit": 100000})
+        assert response.status_code == 422
+
+    def test_list_chats_invalid_cursor(self):
+        """Testa erro com cursor inválido."""
+        response = client.get("/chats/", params={"cursor": "invalid"})
+        assert response.status_code == 400
+
+
+class TestPrivateChatGetOrCreate:
+    """Testes para o get-or-create de chats privados."""
+
+    def test_private_chat_is_reused(self):
+        """Testa que o mesmo par, em qualquer ordem, devolve o chat existente com 200."""
+        first = client.post("/chats/", json={"type": "private", "participant_ids": ["user1", "user2"]})
+        second = client.post("/chats/", json={"type": "private", "participant_ids": ["user2", "user1"]})
+        assert first.status_code == 201
+        assert second.status_code == 200
+        assert second.json()["id"] == first.json()["id"]
+        assert second.json()["participant_ids"] == ["user1", "user2"]
+        assert test_db["chats"].count_documents({}) == 1
+
+    def test_concurrent_type_and_participants_updates(self):
+        """Testa que a chave acompanha o estado final quando outro PUT muda type antes da escrita."""
+        chat_id = client.post("/chats/", json={"type": "private", "participant_ids": ["user1", "user2"]}).json()["id"]
+        chats = test_db["chats"]
+
+        class RacingCollection(ThreadedCollection):
+            def __init__(self, collection):
+                super().__init__(collection)
+                self.calls = []
+
+            async def find_one_and_update(self, *args, **kwargs):
+                if not self.calls:
+                    # O PUT concorrente (type=group) termina logo antes desta escrita
+                    chats.update_one({"_id": ObjectId(chat_id)}, {"$set": {"type": "group"}, "$unset": {"participant_key": ""}})
+                self.calls.append("find_one_and_update")
+                return await self.__getattr__("find_one_and_update")(*args, **kwargs)
+
+            async def find_one(self, *args, **kwargs):
+                self.calls.append("find_one")
+                return await self.__getattr__("find_one")(*args, **kwargs)
+
+        collection = RacingCollection(chats)
+        service = ChatService(collection, ThreadedCollection(test_db["tombstones"]))
+        chat = asyncio.run(service.update_chat(chat_id, ChatUpdate(participant_ids=["user1", "user3"])))
+        assert (chat.type, chat.participant_ids) == ("group", ["user1", "user3"])
+        assert "participant_key" not in chats.find_one({"_id": ObjectId(chat_id)})
+        # Um único round trip, inclusive para o tombstone de quem saiu
+        assert collection.calls == ["find_one_and_update"]
+        assert test_db["tombstones"].find_one({"entity_id": chat_id})["participant_ids"] == ["user2"]
+
+    def test_concurrent_participants_update_while_becoming_private(self):
+        """Testa que a chave usa os participantes finais quando outro PUT os troca entre a leitura e a escrita."""
+        chat_id = client.post("/chats/", json={"type": "group", "participant_ids": ["user1", "user2"]}).json()["id"]
+        chats = test_db["chats"]
+
+        class RacingCollection(ThreadedCollection):
+            raced = False
+
+            async def find_one(self, *args, **kwargs):
+                document = await self.__getattr__("find_one")(*args, **kwargs)
+                if not self.raced:
+                    # O PUT concorrente (participant_ids) termina logo depois desta leitura
+                    self.raced = True
+                    chats.update_one({"_id": ObjectId(chat_id)}, {"$set": {"participant_ids": ["user3", "user1"]}})
+                return document
+
+        service = ChatService(RacingCollection(chats))
+        chat = asyncio.run(service.update_chat(chat_id, ChatUpdate(type="private")))
+        assert (chat.type, chat.participant_ids) == ("private", ["user3", "user1"])
+        assert chats.find_one({"_id": ObjectId(chat_id)})["participant_key"] == "user1,user3"
+
+    def test_group_chats_are_not_deduplicated(self):
+        """Testa que chats em grupo com os mesmos participantes são criados."""
+        for _ in range(2):
+            response = client.post("/chats/", json={"type": "group", "participant_ids": ["user1", "user2"]})
+            assert response.status_code == 201
+        assert test_db["chats"].count_documents({}) == 2
+
+    def test_update_to_existing_private_chat_conflicts(self):
+        """Testa 409 ao atualizar um chat para o par de um chat privado existente."""
+        client.post("/chats/", json={"type": "private", "participant_ids": ["user1", "user2"]})
+        group_id = client.post("/chats/", json={"type": "group", "participant_ids": ["user2", "user1"]}).json()["id"]
+        response = client.put(f"/chats/{group_id}", json={"type": "private"})
+        assert response.status_code == 409
+
+        response = client.put(f"/chats/{group_id}", json={"participant_ids": ["user1", "user3"]})
+        assert response.status_code == 200
+        response = client.put(f"/chats/{group_id}", json={"type": "private"})
+        assert response.status_code == 200
+        assert test_db["chats"].find_one({"participant_key": "user1,user3"}) is not None
+
+    def test_bulk_duplicate_private_chat(self):
+        """Testa erro por item para chat privado já existente no lote."""
+        items = [
+            {"type": "private", "participant_ids": ["user1", "user2"]},
+            {"type": "private", "participant_ids": ["user2", "user1"]},
+        ]
+        data = client.post("/chats/bulk", json={"items": items}).json()
+        assert data["created"] == 1
+        assert data["results"][1]["error"] == "Private chat already exists"
+
+
+class TestChatBulkCreation:
+    """Testes para criação de chats em lote."""
+
+    def test_bulk_create_chats(self):
+        """Testa resultado por item com um item inválido no meio."""
+        items = [
+            {"type": "private", "participant_ids": ["user1", "user2"]},
+            {"type": "group"},
+            {"type": "group", "participant_ids": ["user1", "user2", "user3"]},
+        ]
+        response = client.post("/chats/bulk", json={"items": items})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["failed"] == 1
+        assert data["results"][1]["id"] is None
+        assert "participant_ids" in data["results"][1]["error"]
+
+        response = client.get(f"/chats/{data['results'][2]['id']}")
+        assert response.status_code == 200
+        assert response.json()["participant_ids"] == ["user1", "user2", "user3"]
+
+
+class TestChatExport:
+    """Testes para exportação NDJSON de chats."""
+
+    def test_export_chats_ndjson(self):
+        """Testa exportação em lotes menores que o total, em ordem de criação."""
+        created_ids = [
+            client.post("/chats/", json={"type": "group", "participant_ids": ["user1", f"user{i}"]}).json()["id"]
+            for i in range(5)
+        ]
+        response = client.get("/chats/export", params={"batch_size": 2})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == created_ids
+        assert {"type", "participant_ids", "created_at", "updated_at", "last_message_at"} <= rows[0].keys()
+
+    def test_export_chats_resume_and_filter(self):
+        """Testa retomada por after_id e filtro por updated_at."""
+        created_ids = [
+            client.post("/chats/", json={"type": "group", "participant_ids": ["user1", f"user{i}"]}).json()["id"]
+            for i in range(3)
+        ]
+        response = client.get("/chats/export", params={"after_id": created_ids[0]})
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == created_ids[1:]
+
+        response = client.get("/chats/export", params={"updated_since": "2999-01-01T00:00:00"})
+        assert response.status_code == 200
+        assert response.text == ""
+
+    def test_export_chats_invalid_after_id(self):
+        """Testa erro com after_id inválido."""
+        response = client.get("/chats/export", params={"after_id": "invalid"})
+        assert response.status_code == 400
@@ -0,0 +1,63 @@
+"""Testes para o DataLoader."""
+import asyncio
+
+from utils.dataloader import DataLoader
+
+
+class TestDataLoader:
+    """Testes para agrupamento e deduplicação de buscas."""
+
+    def test_coalesces_and_deduplicates(self):
+        """Testa que buscas concorrentes viram um único lote sem chaves repetidas."""
+        calls = []
+
+        async def batch_load(keys):
+            calls.append(keys)
+            return {key: key.upper() for key in keys if key != "missing"}
+
+        async def scenario():
+            loader = DataLoader(batch_load)
+            results = await asyncio.gather(
+                loader.load("a"),
+                loader.load_many(["b", "a", "missing"]),
+                loader.load("c"),
+            )
+            cached = await loader.load("a")
+            return results, cached
+
+        results, cached = asyncio.run(scenario())
+        assert results == ["A", ["B", "A", None], "C"]
+        assert cached == "A"
+        assert calls == [["a", "b", "missing", "c"]]
+
+    def test_max_batch_size(self):
+        """Testa divisão em lotes de tamanho máximo."""
+        calls = []
+
+        async def batch_load(keys):
+            calls.append(keys)
+            return {key: key for key in keys}
+
+        async def scenario():
+            loader = DataLoader(batch_load, max_batch_size=2)
+            return await loader.load_many(["a", "b", "c"])
+
+        assert asyncio.run(scenario()) == ["a", "b", "c"]
+        assert calls == [["a", "b"], ["c"]]
+
+    def test_keeps_batch_tasks_until_done(self):
+        """Testa que o loader guarda a task de cada lote em andamento e a solta ao terminar."""
+        in_flight = []
+
+        async def scenario():
+            async def batch_load(keys):
+                in_flight.append(len(loader._tasks))
+                return {key: key for key in keys}
+
+            loader = DataLoader(batch_load, max_batch_size=2)
+            values = await loader.load_many(["a", "b", "c"])
+            await asyncio.sleep(0)
+            return values, len(loader._tasks)
+
+        assert asyncio.run(scenario()) == (["a", "b", "c"], 0)
+        assert in_flight == [2, 2]
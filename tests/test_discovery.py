@@ -0,0 +1,110 @@
+"""Testes para a descoberta de contatos por hash de telefone."""
+import json
+
+from api.dependencies import get_discover_limiter
+from auth.tokens import create_access_token
+from config import Settings
+from main import app
+from tests.conftest import client
+from utils.phone import hash_phone_number
+from utils.rate_limit import QuotaLimiter
+
+
+def _auth(user_id):
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+def _discover(hashes, caller_id=None, headers=None):
+    return client.post("/users/discover", json={"hashes": hashes}, headers=headers if headers is not None else _auth(caller_id))
+
+
+class TestContactDiscovery:
+    """Testes para POST /users/discover."""
+
+    def test_discover_returns_registered_users(self, monkeypatch, test_user, create_user):
+        """Testa que só os hashes cadastrados voltam, em NDJSON, com consultas em lotes."""
+        monkeypatch.setattr(Settings, "DISCOVER_CHUNK_SIZE", 2)
+        first = create_user(1, phone_number="+5511911111111", public_key="key_1")
+        second = create_user(2, phone_number="+5511922222222", public_key="key_2")
+        hashes = [
+            hash_phone_number("+55 (11) 91111-1111"),
+            hash_phone_number("+5511933333333"),
+            hash_phone_number("+5511922222222"),
+            hash_phone_number("+5511922222222"),
+        ]
+
+        response = _discover(hashes, test_user["id"])
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda row: row["public_key"])
+        assert rows == [
+            {"id": first, "public_key": "key_1", "phone_hash": hashes[0]},
+            {"id": second, "public_key": "key_2", "phone_hash": hashes[2]},
+        ]
+
+    def test_discover_requires_token(self):
+        """Testa 401 sem token, com token inválido ou de usuário inexistente, sem consumir cota."""
+        limiter = QuotaLimiter(3, 60)
+        app.dependency_overrides[get_discover_limiter] = lambda: limiter
+        try:
+            hashes = [hash_phone_number("+5511911111111")]
+            assert _discover(hashes, headers={}).status_code == 401
+            assert _discover(hashes, headers={"Authorization": "Bearer invalid"}).status_code == 401
+            assert _discover(hashes, "507f1f77bcf86cd799439011").status_code == 401
+            assert limiter.stats()["callers"] == 0
+        finally:
+            app.dependency_overrides.pop(get_discover_limiter)
+
+    def test_discover_rejects_invalid_hashes(self, test_user):
+        """Testa 422 para hashes fora do formato SHA-256 hex."""
+        assert _discover(["+5511911111111"], test_user["id"]).status_code == 422
+
+    def test_discover_quota_per_caller(self, test_user, create_user):
+        """Testa 429 com Retry-After quando o chamador esgota a cota."""
+        limiter = QuotaLimiter(3, 60)
+        app.dependency_overrides[get_discover_limiter] = lambda: limiter
+        try:
+            hashes = [hash_phone_number(f"+55119000000{i}") for i in range(3)]
+            assert _discover(hashes, test_user["id"]).status_code == 200
+            response = _discover(hashes[:1], test_user["id"])
+            assert response.status_code == 429
+            assert int(response.headers["Retry-After"]) >= 1
+            # Outro chamador tem a própria cota
+            other = create_user(7, phone_number="+5511977777777", public_key="key_other")
+            assert _discover(hashes, other).status_code == 200
+        finally:
+            app.dependency_overrides.pop(get_discover_limiter)
+
+
+class TestQuotaLimiter:
+    """Testes para o token bucket por chamador."""
+
+    def test_refills_over_window(self):
+        """Testa consumo, espera calculada e reposição proporcional ao tempo."""
+        now = [0.0]
+        limiter = QuotaLimiter(10, 10, clock=lambda: now[0])
+        assert limiter.acquire("a", 8) == 0
+        assert limiter.acquire("a", 4) == 2.0
+        now[0] = 2.0
+        assert limiter.acquire("a", 4) == 0
+        assert limiter.acquire("a", 11) == float("inf")
+        assert limiter.stats() == {"callers": 1, "rejected": 2}
+
+    def test_evicts_least_recent_callers(self):
+        """Testa o limite de chamadores em memória."""
+        limiter = QuotaLimiter(1, 60, max_callers=2)
+        for caller in ("a", "b", "c"):
+            limiter.acquire(caller, 1)
+        assert limiter.stats()["callers"] == 2
+        assert limiter.acquire("a", 1) == 0
+
+    def test_evicts_idle_callers_on_every_call(self):
+        """Testa que baldes parados há uma janela saem em qualquer chamada, inclusive rejeitada."""
+        now = [0.0]
+        limiter = QuotaLimiter(2, 10, clock=lambda: now[0])
+        limiter.acquire("a", 1)
+        limiter.acquire("b", 1)
+        now[0] = 10.0
+        assert limiter.acquire("c", 5) == float("inf")
+        assert limiter.stats()["callers"] == 1
+        assert limiter.acquire("a", 2) == 0
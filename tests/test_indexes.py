@@ -0,0 +1,43 @@
+"""Testes para a reconciliação de índices."""
+import asyncio
+
+from pymongo import IndexModel, ASCENDING
+
+from database.indexes import ensure_indexes, ensure_collection_indexes
+from database.threaded import ThreadedCollection
+from tests.conftest import test_db
+
+
+def _collection(name):
+    return ThreadedCollection(test_db[name])
+
+
+class TestEnsureIndexes:
+    """Testes para ensure_indexes."""
+
+    def test_ensure_indexes_is_idempotent(self):
+        """Testa que a segunda execução não altera nenhum índice."""
+        asyncio.run(ensure_indexes(_collection))
+        report = asyncio.run(ensure_indexes(_collection))
+        for actions in report.values():
+            assert actions["created"] == []
+            assert actions["rebuilt"] == []
+            assert actions["unchanged"]
+
+    def test_changed_definition_is_rebuilt(self):
+        """Testa que um índice com definição alterada é recriado."""
+        collection = _collection("index_test")
+        asyncio.run(ensure_collection_indexes(collection, [IndexModel([("a", ASCENDING)], name="a_idx")]))
+        report = asyncio.run(ensure_collection_indexes(
+            collection, [IndexModel([("a", ASCENDING)], name="a_idx", unique=True)]
+        ))
+        assert report["rebuilt"] == ["a_idx"]
+        assert test_db["index_test"].index_information()["a_idx"]["unique"] is True
+        test_db.drop_collection("index_test")
+
+    def test_prune_drops_undeclared_indexes(self):
+        """Testa que prune remove índices não declarados."""
+        test_db["index_test"].create_index("b", name="b_idx")
+        report = asyncio.run(ensure_collection_indexes(_collection("index_test"), [], prune=True))
+        assert report["dropped"] == ["b_idx"]
+        test_db.drop_collection("index_test")
@@ -0,0 +1,175 @@
+"""Testes para rotas de mensagens."""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from bson import ObjectId
+
+from database.threaded import ThreadedCollection
+from models.message import MessageCreate
+from services.message_service import MessageService
+from tests.conftest import client, test_db
+
+
+class TestMessageSend:
+    """Testes para envio de mensagens."""
+
+    def test_send_message_success(self, create_chat, send_message):
+        """Testa envio de mensagem com sucesso."""
+        chat_id = create_chat()
+        response = send_message(chat_id, "hello")
+        assert response.status_code == 201
+        data = response.json()
+        assert data["chat_id"] == chat_id
+        assert data["sender_id"] == "user1"
+        assert data["content"] == "hello"
+        assert "id" in data
+        assert "created_at" in data
+
+    def test_send_message_updates_last_message_at(self, create_chat, send_message):
+        """Testa que o envio atualiza last_message_at do chat."""
+        chat_id = create_chat()
+        send_message(chat_id, "hello")
+        chats = client.get("/users/user1/chats").json()["chats"]
+        assert chats[0]["id"] == chat_id
+        assert chats[0]["last_message_at"] is not None
+
+    def test_send_message_non_participant(self, create_chat, send_message):
+        """Testa erro quando o remetente não participa do chat."""
+        chat_id = create_chat()
+        response = send_message(chat_id, "hello", sender_id="intruder")
+        assert response.status_code == 404
+
+    def test_send_message_nonexistent_chat(self, send_message):
+        """Testa erro ao enviar para chat inexistente."""
+        response = send_message("507f1f77bcf86cd799439011", "hello")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Chat not found"
+
+    def test_messages_are_bucketed(self, create_chat, send_message):
+        """Testa que as mensagens são agrupadas em buckets."""
+        chat_id = create_chat()
+        with patch("services.message_service.settings.MESSAGE_BUCKET_SIZE", 3):
+            for i in range(7):
+                send_message(chat_id, f"message {i}")
+        buckets = list(test_db["message_buckets"].find({"chat_id": chat_id}).sort("seq", 1))
+        assert [(bucket["seq"], bucket["count"]) for bucket in buckets] == [(0, 3), (1, 3), (2, 1)]
+
+    def test_concurrent_sends_open_one_bucket(self, create_chat, send_message):
+        """Testa que, se outro envio abre o próximo bucket antes, a mensagem vai para ele."""
+        chat_id = create_chat()
+        buckets = test_db["message_buckets"]
+
+        class RacingBuckets(ThreadedCollection):
+            raced = False
+
+            async def find_one(self, *args, **kwargs):
+                document = await self.__getattr__("find_one")(*args, **kwargs)
+                if not self.raced:
+                    # Envio concorrente abre o bucket seguinte logo depois desta leitura
+                    self.raced = True
+                    message = {"_id": ObjectId(), "sender_id": "user2", "content": "oi", "created_at": datetime.now(timezone.utc)}
+                    buckets.insert_one({"chat_id": chat_id, "seq": 1, "bucket_key": f"{chat_id}:1", "messages": [message],
+                                        "count": 1, "first_at": message["created_at"], "last_at": message["created_at"]})
+                return document
+
+        with patch("services.message_service.settings.MESSAGE_BUCKET_SIZE", 2):
+            for i in range(2):
+                send_message(chat_id, f"message {i}")
+            service = MessageService(RacingBuckets(buckets), ThreadedCollection(test_db["chats"]))
+            message = asyncio.run(service.send_message(chat_id, MessageCreate(sender_id="user1", content="race")))
+        assert message is not None
+        counts = [(bucket["seq"], bucket["count"]) for bucket in buckets.find({"chat_id": chat_id}).sort("seq", 1)]
+        assert counts == [(0, 2), (1, 2)]
+
+    def test_send_rolls_back_when_sender_leaves(self, create_chat):
+        """Testa que a mensagem sai do bucket se o remetente deixa o chat antes de o chat avançar."""
+        chat_id = create_chat()
+        chats = test_db["chats"]
+
+        class RacingChats(ThreadedCollection):
+            async def find_one(self, *args, **kwargs):
+                document = await self.__getattr__("find_one")(*args, **kwargs)
+                chats.update_one({"_id": ObjectId(chat_id)}, {"$pull": {"participant_ids": "user1"}})
+                return document
+
+        service = MessageService(ThreadedCollection(test_db["message_buckets"]), RacingChats(chats))
+        message = asyncio.run(service.send_message(chat_id, MessageCreate(sender_id="user1", content="hello")))
+        assert message is None
+        bucket = test_db["message_buckets"].find_one({"chat_id": chat_id})
+        assert (bucket["count"], bucket["messages"]) == (1, [])
+        assert chats.find_one({"_id": ObjectId(chat_id)}).get("last_message_at") is None
+
+    def test_send_after_rollback_does_not_reopen_older_bucket(self, create_chat, send_message):
+        """Testa que a vaga liberada pela retirada não faz um bucket antigo voltar a receber mensagens."""
+        chat_id = create_chat()
+        chats = test_db["chats"]
+        buckets = test_db["message_buckets"]
+
+        class RacingChats(ThreadedCollection):
+            async def find_one(self, *args, **kwargs):
+                document = await self.__getattr__("find_one")(*args, **kwargs)
+                # O remetente sai do chat enquanto outros envios enchem o bucket seguinte
+                chats.update_one({"_id": ObjectId(chat_id)}, {"$pull": {"participant_ids": "user1"}})
+                now = datetime.now(timezone.utc)
+                messages = [{"_id": ObjectId(), "sender_id": "user2", "content": "oi", "created_at": now} for _ in range(2)]
+                buckets.insert_one({"chat_id": chat_id, "seq": 1, "bucket_key": f"{chat_id}:1", "messages": messages,
+                                    "count": 2, "first_at": now, "last_at": now})
+                return document
+
+        with patch("services.message_service.settings.MESSAGE_BUCKET_SIZE", 2):
+            send_message(chat_id, "first")
+            service = MessageService(ThreadedCollection(buckets), RacingChats(chats))
+            assert asyncio.run(service.send_message(chat_id, MessageCreate(sender_id="user1", content="rolled back"))) is None
+            assert send_message(chat_id, "after", sender_id="user2").status_code == 201
+        contents = {
+            bucket["seq"]: [message["content"] for message in bucket["messages"]]
+            for bucket in buckets.find({"chat_id": chat_id})
+        }
+        assert contents == {0: ["first"], 1: ["oi", "oi"], 2: ["after"]}
+
+
+class TestMessageHistory:
+    """Testes para o histórico paginado."""
+
+    def test_list_messages_pagination(self, create_chat, send_message):
+        """Testa histórico do mais recente ao mais antigo, atravessando buckets."""
+        chat_id = create_chat()
+        with patch("services.message_service.settings.MESSAGE_BUCKET_SIZE", 3):
+            sent_ids = [send_message(chat_id, f"message {i}").json()["id"] for i in range(8)]
+
+        seen_ids = []
+        cursor = None
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["before"] = cursor
+            response = client.get(f"/chats/{chat_id}/messages", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            seen_ids.extend(message["id"] for message in data["messages"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen_ids == list(reversed(sent_ids))
+
+    def test_list_messages_empty(self, create_chat):
+        """Testa histórico de chat sem mensagens."""
+        chat_id = create_chat()
+        response = client.get(f"/chats/{chat_id}/messages")
+        assert response.status_code == 200
+        assert response.json() == {"messages": [], "next_cursor": None}
+
+    def test_list_messages_invalid_cursor(self, create_chat):
+        """Testa erro com cursor inválido."""
+        chat_id = create_chat()
+        response = client.get(f"/chats/{chat_id}/messages", params={"before": "invalid"})
+        assert response.status_code == 400
+
+    def test_delete_chat_removes_messages(self, create_chat, send_message):
+        """Testa que deletar o chat remove seus buckets de mensagens."""
+        chat_id = create_chat()
+        send_message(chat_id, "hello")
+        client.delete(f"/chats/{chat_id}")
+        assert test_db["message_buckets"].count_documents({"chat_id": chat_id}) == 0
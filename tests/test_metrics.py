@@ -0,0 +1,72 @@
+"""Testes para métricas de requisição, comandos do MongoDB e GET /metrics."""
+from types import SimpleNamespace
+
+from database.monitoring import CommandMetrics, MONGO_COMMAND_DURATION
+from utils.metrics import Histogram, end_request_timings, start_request_timings
+from tests.conftest import client
+
+
+class TestMetricsEndpoint:
+    """Testes para o middleware de métricas e o /metrics."""
+
+    def test_request_is_recorded_by_route(self, test_user):
+        """Testa contadores por template de rota, tamanho de resposta e gauges de estatísticas."""
+        client.get(f"/users/{test_user['id']}")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'talkhub_http_requests_total{method="GET",route="/users/{user_id}",status="200"}' in text
+        assert 'talkhub_http_response_size_bytes_count{method="GET",route="/users/{user_id}"}' in text
+        assert "talkhub_http_requests_in_flight" in text
+        assert "talkhub_user_cache_hits" in text
+        assert "talkhub_presence_pending" in text
+
+    def test_server_timing_header(self):
+        """Testa o cabeçalho Server-Timing com tempo de app, banco e threadpool."""
+        response = client.get("/chats/")
+        server_timing = response.headers["server-timing"]
+        assert server_timing.startswith("app;dur=")
+        assert "db;dur=" in server_timing
+        assert "pool;dur=" in server_timing
+
+    def test_unmatched_route_label(self):
+        """Testa que URLs inexistentes não geram um label por caminho."""
+        client.get("/does-not-exist/123")
+        assert 'route="unmatched",status="404"' in client.get("/metrics").text
+
+
+class TestHistogram:
+    """Testes para o histograma."""
+
+    def test_buckets_are_cumulative(self):
+        """Testa buckets cumulativos, soma e contagem no formato do Prometheus."""
+        histogram = Histogram("test_seconds", "Teste.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe("/x", value=value)
+        lines = histogram.render()
+        assert 'test_seconds_bucket{route="/x",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{route="/x",le="1.0"} 2' in lines
+        assert 'test_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{route="/x"} 3' in lines
+
+
+class TestCommandMetrics:
+    """Testes para o listener de comandos do MongoDB."""
+
+    def test_durations_are_attached_to_request(self):
+        """Testa duração por coleção/comando e acumulação na requisição corrente."""
+        listener = CommandMetrics()
+        before = MONGO_COMMAND_DURATION.count("users", "find")
+        timings, token = start_request_timings()
+        try:
+            listener.started(SimpleNamespace(request_id=1, command_name="find", command={"find": "users"}))
+            listener.succeeded(SimpleNamespace(request_id=1, command_name="find", duration_micros=1500))
+            listener.started(SimpleNamespace(request_id=2, command_name="getMore", command={"getMore": 9, "collection": "users"}))
+            listener.succeeded(SimpleNamespace(request_id=2, command_name="getMore", duration_micros=500))
+        finally:
+            end_request_timings(token)
+        assert MONGO_COMMAND_DURATION.count("users", "find") == before + 1
+        assert MONGO_COMMAND_DURATION.count("users", "getMore") >= 1
+        assert timings.mongo_commands == 2
+        assert abs(timings.mongo_seconds - 0.002) < 1e-9
@@ -0,0 +1,137 @@
+"""Testes para as migrações de dados."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from database.migrations import backfill_participant_keys, backfill_user_phone_hashes, backfill_user_search_keys
+from config import Settings
+from database.threaded import ThreadedCollection
+from tests.conftest import client, test_db
+from utils.phone import hash_phone_number
+
+
+class TestParticipantKeysMigration:
+    """Testes para o backfill de participant_key com fusão de duplicados."""
+
+    def test_backfill_merges_duplicates(self):
+        """Testa que chats privados duplicados são fundidos no mais antigo."""
+        earlier = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        later = datetime(2025, 1, 2, tzinfo=timezone.utc)
+        chats = test_db["chats"]
+
+        def insert_chat(chat_type, participant_ids, last_message_at=None):
+            return chats.insert_one({
+                "type": chat_type, "participant_ids": participant_ids,
+                "created_at": earlier, "updated_at": earlier, "last_message_at": last_message_at,
+            }).inserted_id
+
+        keeper_id = insert_chat("private", ["user1", "user2"])
+        duplicate_id = insert_chat("private", ["user2", "user1"], later)
+        other_id = insert_chat("private", ["user1", "user3"])
+        insert_chat("group", ["user1", "user2"])
+        message = {"_id": ObjectId(), "sender_id": "user2", "content": "oi", "created_at": later}
+        test_db["message_buckets"].insert_one({
+            "chat_id": str(duplicate_id), "count": 1, "messages": [message], "first_at": later, "last_at": later,
+        })
+
+        def run():
+            return asyncio.run(backfill_participant_keys(
+                ThreadedCollection(chats), ThreadedCollection(test_db["message_buckets"])
+            ))
+
+        assert run() == {"keyed": 2, "merged": 1}
+        assert chats.find_one({"_id": duplicate_id}) is None
+        keeper = chats.find_one({"_id": keeper_id})
+        assert keeper["participant_key"] == "user1,user2"
+        assert keeper["last_message_at"].replace(tzinfo=timezone.utc) == later
+        assert chats.find_one({"_id": other_id})["participant_key"] == "user1,user3"
+        assert test_db["message_buckets"].find_one({})["chat_id"] == str(keeper_id)
+        assert run() == {"keyed": 0, "merged": 0}
+        assert test_db["message_buckets"].count_documents({}) == 1
+
+        # Após a migração, o get-or-create encontra o chat fundido
+        response = client.post("/chats/", json={"type": "private", "participant_ids": ["user2", "user1"]})
+        assert response.status_code == 200
+        assert response.json()["id"] == str(keeper_id)
+
+
+    def test_backfill_rebuckets_merged_history(self, monkeypatch):
+        """Testa que o histórico fundido volta a ter buckets sem sobreposição (mais recentes primeiro)."""
+        monkeypatch.setattr(Settings, "MESSAGE_BUCKET_SIZE", 3)
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        chats, buckets = test_db["chats"], test_db["message_buckets"]
+        chat_ids = [
+            chats.insert_one({"type": "private", "participant_ids": ["user1", "user2"],
+                              "created_at": base, "updated_at": base}).inserted_id
+            for _ in range(2)
+        ]
+
+        def insert_bucket(chat_id, seq, minutes):
+            messages = [
+                {"_id": ObjectId(), "sender_id": "user1", "content": str(minute), "created_at": base + timedelta(minutes=minute)}
+                for minute in minutes
+            ]
+            buckets.insert_one({"chat_id": str(chat_id), "seq": seq, "bucket_key": f"{chat_id}:{seq}",
+                                "count": len(messages), "messages": messages,
+                                "first_at": messages[0]["created_at"], "last_at": messages[-1]["created_at"]})
+
+        insert_bucket(chat_ids[0], 0, [50, 55, 60])
+        insert_bucket(chat_ids[1], 0, [40, 45])
+        insert_bucket(chat_ids[1], 1, [1, 70, 80, 90])
+
+        asyncio.run(backfill_participant_keys(ThreadedCollection(chats), ThreadedCollection(buckets)))
+        # Seq renumerados acima dos do chat mantido, sem colidir no índice único
+        merged = buckets.find({"chat_id": str(chat_ids[0])}).sort("seq", 1)
+        assert [bucket["bucket_key"] for bucket in merged] == [f"{chat_ids[0]}:{seq}" for seq in (1, 2, 3)]
+        response = client.get(f"/chats/{chat_ids[0]}/messages", params={"limit": 3})
+        assert [message["content"] for message in response.json()["messages"]] == ["90", "80", "70"]
+
+
+class TestUserSearchKeysMigration:
+    """Testes para o backfill das chaves de busca de usuários."""
+
+    def test_backfill_search_keys(self):
+        """Testa que usuários antigos passam a aparecer na busca."""
+        users = test_db["users"]
+        now = datetime.now(timezone.utc)
+        for i in range(3):
+            users.insert_one({
+                "display_name": f"Élodie {i}", "public_key": "key", "phone_number": f"+5511{i}",
+                "created_at": now, "updated_at": now,
+            })
+
+        report = asyncio.run(backfill_user_search_keys(ThreadedCollection(users), batch_size=2))
+        assert report == {"updated": 3, "conflicts": 0}
+        assert users.find_one({"display_name": "Élodie 0"})["search_tokens"] == ["0", "elodie"]
+        assert len(client.get("/users/search", params={"q": "elo"}).json()["users"]) == 3
+
+
+class TestUserPhoneHashesMigration:
+    """Testes para o backfill dos hashes de telefone."""
+
+    def test_backfill_phone_hashes(self):
+        """Testa que usuários antigos recebem phone_hash e os já preenchidos ficam como estão."""
+        users = test_db["users"]
+        now = datetime.now(timezone.utc)
+        users.insert_one({"display_name": "Antigo", "public_key": "key", "phone_number": "+5511911111111",
+                          "created_at": now, "updated_at": now})
+        client.post("/users/", json={"display_name": "Novo", "public_key": "key", "phone_number": "+5511922222222"})
+
+        report = asyncio.run(backfill_user_phone_hashes(ThreadedCollection(users)))
+        assert report == {"updated": 1, "conflicts": 0}
+        assert users.find_one({"display_name": "Antigo"})["phone_hash"] == hash_phone_number("+5511911111111")
+
+    def test_backfill_phone_hashes_skips_conflicts(self):
+        """Testa que telefones que só diferem na formatação não abortam a migração."""
+        users = test_db["users"]
+        now = datetime.now(timezone.utc)
+        for name, phone_number in (("A", "+55 11 91111-1111"), ("B", "+5511911111111"), ("C", "+5511933333333")):
+            users.insert_one({"display_name": name, "public_key": "key", "phone_number": phone_number,
+                              "created_at": now, "updated_at": now})
+
+        report = asyncio.run(backfill_user_phone_hashes(ThreadedCollection(users), batch_size=1))
+        assert report == {"updated": 2, "conflicts": 1}
+        assert users.find_one({"display_name": "A"})["phone_hash"] == hash_phone_number("+5511911111111")
+        assert "phone_hash" not in users.find_one({"display_name": "B"})
+        assert users.find_one({"display_name": "C"})["phone_hash"] == hash_phone_number("+5511933333333")
@@ -0,0 +1,154 @@
+"""Testes para o buffer de presença (heartbeats de last_active_at)."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from services.presence import PresenceBuffer, get_presence_buffer
+from tests.conftest import client, test_db
+
+
+class BulkWriteCollection:
+    """
+    Aplica no mongomock as operações de bulk_write uma a uma: o mongomock
+    4.3 não aceita o UpdateOne do pymongo 4.x dentro de bulk_write.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append((len(operations), ordered))
+        for operation in operations:
+            self.collection.update_one(operation._filter, operation._doc)
+
+
+def _flush():
+    buffer = get_presence_buffer()
+    collection = BulkWriteCollection(test_db["users"])
+    original, buffer._get_collection = buffer._get_collection, lambda: collection
+    try:
+        flushed = asyncio.run(buffer.flush())
+    finally:
+        buffer._get_collection = original
+    assert collection.calls in ([], [(flushed, False)])
+    return flushed
+
+
+def _stored_last_active_at(user_id):
+    return test_db["users"].find_one({"_id": ObjectId(user_id)}).get("last_active_at")
+
+
+class TestPresence:
+    """Testes para heartbeats com gravação em lote."""
+
+    def test_heartbeat_is_buffered_until_flush(self, test_user):
+        """Testa que o heartbeat não grava na hora, mas aparece na leitura."""
+        response = client.post(f"/users/{test_user['id']}/heartbeat")
+        assert response.status_code == 204
+        assert _stored_last_active_at(test_user["id"]) is None
+
+        response = client.get(f"/users/{test_user['id']}")
+        assert response.json()["last_active_at"] is not None
+
+        assert _flush() == 1
+        assert _stored_last_active_at(test_user["id"]) is not None
+        assert get_presence_buffer().stats()["last_flush_size"] == 1
+
+    def test_heartbeat_unknown_user(self):
+        """Testa heartbeat de usuário inexistente."""
+        response = client.post(f"/users/{ObjectId()}/heartbeat")
+        assert response.status_code == 404
+
+    def test_updates_are_coalesced(self, test_user):
+        """Testa que vários heartbeats do mesmo usuário viram uma escrita com o maior valor."""
+        base = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        for minutes in (5, 1, 3):
+            response = client.put(
+                f"/users/{test_user['id']}",
+                json={"last_active_at": (base + timedelta(minutes=minutes)).isoformat()},
+            )
+            assert response.status_code == 200
+            assert response.json()["last_active_at"] == (base + timedelta(minutes=5)).isoformat()
+
+        assert get_presence_buffer().stats()["pending"] == 1
+        assert _flush() == 1
+        assert _stored_last_active_at(test_user["id"]) == (base + timedelta(minutes=5)).replace(tzinfo=None)
+
+    def test_flush_never_moves_value_backwards(self, test_user):
+        """Testa que o $max preserva um valor mais recente já gravado."""
+        newer = datetime(2030, 1, 1)
+        test_db["users"].update_one({"_id": ObjectId(test_user["id"])}, {"$set": {"last_active_at": newer}})
+        client.put(f"/users/{test_user['id']}", json={"last_active_at": "2024-01-01T00:00:00+00:00"})
+        _flush()
+        assert _stored_last_active_at(test_user["id"]) == newer
+
+    def test_update_with_other_fields(self, test_user):
+        """Testa que os demais campos continuam gravados imediatamente."""
+        response = client.put(
+            f"/users/{test_user['id']}",
+            json={"display_name": "Updated", "last_active_at": "2024-01-01T00:00:00+00:00"},
+        )
+        assert response.status_code == 200
+        assert response.json()["display_name"] == "Updated"
+        assert _stored_last_active_at(test_user["id"]) is None
+
+    def test_failed_flush_keeps_pending(self):
+        """Testa que um flush com erro mantém os heartbeats para a próxima tentativa."""
+        class FailingCollection:
+            async def bulk_write(self, operations, ordered=True):
+                raise RuntimeError("unavailable")
+
+        buffer = PresenceBuffer(lambda: FailingCollection())
+        user_id = str(ObjectId())
+        buffer.record(user_id, datetime(2024, 1, 1, tzinfo=timezone.utc))
+        assert asyncio.run(buffer.flush()) == 0
+        assert buffer.pending(user_id) == datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert buffer.stats()["errors"] == 1
+
+    def test_close_waits_for_flush_in_progress(self):
+        """Testa que close() não interrompe um flush em andamento nem perde heartbeats."""
+        written = []
+
+        class SlowCollection:
+            async def bulk_write(self, operations, ordered=True):
+                await asyncio.sleep(0.05)
+                written.extend(operation._filter["_id"] for operation in operations)
+
+        first, second = str(ObjectId()), str(ObjectId())
+
+        async def scenario():
+            buffer = PresenceBuffer(lambda: SlowCollection(), flush_interval=0.01)
+            await buffer.start()
+            buffer.record(first, datetime.now(timezone.utc))
+            # Fecha no meio do bulk_write do flush periódico
+            await asyncio.sleep(0.03)
+            buffer.record(second, datetime.now(timezone.utc))
+            await buffer.close()
+            return buffer
+
+        buffer = asyncio.run(scenario())
+        assert sorted(map(str, written)) == sorted([first, second])
+        assert buffer.stats()["pending"] == 0
+
+    def test_cancelled_flush_keeps_pending(self):
+        """Testa que um flush cancelado durante o bulk_write devolve o lote ao buffer."""
+        class BlockingCollection:
+            async def bulk_write(self, operations, ordered=True):
+                await asyncio.Event().wait()
+
+        user_id = str(ObjectId())
+        at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        async def scenario():
+            buffer = PresenceBuffer(lambda: BlockingCollection())
+            buffer.record(user_id, at)
+            task = asyncio.create_task(buffer.flush())
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return buffer
+
+        buffer = asyncio.run(scenario())
+        assert buffer.pending(user_id) == at
+        assert buffer.stats()["pending"] == 1
@@ -0,0 +1,73 @@
+"""Testes para o profiling sob demanda."""
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.dependencies import get_profile_ring
+from api.middleware import ProfilingMiddleware
+from api.routes.debug_routes import router as debug_router
+from config import Settings
+from utils.profiling import ProfileRing
+
+
+def _busy(seconds: float) -> int:
+    total = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def _build_client(ring: ProfileRing, **options) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        return {"iterations": _busy(0.03)}
+
+    app.include_router(debug_router)
+    app.dependency_overrides[get_profile_ring] = lambda: ring
+    return TestClient(ProfilingMiddleware(app, ring=ring, **options))
+
+
+class TestProfiling:
+    """Testes para o ProfilingMiddleware e o anel de perfis."""
+
+    def test_admin_header_profiles_request(self, tmp_path, monkeypatch):
+        """Testa perfil speedscope gerado com o token e baixado pela rota de debug."""
+        monkeypatch.setattr(Settings, "PROFILING_ADMIN_TOKEN", "secret")
+        client = _build_client(ProfileRing(str(tmp_path), 10), admin_token="secret")
+
+        assert "x-profile-id" not in client.get("/slow").headers
+        assert "x-profile-id" not in client.get("/slow", headers={"X-Profile": "wrong"}).headers
+
+        response = client.get("/slow", headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        name = response.headers["x-profile-id"]
+
+        listing = client.get("/debug/profiles", headers={"X-Profile": "secret"})
+        assert listing.json()["profiles"] == [name]
+        profile = client.get(f"/debug/profiles/{name}", headers={"X-Profile": "secret"})
+        data = json.loads(profile.content)
+        assert data["profiles"][0]["type"] == "sampled"
+        frame_names = {frame["name"] for frame in data["shared"]["frames"]}
+        assert "_busy" in frame_names
+
+    def test_debug_routes_require_token(self, tmp_path, monkeypatch):
+        """Testa que as rotas de debug exigem o token de administração."""
+        monkeypatch.setattr(Settings, "PROFILING_ADMIN_TOKEN", "secret")
+        client = _build_client(ProfileRing(str(tmp_path), 10), admin_token="secret")
+        assert client.get("/debug/profiles").status_code == 403
+        assert client.get("/debug/profiles/../etc", headers={"X-Profile": "secret"}).status_code == 404
+
+    def test_sampling_ring_is_bounded(self, tmp_path):
+        """Testa amostragem 1 a cada N em formato collapsed, com limite de arquivos."""
+        ring = ProfileRing(str(tmp_path), 2)
+        client = _build_client(ring, sample_every=2, profile_format="collapsed")
+        names = [client.get("/slow").headers.get("x-profile-id") for _ in range(6)]
+        assert names[0::2] == [None, None, None]
+        assert ring.list() == list(reversed(names[1::2]))[:2]
+        with open(ring.path(ring.list()[0]), encoding="utf-8") as file:
+            assert "_busy (test_profiling.py:" in file.read()
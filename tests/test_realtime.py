@@ -0,0 +1,256 @@
+"""Testes para o hub de tempo real e a rota WebSocket."""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+from starlette.websockets import WebSocketDisconnect
+
+from auth.tokens import create_access_token
+from database.mongodb import MongoDB
+from services.realtime_hub import InMemoryBroker, MongoBroker, RealtimeConnection, RealtimeHub
+from tests.conftest import client
+
+
+class FakeWebSocket:
+    """WebSocket em memória: registra o que foi enviado e bloqueia na leitura."""
+
+    def __init__(self, block_sends: bool = False):
+        self.sent: list[str] = []
+        self.closed_code = None
+        self._block_sends = block_sends
+
+    async def send_text(self, text: str):
+        if self._block_sends:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def receive_text(self) -> str:
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000):
+        self.closed_code = code
+
+
+async def _connect(hub, user_id, chat_ids, queue_size=8, block_sends=False):
+    connection = RealtimeConnection(FakeWebSocket(block_sends), user_id, queue_size)
+    hub.register(connection, chat_ids)
+    task = asyncio.create_task(connection.run())
+    return connection, task
+
+
+async def _wait_for(condition, timeout: float = 2.0):
+    # O broker reabre o cursor a cada 0.1s: espera a entrega sem depender do tempo exato
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+class FakeCappedCursor:
+    """Cursor sobre a capped collection em memória, em ordem de inserção."""
+
+    def __init__(self, documents: list, query: dict):
+        self._documents = documents
+        self._query = query
+        self._position = 0
+        self._sort = 1
+        self._limit = None
+
+    def _matches(self, document) -> bool:
+        bound = self._query.get("_id")
+        if bound is None:
+            return True
+        if isinstance(bound, dict):
+            return document["_id"] > bound["$gt"]
+        return document["_id"] == bound
+
+    def sort(self, field, direction):
+        self._sort = direction
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    async def to_list(self, length):
+        documents = [document for document in self._documents if self._matches(document)][::self._sort]
+        return documents[:self._limit]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Como um cursor tailable que morre ao chegar ao fim: o broker reabre
+        while self._position < len(self._documents):
+            document = self._documents[self._position]
+            self._position += 1
+            if self._matches(document):
+                return document
+        raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+class FakeCappedCollection:
+    """Capped collection em memória; a ordem de inserção independe do _id."""
+
+    def __init__(self):
+        self.documents: list = []
+
+    def insert(self, envelope: dict, seconds_ago: int = 0):
+        # ObjectId gerado por um worker com o relógio atrasado em seconds_ago
+        generated = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+        self.documents.append({"_id": ObjectId.from_datetime(generated), "envelope": envelope})
+
+    def find(self, query=None, projection=None, cursor_type=None):
+        return FakeCappedCursor(self.documents, query or {})
+
+    async def find_one(self, query, projection=None):
+        documents = await FakeCappedCursor(self.documents, query).to_list(1)
+        return documents[0] if documents else None
+
+
+class TestRealtimeHub:
+    """Testes para o fan-out do hub."""
+
+    def test_fan_out_to_chat_subscribers(self):
+        """Testa entrega apenas às conexões inscritas no chat."""
+        async def scenario():
+            hub = RealtimeHub(InMemoryBroker())
+            alice, alice_task = await _connect(hub, "alice", ["chat1"])
+            bob, bob_task = await _connect(hub, "bob", ["chat2"])
+            await hub.publish("chat1", {"type": "message.created"})
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            for connection in (alice, bob):
+                connection.close()
+            await asyncio.gather(alice_task, bob_task)
+            return alice.websocket.sent, bob.websocket.sent
+
+        alice_sent, bob_sent = asyncio.run(scenario())
+        assert [json.loads(text) for text in alice_sent] == [{"type": "message.created"}]
+        assert bob_sent == []
+
+    def test_slow_consumer_is_disconnected(self):
+        """Testa que a fila cheia desconecta só o cliente lento."""
+        async def scenario():
+            hub = RealtimeHub(InMemoryBroker())
+            slow, slow_task = await _connect(hub, "slow", ["chat1"], queue_size=2, block_sends=True)
+            fast, fast_task = await _connect(hub, "fast", ["chat1"], queue_size=2)
+            for i in range(5):
+                await hub.publish("chat1", {"n": i})
+                await asyncio.sleep(0)
+            await slow_task
+            stats = hub.stats()
+            fast.close()
+            await fast_task
+            return slow, fast, stats
+
+        slow, fast, stats = asyncio.run(scenario())
+        assert slow.overflowed
+        assert slow.websocket.closed_code == 1013
+        assert len(fast.websocket.sent) == 5
+        assert stats["dropped_connections"] == 1
+        assert stats["connections"] == 1
+
+    def test_set_chat_members(self):
+        """Testa inclusão e remoção de participantes conectados."""
+        async def scenario():
+            hub = RealtimeHub(InMemoryBroker())
+            alice, alice_task = await _connect(hub, "alice", [])
+            bob, bob_task = await _connect(hub, "bob", ["chat1"])
+            await hub.set_chat_members("chat1", ["alice"])
+            await hub.publish("chat1", {"type": "ping"})
+            await asyncio.sleep(0)
+            for connection in (alice, bob):
+                connection.close()
+            await asyncio.gather(alice_task, bob_task)
+            return alice.websocket.sent, bob.websocket.sent
+
+        alice_sent, bob_sent = asyncio.run(scenario())
+        assert len(alice_sent) == 1
+        assert bob_sent == []
+
+
+class TestMongoBroker:
+    """Testes para a leitura da capped collection entre workers."""
+
+    def test_delivers_events_from_lagging_clocks(self):
+        """Testa entrega em ordem de inserção, mesmo com _id mais antigo que o último visto."""
+        async def scenario():
+            collection = FakeCappedCollection()
+            collection.insert({"n": 0})
+            broker = MongoBroker()
+            broker._collection = collection
+            received = []
+
+            async def handler(envelope):
+                received.append(envelope["n"])
+
+            broker.set_handler(handler)
+            task = asyncio.create_task(broker._tail())
+            await asyncio.sleep(0)
+            collection.insert({"n": 1}, seconds_ago=60)
+            # Cursor reaberto: o evento anterior ao último visto também chega
+            await _wait_for(lambda: len(received) >= 1)
+            collection.insert({"n": 2}, seconds_ago=120)
+            collection.insert({"n": 3})
+            await _wait_for(lambda: len(received) >= 3)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return received
+
+        assert asyncio.run(scenario()) == [1, 2, 3]
+
+    def test_delivers_all_after_last_seen_rolls_out(self):
+        """Testa que, se o último visto saiu da capped collection, os restantes são entregues."""
+        async def scenario():
+            collection = FakeCappedCollection()
+            collection.insert({"n": 0})
+            broker = MongoBroker()
+            broker._collection = collection
+            received = []
+
+            async def handler(envelope):
+                received.append(envelope["n"])
+
+            broker.set_handler(handler)
+            task = asyncio.create_task(broker._tail())
+            await asyncio.sleep(0)
+            collection.documents.pop(0)
+            collection.insert({"n": 1}, seconds_ago=60)
+            await _wait_for(lambda: len(received) >= 1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return received
+
+        assert asyncio.run(scenario()) == [1]
+
+    def test_start_requires_async_driver(self):
+        """Testa que, com MONGO_DRIVER=sync, o broker falha no startup sem criar o cliente async."""
+        with patch("services.realtime_hub.settings.MONGO_DRIVER", "sync"):
+            with pytest.raises(RuntimeError, match="MONGO_DRIVER=async"):
+                asyncio.run(MongoBroker().start())
+        assert MongoDB._async_client is None
+
+
+class TestRealtimeRoute:
+    """Testes para a rota WebSocket."""
+
+    def test_rejects_invalid_token(self):
+        """Testa que token inválido fecha a conexão."""
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect("/ws?token=invalid") as websocket:
+                websocket.receive_text()
+        assert exc_info.value.code == 1008
+
+    def test_accepts_valid_token(self):
+        """Testa conexão autenticada respondendo ao ping."""
+        token = create_access_token("user1")
+        with client.websocket_connect(f"/ws?token={token}") as websocket:
+            websocket.send_text("ping")
+            assert websocket.receive_json() == {"type": "pong"}
@@ -0,0 +1,50 @@
+"""Testes para a serialização direta documento -> JSON."""
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from models.chat import ChatOut, ChatOutRow, ChatSummary, ChatSummaryRow
+from models.user import UserOut, UserOutRow
+from utils.serialization import dump_json
+
+
+class TestRows:
+    """As rows devem produzir o mesmo JSON que os modelos Pydantic."""
+
+    def test_user_row_matches_model(self):
+        """Testa UserOutRow contra UserOut, com e sem campos opcionais."""
+        now = datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+        document = {
+            "_id": ObjectId(),
+            "display_name": "Alice",
+            "public_key": "key",
+            "created_at": now,
+            "updated_at": now,
+            "phone_number": "+5511999999999",
+        }
+        expected = UserOut(**{**document, "_id": str(document["_id"])}).model_dump(mode="json", by_alias=True)
+        assert json.loads(dump_json(UserOutRow, document)) == expected
+
+        document["avatar_url"] = "https://example.com/a.png"
+        document["last_active_at"] = now
+        expected = UserOut(**{**document, "_id": str(document["_id"])}).model_dump(mode="json", by_alias=True)
+        assert json.loads(dump_json(UserOutRow, document)) == expected
+
+    def test_chat_rows_match_models(self):
+        """Testa ChatOutRow e ChatSummaryRow contra os modelos equivalentes."""
+        now = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        document = {"_id": ObjectId(), "type": "group", "participant_ids": ["a", "b"], "created_at": now}
+        as_model = {**document, "_id": str(document["_id"])}
+        assert json.loads(dump_json(ChatOutRow, document)) == ChatOut(**as_model).model_dump(mode="json", by_alias=True)
+
+        summary = {"_id": document["_id"], "type": "group", "participant_ids": ["a", "b"]}
+        expected = ChatSummary(**{**summary, "_id": str(summary["_id"])}).model_dump(mode="json", by_alias=True)
+        assert json.loads(dump_json(ChatSummaryRow, summary)) == expected
+
+    def test_document_is_not_mutated(self):
+        """Testa que a serialização não altera o documento de origem."""
+        object_id = ObjectId()
+        document = {"_id": object_id, "type": "private", "participant_ids": ["a"], "created_at": datetime.now(timezone.utc)}
+        dump_json(ChatOutRow, document)
+        assert document["_id"] is object_id
@@ -0,0 +1,131 @@
+"""Testes para a sincronização incremental (GET /sync)."""
+import time
+
+import pytest
+
+from auth.tokens import create_access_token
+from config import Settings
+from tests.conftest import client
+
+
+@pytest.fixture(autouse=True)
+def no_settle_delay(monkeypatch):
+    monkeypatch.setattr(Settings, "SYNC_SETTLE_SECONDS", 0)
+
+
+def _sync(user_id, since=None, limit=None):
+    params = {key: value for key, value in (("since", since), ("limit", limit)) if value is not None}
+    response = client.get("/sync", params=params, headers={"Authorization": f"Bearer {create_access_token(user_id)}"})
+    # updated_at tem precisão de milissegundos: escritas seguintes caem depois do checkpoint
+    time.sleep(0.002)
+    return response
+
+
+class TestSync:
+    """Testes para GET /sync."""
+
+    def test_full_then_incremental_sync(self, create_user, create_chat):
+        """Testa a carga inicial e, depois, só o que mudou desde o checkpoint."""
+        alice, bob, carol = (create_user(i, display_name=name) for i, name in enumerate(("Alice", "Bob", "Carol"), 1))
+        chat_id = create_chat([alice, bob])
+        create_chat([bob, carol])
+
+        first = _sync(alice)
+        assert first.status_code == 200
+        page = first.json()
+        assert [chat["id"] for chat in page["chats"]] == [chat_id]
+        assert {user["id"] for user in page["users"]} == {alice, bob}
+        assert page["deleted"] == []
+        assert page["has_more"] is False
+
+        assert _sync(alice, page["checkpoint"]).json()["chats"] == []
+
+        client.put(f"/users/{bob}", json={"display_name": "Bob B"})
+        client.put(f"/users/{carol}", json={"display_name": "Carol C"})
+        client.post(f"/chats/{chat_id}/messages", json={"sender_id": bob, "content": "oi"})
+        delta = _sync(alice, page["checkpoint"]).json()
+        assert [chat["id"] for chat in delta["chats"]] == [chat_id]
+        assert delta["chats"][0]["last_message_at"] is not None
+        assert [(user["id"], user["display_name"]) for user in delta["users"]] == [(bob, "Bob B")]
+
+    def test_tombstones_for_deleted_chats_and_users(self, create_user, create_chat):
+        """Testa exclusões de chats (só para participantes) e de usuários com chats em comum."""
+        alice, bob, carol = (create_user(i, display_name=name) for i, name in enumerate(("Alice", "Bob", "Carol"), 1))
+        chat_id = create_chat([alice, bob])
+        create_chat([alice, carol])
+        checkpoint = _sync(alice).json()["checkpoint"]
+        carol_checkpoint = _sync(carol).json()["checkpoint"]
+
+        assert client.delete(f"/chats/{chat_id}").status_code == 204
+        assert client.delete(f"/users/{carol}").status_code == 204
+
+        deleted = _sync(alice, checkpoint).json()["deleted"]
+        assert [(tombstone["kind"], tombstone["id"]) for tombstone in deleted] == [("chat", chat_id), ("user", carol)]
+        assert all(tombstone["deleted_at"] for tombstone in deleted)
+        # Carol não participava do chat excluído
+        assert [tombstone["id"] for tombstone in _sync(carol, carol_checkpoint).json()["deleted"]] == [carol]
+
+    def test_tombstone_for_removed_participants(self, create_user, create_chat):
+        """Testa que quem sai do chat recebe o tombstone e quem fica recebe o chat atualizado."""
+        alice, bob, carol = (create_user(i, display_name=name) for i, name in enumerate(("Alice", "Bob", "Carol"), 1))
+        chat_id = create_chat([alice, bob, carol])
+        checkpoints = {user_id: _sync(user_id).json()["checkpoint"] for user_id in (alice, bob, carol)}
+
+        response = client.put(f"/chats/{chat_id}", json={"participant_ids": [alice, bob]})
+        assert response.status_code == 200
+
+        carol_page = _sync(carol, checkpoints[carol]).json()
+        assert [(tombstone["kind"], tombstone["id"]) for tombstone in carol_page["deleted"]] == [("chat", chat_id)]
+        assert carol_page["chats"] == []
+        alice_page = _sync(alice, checkpoints[alice]).json()
+        assert alice_page["deleted"] == []
+        assert [chat["id"] for chat in alice_page["chats"]] == [chat_id]
+
+        # Sem remoções, nenhum tombstone novo
+        client.put(f"/chats/{chat_id}", json={"participant_ids": [alice, bob, carol]})
+        assert len(_sync(carol, checkpoints[carol]).json()["deleted"]) == 1
+        assert _sync(bob, checkpoints[bob]).json()["deleted"] == []
+
+    def test_delta_chat_brings_participant_profiles(self, create_user, create_chat):
+        """Testa que um chat no delta traz os perfis dos participantes, mesmo os não alterados desde o checkpoint."""
+        alice, bob, carol = (create_user(i, display_name=name) for i, name in enumerate(("Alice", "Bob", "Carol"), 1))
+        chat_id = create_chat([alice, bob])
+        checkpoint = _sync(alice).json()["checkpoint"]
+
+        assert client.put(f"/chats/{chat_id}", json={"participant_ids": [alice, bob, carol]}).status_code == 200
+        delta = _sync(alice, checkpoint).json()
+        assert [chat["id"] for chat in delta["chats"]] == [chat_id]
+        assert sorted((user["id"], user["display_name"]) for user in delta["users"]) == sorted([(bob, "Bob"), (carol, "Carol")])
+
+    def test_pagination(self, create_user, create_chat):
+        """Testa páginas de até limit itens por tipo, sem repetições."""
+        alice = create_user(1, display_name="Alice")
+        chat_ids = [create_chat([alice, f"member{i}"]) for i in range(5)]
+
+        seen, checkpoint, pages = [], None, 0
+        while True:
+            page = _sync(alice, checkpoint, limit=2).json()
+            seen.extend(chat["id"] for chat in page["chats"])
+            checkpoint, pages = page["checkpoint"], pages + 1
+            if not page["has_more"]:
+                break
+        assert seen == chat_ids
+        assert pages == 3
+        assert _sync(alice, checkpoint).json()["chats"] == []
+
+    def test_recent_writes_wait_for_settle_window(self, monkeypatch, create_user, create_chat):
+        """Testa que mudanças dentro de SYNC_SETTLE_SECONDS ficam para a próxima chamada."""
+        alice = create_user(1, display_name="Alice")
+        create_chat([alice, "bob"])
+        monkeypatch.setattr(Settings, "SYNC_SETTLE_SECONDS", 60)
+        page = _sync(alice).json()
+        assert page["chats"] == [] and page["users"] == []
+
+    def test_errors(self, monkeypatch, create_user):
+        """Testa 401 sem token, 400 para checkpoint inválido e 410 para checkpoint expirado."""
+        assert client.get("/sync").status_code == 401
+        alice = create_user(1, display_name="Alice")
+        assert _sync(alice, "invalid").status_code == 400
+        checkpoint = _sync(alice).json()["checkpoint"]
+        monkeypatch.setattr(Settings, "SYNC_TOMBSTONE_TTL_SECONDS", 0)
+        assert _sync(alice, checkpoint).status_code == 410
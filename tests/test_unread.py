@@ -0,0 +1,136 @@
+"""Testes para os contadores de não lidas."""
+import asyncio
+from datetime import datetime, timezone
+
+from database.threaded import ThreadedCollection
+from services.unread_service import UnreadService
+from tests.conftest import client, test_db
+
+
+# Participantes dos grupos: user1 envia, user2 e user3 recebem
+GROUP = ["user1", "user2", "user3"]
+
+
+def _unread(user_id):
+    response = client.get(f"/users/{user_id}/unread")
+    assert response.status_code == 200
+    return response.json()
+
+
+class RecordingCollection:
+    """Registra as chamadas de bulk_write."""
+    def __init__(self):
+        self.calls = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append((len(operations), ordered))
+
+
+class SnapshotCursor:
+    """Cursor com documentos já lidos."""
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class TestUnreadCounters:
+    """Testes para incremento, listagem e confirmação de leitura."""
+
+    def test_send_increments_other_participants(self, create_chat, send_message):
+        """Testa que o envio conta para os demais participantes, não para o remetente."""
+        chat_id = create_chat(GROUP)
+        send_message(chat_id)
+        last = send_message(chat_id).json()
+
+        data = _unread("user2")
+        assert data["total"] == 2
+        assert [(chat["chat_id"], chat["count"]) for chat in data["chats"]] == [(chat_id, 2)]
+        assert data["chats"][0]["last_message_at"].startswith(last["created_at"][:23])
+        assert _unread("user1") == {"chats": [], "total": 0}
+
+    def test_mark_read_up_to_last_message(self, create_chat, send_message):
+        """Testa que ler até a última mensagem zera o contador, uma única vez."""
+        chat_id = create_chat(GROUP)
+        send_message(chat_id)
+        last = send_message(chat_id).json()
+
+        reads = {"reads": [{"chat_id": chat_id, "up_to": last["created_at"]}]}
+        assert client.post("/users/user2/unread/read", json=reads).status_code == 204
+        assert _unread("user2")["total"] == 0
+
+        # Nova mensagem depois da leitura; repetir a mesma leitura não a abate
+        send_message(chat_id)
+        client.post("/users/user2/unread/read", json=reads)
+        assert _unread("user2")["total"] == 1
+
+    def test_mark_read_keeps_later_messages(self, create_chat, send_message):
+        """Testa que mensagens posteriores a up_to continuam não lidas."""
+        chat_id = create_chat(GROUP)
+        first = send_message(chat_id).json()
+        send_message(chat_id, sender_id="user3")
+        send_message(chat_id)
+        send_message(chat_id, sender_id="user2")
+
+        reads = {"reads": [{"chat_id": chat_id, "up_to": first["created_at"]}]}
+        client.post("/users/user2/unread/read", json=reads)
+        # Continuam as duas de outros participantes; a própria não conta
+        assert _unread("user2")["total"] == 2
+
+    def test_mark_read_batches_chats(self, create_chat, send_message):
+        """Testa a confirmação de vários chats em uma requisição."""
+        chat_ids = [create_chat(GROUP), create_chat(["user1", "user2"])]
+        last = [send_message(chat_id).json() for chat_id in chat_ids]
+        reads = {"reads": [
+            {"chat_id": chat_id, "up_to": message["created_at"]} for chat_id, message in zip(chat_ids, last)
+        ]}
+        client.post("/users/user2/unread/read", json=reads)
+        assert _unread("user2")["total"] == 0
+        assert _unread("user3")["total"] == 1
+
+    def test_delete_chat_removes_counters(self, create_chat, send_message):
+        """Testa que apagar o chat remove seus contadores."""
+        chat_id = create_chat(GROUP)
+        send_message(chat_id)
+        client.delete(f"/chats/{chat_id}")
+        assert test_db["unread_counters"].count_documents({}) == 0
+
+    def test_group_fan_out_is_one_bulk_write(self):
+        """Testa que o incremento de um grupo grande é um único bulk_write."""
+        collection = RecordingCollection()
+        service = UnreadService(collection, None)
+        user_ids = [f"user{i}" for i in range(500)]
+        asyncio.run(service.increment("chat1", user_ids, datetime.now(timezone.utc)))
+        asyncio.run(service.increment("chat1", [], datetime.now(timezone.utc)))
+        assert collection.calls == [(500, False)]
+
+    def test_mark_read_recounts_chats_in_one_aggregation(self, create_chat, send_message):
+        """Testa a recontagem de vários chats em uma agregação, sem contar mensagens que chegam depois da leitura."""
+        chat_ids = [create_chat(GROUP), create_chat(GROUP)]
+        firsts = [send_message(chat_id).json() for chat_id in chat_ids]
+        for chat_id in chat_ids:
+            send_message(chat_id)
+
+        class RacingCounters(ThreadedCollection):
+            def find(self, *args, **kwargs):
+                documents = list(self._collection.find(*args, **kwargs))
+                # Chega entre a leitura dos contadores e o bulk_write
+                send_message(chat_ids[0])
+                return SnapshotCursor(documents)
+
+        class CountingBuckets(ThreadedCollection):
+            aggregations = 0
+
+            async def aggregate(self, *args, **kwargs):
+                self.aggregations += 1
+                return await super().aggregate(*args, **kwargs)
+
+        buckets = CountingBuckets(test_db["message_buckets"])
+        service = UnreadService(RacingCounters(test_db["unread_counters"]), buckets)
+        reads = [(chat_id, datetime.fromisoformat(first["created_at"])) for chat_id, first in zip(chat_ids, firsts)]
+        assert asyncio.run(service.mark_read("user2", reads)) == 2
+        assert buckets.aggregations == 1
+        # Segunda mensagem de cada chat, mais a que chegou durante a leitura
+        counts = {chat["chat_id"]: chat["count"] for chat in _unread("user2")["chats"]}
+        assert counts == {chat_ids[0]: 2, chat_ids[1]: 1}
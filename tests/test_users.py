@@ -1,5 +1,18 @@
 """Testes para rotas de usuários."""
-from tests.conftest import client
+import asyncio
+import json
+import time
+
+import pytest
+from bson import ObjectId
+
+from auth.tokens import create_access_token
+from database.threaded import ThreadedCollection
+from models.user import UserUpdate
+from services.user_service import CachedUserService
+from tests.conftest import client, test_db
+from config import settings
+from utils.cache import LRUCache
 
 
 class TestUserCreation:
@@ -24,6 +37,18 @@ class TestUserCreation:
         assert "created_at" in data
         assert "phone_number" not in data  # Não deve retornar no UserOut
 
+    def test_create_user_duplicate_phone(self, test_user):
+        """Testa erro ao cadastrar telefone já registrado."""
+        response = client.post(
+            "/users/",
+            json={
+                "display_name": "Other John",
+                "public_key": "test_public_key_789",
+                "phone_number": "+5511999999999"
+            }
+        )
+        assert response.status_code == 409
+
     def test_create_user_missing_fields(self):
         """Testa erro quando faltam campos obrigatórios."""
         response = client.post(
@@ -70,11 +95,189 @@ class TestUserRetrieval:
         assert response.status_code == 404
         assert response.json()["detail"] == "User not found"
 
+    def test_get_user_after_update_is_not_stale(self, test_user):
+        """Testa que a atualização invalida o perfil em cache."""
+        user_id = test_user["id"]
+        client.get(f"/users/{user_id}")
+        client.put(f"/users/{user_id}", json={"display_name": "Updated"})
+        response = client.get(f"/users/{user_id}")
+        assert response.json()["display_name"] == "Updated"
+
+    def test_out_of_order_updates_do_not_cache_older_profile(self, test_user):
+        """Testa que uma atualização que termina depois de outra mais nova não deixa a antiga em cache."""
+        user_id = test_user["id"]
+        users = test_db["users"]
+
+        class RacingUsers(ThreadedCollection):
+            async def find_one_and_update(self, *args, **kwargs):
+                document = await self.__getattr__("find_one_and_update")(*args, **kwargs)
+                # Atualização concorrente conclui antes desta voltar
+                users.update_one({"_id": ObjectId(user_id)}, {"$set": {"display_name": "Newer"}})
+                return document
+
+        service = CachedUserService(RacingUsers(users), LRUCache(16, 60))
+        asyncio.run(service.update_user_document(user_id, UserUpdate(display_name="Older")))
+        assert asyncio.run(service.get_user_document(user_id))["display_name"] == "Newer"
+
+    def test_get_user_after_delete_is_not_stale(self, test_user):
+        """Testa que a deleção invalida o perfil em cache."""
+        user_id = test_user["id"]
+        client.get(f"/users/{user_id}")
+        client.delete(f"/users/{user_id}")
+        assert client.get(f"/users/{user_id}").status_code == 404
+
+    def test_get_user_served_from_cache(self, test_user):
+        """Testa acertos de cache, inclusive para usuário inexistente."""
+        user_id = test_user["id"]
+        fake_id = "507f1f77bcf86cd799439011"
+        before = client.get("/health").json()["user_cache"]
+        for _ in range(2):
+            client.get(f"/users/{user_id}")
+            client.get(f"/users/{fake_id}")
+        after = client.get("/health").json()["user_cache"]
+        assert after["misses"] - before["misses"] == 2
+        assert after["hits"] - before["hits"] == 2
+
     def test_get_user_invalid_id(self):
         """Testa erro com ID inválido."""
         response = client.get("/users/invalid_id")
         assert response.status_code == 404
 
+    def test_get_user_conditional(self, test_user):
+        """Testa ETag/Last-Modified e 304 com If-None-Match e If-Modified-Since."""
+        user_id = test_user["id"]
+        response = client.get(f"/users/{user_id}")
+        etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+        assert response.headers["cache-control"] == settings.RESOURCE_CACHE_CONTROL
+
+        cached = client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+        assert client.get(f"/users/{user_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+        stale = client.get(f"/users/{user_id}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+        assert stale.status_code == 200
+
+        # updated_at tem precisão de milissegundos
+        time.sleep(0.002)
+        client.put(f"/users/{user_id}", json={"display_name": "Changed"})
+        changed = client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()["display_name"] == "Changed"
+        assert changed.headers["etag"] != etag
+
+    def test_get_user_heartbeat_changes_etag(self, test_user):
+        """Testa que last_active_at (heartbeat, sem updated_at) também invalida o ETag."""
+        user_id = test_user["id"]
+        etag = client.get(f"/users/{user_id}").headers["etag"]
+        client.post(f"/users/{user_id}/heartbeat")
+        assert client.get(f"/users/{user_id}", headers={"If-None-Match": etag}).status_code == 200
+
+
+class TestUserBatchRetrieval:
+    """Testes para busca de usuários em lote."""
+
+    def test_get_users_in_requested_order(self, create_user):
+        """Testa que a resposta segue a ordem pedida, sem duplicatas."""
+        ids = [create_user(i) for i in range(3)]
+        requested = [ids[2], ids[0], ids[2], ids[1]]
+        response = client.get("/users", params={"ids": ",".join(requested)})
+        assert response.status_code == 200
+        assert [user["id"] for user in response.json()["users"]] == [ids[2], ids[0], ids[1]]
+
+    def test_get_users_skips_missing(self, create_user):
+        """Testa que IDs inexistentes ou inválidos são omitidos."""
+        ids = [create_user()]
+        response = client.get("/users", params={"ids": f"507f1f77bcf86cd799439011,invalid,{ids[0]}"})
+        assert response.status_code == 200
+        assert [user["id"] for user in response.json()["users"]] == ids
+
+    def test_get_users_batch_post(self, create_user):
+        """Testa busca em lote pelo corpo da requisição."""
+        ids = [create_user(i) for i in range(2)]
+        response = client.post("/users/batch", json={"ids": ids})
+        assert response.status_code == 200
+        assert [user["id"] for user in response.json()["users"]] == ids
+
+    def test_get_users_too_many_ids(self):
+        """Testa limite de IDs por requisição."""
+        response = client.post("/users/batch", json={"ids": [str(i) for i in range(10000)]})
+        assert response.status_code == 422
+
+
+class TestUserPublicKeys:
+    """Testes para o diretório de chaves públicas."""
+
+    def test_get_keys_in_requested_order(self, create_user):
+        """Testa id, public_key e key_version na ordem pedida, omitindo inexistentes."""
+        ids = [create_user(i) for i in range(2)]
+        response = client.post("/users/keys", json={"ids": [ids[1], "invalid", "507f1f77bcf86cd799439011", ids[0], ids[1]]})
+        assert response.status_code == 200
+        assert response.json() == {"keys": [
+            {"id": ids[1], "public_key": "key_1", "key_version": 1},
+            {"id": ids[0], "public_key": "key_0", "key_version": 1},
+        ]}
+        response = client.get("/users/keys", params={"ids": ids[0]})
+        assert response.headers["cache-control"] == settings.KEYS_CACHE_CONTROL
+
+    def _rotate(self, user_id, public_key, caller_id=None):
+        token = create_access_token(caller_id or user_id)
+        return client.put(f"/users/{user_id}/public-key", json={"public_key": public_key},
+                          headers={"Authorization": f"Bearer {token}"})
+
+    def test_key_version_bumps_only_on_key_change(self, test_user):
+        """Testa que key_version sobe ao trocar a chave e não ao repetir a mesma."""
+        user_id = test_user["id"]
+        response = self._rotate(user_id, "rotated")
+        assert response.status_code == 200
+        assert response.json()["key_version"] == 2
+        assert self._rotate(user_id, "rotated").json()["key_version"] == 2
+        keys = client.get("/users/keys", params={"ids": user_id}).json()["keys"]
+        assert keys == [{"id": user_id, "public_key": "rotated", "key_version": 2}]
+        assert client.get(f"/users/{user_id}").json()["public_key"] == "rotated"
+
+    def test_rotate_key_requires_owner(self, test_user):
+        """Testa que só o próprio usuário troca a chave, e que o PUT do perfil não a altera."""
+        user_id = test_user["id"]
+        response = client.put(f"/users/{user_id}/public-key", json={"public_key": "attacker"})
+        assert response.status_code == 401
+        assert self._rotate(user_id, "attacker", caller_id="507f1f77bcf86cd799439011").status_code == 403
+        client.put(f"/users/{user_id}", json={"public_key": "attacker"})
+        keys = client.get("/users/keys", params={"ids": user_id}).json()["keys"]
+        assert keys == [{"id": user_id, "public_key": "test_public_key_123", "key_version": 1}]
+
+    def test_etag_revalidation(self, test_user):
+        """Testa ETag forte, 304 com If-None-Match e novo ETag após troca de chave."""
+        user_id = test_user["id"]
+        first = client.get("/users/keys", params={"ids": user_id})
+        etag = first.headers["etag"]
+        assert etag.startswith('"')
+
+        cached = client.get("/users/keys", params={"ids": user_id}, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+        self._rotate(user_id, "rotated")
+        changed = client.get("/users/keys", params={"ids": user_id}, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_post_keys_ignores_if_none_match(self, test_user):
+        """Testa que o POST nunca responde 304, mesmo com If-None-Match que bate."""
+        user_id = test_user["id"]
+        etag = client.get("/users/keys", params={"ids": user_id}).headers["etag"]
+        for if_none_match in (etag, "*"):
+            response = client.post("/users/keys", json={"ids": [user_id]}, headers={"If-None-Match": if_none_match})
+            assert response.status_code == 200
+            assert response.json()["keys"][0]["id"] == user_id
+            assert "etag" not in response.headers
+
+    def test_get_keys_too_many_ids(self):
+        """Testa limite de IDs por requisição."""
+        response = client.post("/users/keys", json={"ids": [str(i) for i in range(10000)]})
+        assert response.status_code == 422
+
 
 class TestUserUpdate:
     """Testes para atualização de usuários."""
@@ -171,6 +374,158 @@ class TestUserDeletion:
         assert response.status_code == 404
 
 
+class TestUserChats:
+    """Testes para a caixa de entrada do usuário."""
+
+    @pytest.fixture
+    def create_active_chat(self, create_chat):
+        """Cria o chat com last_message_at (None: sem mensagens)."""
+        def create(participant_ids, last_message_at=None):
+            chat_id = create_chat(participant_ids)
+            if last_message_at:
+                client.put(f"/chats/{chat_id}", json={"last_message_at": last_message_at})
+            return chat_id
+        return create
+
+    def test_list_user_chats_sorted_by_activity(self, create_active_chat):
+        """Testa ordenação por last_message_at decrescente, sem mensagens por último."""
+        old = create_active_chat(["user1", "user2"], "2025-01-01T10:00:00+00:00")
+        empty = create_active_chat(["user1", "user3"])
+        recent = create_active_chat(["user1", "user4"], "2025-01-02T10:00:00+00:00")
+        create_active_chat(["user2", "user3"], "2025-01-03T10:00:00+00:00")
+
+        response = client.get("/users/user1/chats")
+        assert response.status_code == 200
+        data = response.json()
+        assert [chat["id"] for chat in data["chats"]] == [recent, old, empty]
+        assert data["next_cursor"] is None
+        assert set(data["chats"][0]) == {"id", "type", "participant_ids", "last_message_at"}
+
+    def test_list_user_chats_pagination(self, create_active_chat):
+        """Testa paginação por cursor, inclusive entre chats sem mensagens."""
+        expected = [
+            create_active_chat(["user1", "user2"], "2025-01-03T10:00:00+00:00"),
+            create_active_chat(["user1", "user3"], "2025-01-02T10:00:00+00:00"),
+        ]
+        empty_ids = [create_active_chat(["user1", f"user{i}"]) for i in range(4, 7)]
+        expected.extend(reversed(empty_ids))
+
+        seen_ids = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get("/users/user1/chats", params=params).json()
+            seen_ids.extend(chat["id"] for chat in data["chats"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen_ids == expected
+
+    def test_list_user_chats_empty(self):
+        """Testa caixa de entrada de usuário sem chats."""
+        response = client.get("/users/user1/chats")
+        assert response.status_code == 200
+        assert response.json()["chats"] == []
+
+
+class TestUserBulkCreation:
+    """Testes para criação de usuários em lote."""
+
+    def test_bulk_create_partial_failure(self, test_user):
+        """Testa que itens inválidos ou duplicados não interrompem o lote."""
+        items = [
+            {"display_name": "A", "public_key": "key_a", "phone_number": "+5511000000001"},
+            {"display_name": "B"},
+            {"display_name": "Dup", "public_key": "key_dup", "phone_number": "+5511999999999"},
+            {"display_name": "C", "public_key": "key_c", "phone_number": "+5511000000002"},
+        ]
+        response = client.post("/users/bulk", json={"items": items})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["failed"] == 2
+        results = data["results"]
+        assert [result["index"] for result in results] == [0, 1, 2, 3]
+        assert results[0]["id"] and results[3]["id"]
+        assert "public_key" in results[1]["error"]
+        assert results[2]["error"] == "Phone number already registered"
+
+        response = client.get(f"/users/{results[3]['id']}")
+        assert response.status_code == 200
+        assert response.json()["display_name"] == "C"
+
+    def test_bulk_create_too_many_items(self):
+        """Testa limite de itens por requisição."""
+        items = [{"display_name": "A"}] * (settings.MAX_BULK_ITEMS + 1)
+        response = client.post("/users/bulk", json={"items": items})
+        assert response.status_code == 422
+
+
+class TestUserExport:
+    """Testes para exportação NDJSON de usuários."""
+
+    def test_export_users_ndjson(self, create_user):
+        """Testa exportação com retomada e sem campos internos."""
+        created_ids = [create_user(i) for i in range(3)]
+
+        response = client.get("/users/export", params={"batch_size": 2})
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == created_ids
+        assert "phone_number" not in rows[0]
+        assert rows[0]["updated_at"] is not None
+
+        response = client.get("/users/export", params={"after_id": created_ids[1]})
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == created_ids[2:]
+
+    def test_export_users_invalid_after_id(self):
+        """Testa erro com after_id inválido."""
+        response = client.get("/users/export", params={"after_id": "invalid"})
+        assert response.status_code == 400
+
+
+class TestUserSearch:
+    """Testes para a busca de usuários por nome."""
+
+    def test_search_prefix_ignores_case_and_accents(self, create_user):
+        """Testa prefixo sem diferenciar maiúsculas e acentos, nomes inteiros antes de palavras."""
+        joao = create_user(1, display_name="João Silva")
+        silvia = create_user(2, display_name="Sílvia Souza")
+        ana = create_user(3, display_name="Ana Silveira")
+        create_user(4, display_name="Bruno Costa")
+
+        response = client.get("/users/search", params={"q": "SIL"})
+        assert response.status_code == 200
+        users = response.json()["users"]
+        assert [user["id"] for user in users] == [silvia, ana, joao]
+        assert set(users[0]) == {"id", "display_name", "public_key", "key_version", "avatar_url", "created_at", "last_active_at"}
+
+    def test_search_multiple_terms_and_limit(self, create_user):
+        """Testa busca com mais de um termo e o limite de resultados."""
+        joao = create_user(1, display_name="João da Silva")
+        create_user(2, display_name="João Souza")
+        response = client.get("/users/search", params={"q": "silva jo"})
+        assert [user["id"] for user in response.json()["users"]] == [joao]
+
+        response = client.get("/users/search", params={"q": "joao", "limit": 1})
+        assert len(response.json()["users"]) == 1
+
+    def test_search_follows_display_name_updates(self, test_user):
+        """Testa que a chave de busca acompanha a atualização do nome."""
+        client.put(f"/users/{test_user['id']}", json={"display_name": "Zélia Duncan"})
+        assert client.get("/users/search", params={"q": "john"}).json()["users"] == []
+        users = client.get("/users/search", params={"q": "zelia"}).json()["users"]
+        assert [user["id"] for user in users] == [test_user["id"]]
+
+    def test_search_blank_query(self):
+        """Testa busca sem termos úteis e sem q."""
+        assert client.get("/users/search", params={"q": "  "}).json() == {"users": []}
+        assert client.get("/users/search").status_code == 422
+
+
 class TestHealthEndpoints:
     """Testes para endpoints de saúde da API."""
 
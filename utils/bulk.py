@@ -0,0 +1,79 @@
+from typing import Any, Callable, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+
+def validate_items(model: type[BaseModel], items: list[Any]) -> tuple[dict[int, BaseModel], dict[int, str]]:
+    '''
+    Valida cada item contra o modelo, sem interromper no primeiro erro.
+
+    Retorna os itens válidos e as mensagens de erro, ambos indexados pela
+    posição do item na requisição.
+    '''
+    valid: dict[int, BaseModel] = {}
+    errors: dict[int, str] = {}
+    for index, item in enumerate(items):
+        try:
+            valid[index] = model.model_validate(item)
+        except ValidationError as exc:
+            errors[index] = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+                for error in exc.errors()
+            )
+    return valid, errors
+
+
+async def insert_many_unordered(
+    collection,
+    documents: list[dict],
+    describe_error: Callable[[dict], str],
+) -> list[tuple[Optional[str], Optional[str]]]:
+    '''
+    Insere os documentos com um único insert_many(ordered=False).
+
+    Falhas individuais (ex.: chave duplicada) não interrompem o lote; o
+    resultado traz (id, None) ou (None, erro) na ordem dos documentos.
+    describe_error converte um writeError do servidor na mensagem do item.
+    '''
+    for document in documents:
+        document.setdefault("_id", ObjectId())
+    write_errors: dict[int, str] = {}
+    if documents:
+        try:
+            await collection.insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                write_errors[error["index"]] = describe_error(error)
+    return [
+        (None, write_errors[index]) if index in write_errors else (str(document["_id"]), None)
+        for index, document in enumerate(documents)
+    ]
+
+
+async def bulk_create(
+    model: type[BaseModel],
+    items: list[Any],
+    create_many: Callable[[list], Any],
+) -> tuple[list[dict], dict[int, BaseModel]]:
+    '''
+    Valida os itens e grava os válidos em lote com create_many, que recebe
+    a lista de modelos e devolve [(id, erro)] na mesma ordem.
+
+    Retorna um resultado por item da requisição ({"index", "id", "error"})
+    e os modelos validados, indexados pela posição do item.
+    '''
+    valid, errors = validate_items(model, items)
+    written = await create_many(list(valid.values()))
+    ids: dict[int, str] = {}
+    for index, (item_id, error) in zip(valid, written):
+        if error is not None:
+            errors[index] = error
+        else:
+            ids[index] = item_id
+    results = [
+        {"index": index, "id": ids.get(index), "error": errors.get(index)}
+        for index in range(len(items))
+    ]
+    return results, valid
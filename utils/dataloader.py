@@ -0,0 +1,63 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    '''
+    Agrupa e deduplica buscas por chave feitas durante um mesmo ciclo do
+    event loop em uma única chamada de batch_load.
+
+    batch_load recebe as chaves únicas pendentes e retorna um dict
+    chave -> valor; chaves ausentes resolvem para None. Os resultados ficam
+    em cache pela vida do loader (uma requisição).
+    '''
+    def __init__(self, batch_load: Callable[[list[K]], Awaitable[dict[K, V]]], max_batch_size: Optional[int] = None):
+        self._batch_load = batch_load
+        self._max_batch_size = max_batch_size
+        self._cache: dict[K, asyncio.Future] = {}
+        self._pending: list[K] = []
+        # O loop só guarda referência fraca às tasks: os lotes em andamento ficam aqui
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+
+    async def load(self, key: K) -> Optional[V]:
+        return await self._enqueue(key)
+
+    async def load_many(self, keys: Iterable[K]) -> list[Optional[V]]:
+        # Enfileira todas as chaves antes de ceder o loop, para caberem no mesmo lote
+        futures = [self._enqueue(key) for key in keys]
+        return list(await asyncio.gather(*futures))
+
+    def _enqueue(self, key: K) -> asyncio.Future:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+        return future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, []
+        size = self._max_batch_size or len(pending)
+        for start in range(0, len(pending), size):
+            task = asyncio.ensure_future(self._load_batch(pending[start:start + size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, keys: list[K]) -> None:
+        self.batches += 1
+        try:
+            values = await self._batch_load(keys)
+        except Exception as exc:
+            for key in keys:
+                self._cache.pop(key).set_exception(exc)
+            return
+        for key in keys:
+            self._cache[key].set_result(values.get(key))
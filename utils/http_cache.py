@@ -0,0 +1,104 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from utils.serialization import dump_json, json_response
+
+
+def strong_etag(body: bytes) -> str:
+    '''ETag forte: muda se e somente se os bytes do corpo mudam.'''
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    '''
+    Compara If-None-Match com o ETag atual. Segue a comparação fraca da
+    RFC 9110 para If-None-Match (ignora o prefixo W/) e aceita "*".
+    '''
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def cached_json_response(request: Request, row_type: Any, value: Any, cache_control: str) -> Response:
+    '''
+    Como utils.serialization.json_response, com ETag forte e Cache-Control.
+    Responde 304 sem corpo quando o cliente já tem a mesma versão.
+    '''
+    body = dump_json(row_type, value)
+    headers = {"ETag": strong_etag(body), "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, headers=headers, media_type="application/json")
+
+
+def _utc(value: datetime) -> datetime:
+    # O driver devolve datetimes sem fuso (UTC)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def document_validators(document: dict, fields: tuple[str, ...] = ("updated_at",)) -> tuple[str, Optional[datetime]]:
+    '''
+    Validadores HTTP de um documento sem serializá-lo: ETag a partir do _id
+    e dos campos de versão (em milissegundos, a precisão do MongoDB) e
+    Last-Modified pelo mais recente deles.
+    '''
+    versions = {field: _utc(document[field]) for field in fields if document.get(field) is not None}
+    parts = [str(document["_id"])]
+    parts.extend(str(int(versions[field].timestamp() * 1000)) if field in versions else "" for field in fields)
+    etag = '"' + hashlib.sha256("|".join(parts).encode()).hexdigest()[:32] + '"'
+    return etag, max(versions.values(), default=None)
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    '''
+    Avalia If-None-Match e, só na ausência dele (RFC 9110), If-Modified-Since,
+    que tem precisão de segundos.
+    '''
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = _utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime], cache_control: str) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime], cache_control: str) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified, cache_control))
+
+
+def conditional_json_response(
+    request: Request,
+    row_type: Any,
+    document: dict,
+    cache_control: str,
+    fields: tuple[str, ...] = ("updated_at",),
+) -> Response:
+    '''
+    json_response com ETag e Last-Modified de document_validators; responde
+    304 sem serializar o documento quando a cópia do cliente está em dia.
+    '''
+    etag, last_modified = document_validators(document, fields)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified, cache_control)
+    return json_response(row_type, document, headers=validator_headers(etag, last_modified, cache_control))
@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from bson import ObjectId
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    '''
+    Codifica a chave da última linha de uma página em um cursor opaco.
+
+    Datetimes são serializados em ISO 8601 e reconstruídos por decode_cursor.
+    '''
+    payload = {
+        key: {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in values.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    '''Decodifica um cursor gerado por encode_cursor. Lança ValueError se inválido.'''
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return {
+        key: datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) and "$dt" in value else value
+        for key, value in payload.items()
+    }
+
+
+def export_query(
+    after_id: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    updated_until: Optional[datetime] = None,
+) -> dict:
+    '''
+    Filtro das exportações em ordem de _id: retoma após after_id (o último
+    _id recebido) e restringe updated_at a [updated_since, updated_until).
+
+    Lança ValueError se after_id não for um ObjectId.
+    '''
+    query: dict = {}
+    if after_id is not None:
+        try:
+            query["_id"] = {"$gt": ObjectId(after_id)}
+        except Exception as exc:
+            raise ValueError("Invalid after_id") from exc
+    updated_at = {}
+    if updated_since is not None:
+        updated_at["$gte"] = updated_since
+    if updated_until is not None:
+        updated_at["$lt"] = updated_until
+    if updated_at:
+        query["updated_at"] = updated_at
+    return query
@@ -0,0 +1,19 @@
+import hashlib
+
+from config import settings
+
+
+def normalize_phone_number(phone_number: str) -> str:
+    '''Forma canônica do telefone para o hash: só dígitos, com o "+" inicial (E.164).'''
+    digits = "".join(char for char in phone_number if char.isdigit())
+    return f"+{digits}"
+
+
+def hash_phone_number(phone_number: str) -> str:
+    '''
+    SHA-256 (hex) de PHONE_HASH_SALT + telefone normalizado. Os clientes
+    calculam o mesmo hash da agenda para a descoberta de contatos, sem
+    enviar os números em claro.
+    '''
+    payload = settings.PHONE_HASH_SALT + normalize_phone_number(phone_number)
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class StackSampler:
+    '''
+    Profiler estatístico: uma thread auxiliar amostra a pilha de outra
+    thread (o event loop) a cada intervalo, sem instrumentar as chamadas.
+
+    Tarefas concorrentes no mesmo event loop aparecem juntas no perfil;
+    o custo é só o da thread de amostragem enquanto ela está ativa.
+    '''
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.001):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples: Counter[tuple] = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                # Raiz primeiro, como esperam os formatos de flamegraph
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        '''Pilhas no formato "collapsed" (flamegraph.pl, speedscope, inferno).'''
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        '''Perfil "sampled" no formato de arquivo do speedscope.'''
+        frames: list[dict] = []
+        index: dict[tuple, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "talkhub",
+        }
+
+
+class ProfileRing:
+    '''
+    Diretório com no máximo max_files perfis; ao gravar um novo, os mais
+    antigos são apagados.
+    '''
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def _paths(self) -> list[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(self.directory, name) for name in names)
+
+    @staticmethod
+    def new_name(label: str, profile_format: str) -> str:
+        '''Nome do arquivo de um novo perfil; o prefixo em ns ordena do mais antigo para o mais novo.'''
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")[:80]
+        suffix = "collapsed.txt" if profile_format == "collapsed" else "speedscope.json"
+        return f"{time.time_ns()}-{slug}.{suffix}"
+
+    def save(self, name: str, label: str, sampler: StackSampler) -> None:
+        '''Grava o perfil no formato indicado pela extensão de name e descarta os excedentes.'''
+        os.makedirs(self.directory, exist_ok=True)
+        if name.endswith(".collapsed.txt"):
+            content = sampler.collapsed()
+        else:
+            content = json.dumps(sampler.speedscope(label))
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as file:
+            file.write(content)
+        paths = self._paths()
+        for path in paths[:max(0, len(paths) - self.max_files)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def list(self) -> list[str]:
+        return [os.path.basename(path) for path in reversed(self._paths())]
+
+    def path(self, name: str) -> Optional[str]:
+        '''Caminho de um perfil do anel; None se não existir ou se o nome for inválido.'''
+        if os.path.basename(name) != name or name not in self.list():
+            return None
+        return os.path.join(self.directory, name)
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class QuotaLimiter:
+    '''
+    Cota por chamador (token bucket) em processo: cada chamador tem até
+    capacity unidades, repostas continuamente ao longo de window_seconds.
+    A cota é por processo, não global: com N workers, um chamador chega a
+    até N vezes capacity por janela.
+
+    Toda chamada descarta os baldes parados há window_seconds ou mais (já
+    estariam cheios) e mantém no máximo max_callers baldes (LRU); um balde
+    descartado volta cheio, o que só favorece o chamador.
+    '''
+    def __init__(
+        self,
+        capacity: int,
+        window_seconds: float,
+        max_callers: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.rate = capacity / window_seconds
+        self.window_seconds = window_seconds
+        self.max_callers = max_callers
+        self._clock = clock
+        # caller -> (unidades disponíveis, instante da última reposição)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.rejected = 0
+
+    def acquire(self, caller: str, amount: int) -> float:
+        '''
+        Consome amount unidades do chamador. Retorna 0 se couber na cota, ou
+        quantos segundos faltam para caber (nada é consumido nesse caso).
+        '''
+        now = self._clock()
+        available, updated_at = self._buckets.get(caller, (self.capacity, now))
+        available = min(self.capacity, available + (now - updated_at) * self.rate)
+        rejected = amount > available
+        self._buckets[caller] = (available if rejected else available - amount, now)
+        self._buckets.move_to_end(caller)
+        self._evict(now)
+        if not rejected:
+            return 0.0
+        self.rejected += 1
+        if amount > self.capacity:
+            return float("inf")
+        return (amount - available) / self.rate
+
+    def _evict(self, now: float) -> None:
+        # Ordem LRU = ordem da última reposição: os parados estão no início
+        while self._buckets:
+            _, updated_at = next(iter(self._buckets.values()))
+            if now - updated_at < self.window_seconds and len(self._buckets) <= self.max_callers:
+                break
+            self._buckets.popitem(last=False)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {"callers": len(self._buckets), "rejected": self.rejected}
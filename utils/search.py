@@ -0,0 +1,41 @@
+import unicodedata
+from typing import Optional
+
+
+def normalize_text(text: str) -> str:
+    '''
+    Forma de busca de um texto: sem acentos (NFKD sem marcas combinantes),
+    casefold e espaços colapsados. "  João  SILVA " -> "joao silva".
+    '''
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def search_fields(display_name: str) -> dict:
+    '''
+    Campos indexados da busca de usuários: search_key (nome inteiro
+    normalizado) e search_tokens (palavras distintas do nome).
+    '''
+    key = normalize_text(display_name)
+    return {"search_key": key, "search_tokens": sorted(set(key.split()))}
+
+
+def prefix_range(prefix: str) -> dict:
+    '''Intervalo [prefix, próximo prefixo) que casa strings começando com prefix, atendido por índice.'''
+    bounds = {"$gte": prefix}
+    upper = _next_prefix(prefix)
+    if upper is not None:
+        bounds["$lt"] = upper
+    return bounds
+
+
+def _next_prefix(prefix: str) -> Optional[str]:
+    # Menor string maior que todas as que começam com prefix (sem surrogates, que não viram UTF-8)
+    for index in range(len(prefix) - 1, -1, -1):
+        code = ord(prefix[index]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:index] + chr(code)
+    return None
@@ -0,0 +1,73 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Annotated, Any, AsyncIterator, Optional
+
+import anyio
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BeforeValidator, PlainSerializer, TypeAdapter
+
+
+# Tipos para as "rows" (TypedDicts) que serializam documentos do MongoDB
+# direto para JSON, sem instanciar os modelos Pydantic intermediários.
+# O formato de saída é o mesmo dos field_serializer dos modelos (isoformat).
+ObjectIdStr = Annotated[str, BeforeValidator(str)]
+IsoDatetime = Annotated[datetime, PlainSerializer(lambda value: value.isoformat(), return_type=str)]
+
+
+@lru_cache(maxsize=None)
+def get_adapter(row_type: Any) -> TypeAdapter:
+    '''TypeAdapter compilado uma única vez por tipo de row.'''
+    return TypeAdapter(row_type)
+
+
+def dump_json(row_type: Any, value: Any) -> bytes:
+    '''Valida o documento (ou estrutura de documentos) contra a row e serializa para JSON.'''
+    adapter = get_adapter(row_type)
+    return adapter.dump_json(adapter.validate_python(value))
+
+
+def json_response(row_type: Any, value: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    '''
+    Resposta JSON pronta; o FastAPI não revalida o corpo quando a rota
+    retorna um Response, então response_model fica só para o OpenAPI.
+    '''
+    return Response(
+        content=dump_json(row_type, value),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+async def iter_ndjson(row_type: Any, cursor, batch_size: int) -> AsyncIterator[bytes]:
+    '''
+    Consome o cursor lote a lote e gera um bloco de linhas JSON por lote,
+    mantendo em memória no máximo batch_size documentos.
+    '''
+    adapter = get_adapter(row_type)
+    try:
+        while documents := await cursor.to_list(batch_size):
+            yield b"".join(adapter.dump_json(adapter.validate_python(document)) + b"\n" for document in documents)
+    finally:
+        # Cliente desconectado cancela o gerador; fecha o cursor no servidor mesmo assim
+        with anyio.CancelScope(shield=True):
+            await cursor.close()
+
+
+def ndjson_response(row_type: Any, cursor, batch_size: int) -> StreamingResponse:
+    '''Resposta NDJSON em streaming a partir de um cursor do MongoDB.'''
+    return StreamingResponse(iter_ndjson(row_type, cursor, batch_size), media_type="application/x-ndjson")
+
+
+async def iter_ndjson_batches(row_type: Any, batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    '''Como iter_ndjson, mas a partir de um gerador de lotes de documentos.'''
+    adapter = get_adapter(row_type)
+    async for documents in batches:
+        if documents:
+            yield b"".join(adapter.dump_json(adapter.validate_python(document)) + b"\n" for document in documents)
+
+
+def ndjson_batches_response(row_type: Any, batches: AsyncIterator[list]) -> StreamingResponse:
+    '''Resposta NDJSON em streaming, um bloco de linhas por lote gerado.'''
+    return StreamingResponse(iter_ndjson_batches(row_type, batches), media_type="application/x-ndjson")